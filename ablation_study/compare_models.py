@@ -1,70 +1,203 @@
 """
 Compare WITH RadLex vs WITHOUT RadLex models
 Run after training both models
+
+Every (variant, shard) pair is an independent process that checkpoints its
+results, so the comparison scales to thousands of reports and resumes after a crash:
+    python -m ablation_study.compare_models --num-shards 8 --gpus 0,1,2,3
+    python -m ablation_study.compare_models --variant with_radlex --num-shards 8 --shard-index 3
+    python -m ablation_study.compare_models --aggregate
 """
-from unsloth import FastLanguageModel
+import argparse
+import json
+import os
+import queue
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
 import pandas as pd
 
+from ablation_study.evaluation import (
+    ShardCheckpoint, bootstrap_ci, load_shard_results, paired_bootstrap_delta,
+    parse_reference, score_report, shard_indices,
+)
+
 # Paths - UPDATE THESE
 RADLEX_MODEL = "YOUR_RADLEX_MODEL_PATH/lora_model"
 NO_RADLEX_MODEL = "YOUR_NO_RADLEX_MODEL_PATH/lora_model"
-TEST_DATA = "YOUR_TEST_DATA_PATH/train_dataset.jsonl"
+DATA_DIR = Path("YOUR_TEST_DATA_PATH")  # prepare-data output
+TEST_SPLIT = "train"
+TEST_DATA = DATA_DIR / f"{TEST_SPLIT}_dataset.jsonl"
+REFERENCE_DATA = "YOUR_REFERENCE_PATH.csv"  # note_id + reference procedures (CPT or billed codes)
+REFERENCE_COLUMN = "procedures"
+RESULTS_DIR = Path("ablation_results")
 
-# Load both models
-print("Loading WITH-RadLex model...")
-model_radlex, tokenizer_radlex = FastLanguageModel.from_pretrained(
-    model_name=RADLEX_MODEL, max_seq_length=4096, dtype=None, load_in_4bit=True,
-)
-FastLanguageModel.for_inference(model_radlex)
+# Reports before TEST_START were used for training
+TEST_START = 1000
+TEST_END = None
+BATCH_SIZE = 8
+N_BOOTSTRAP = 1000
 
-print("Loading NO-RadLex model...")
-model_no_radlex, tokenizer_no_radlex = FastLanguageModel.from_pretrained(
-    model_name=NO_RADLEX_MODEL, max_seq_length=4096, dtype=None, load_in_4bit=True,
-)
-FastLanguageModel.for_inference(model_no_radlex)
-
-def extract_procedures(report_text, model, tokenizer):
-    prompt = f"""Radiology Report:
-{report_text}
-
-Based on the above radiology report, list all the billable procedures performed.
-Format as a comma-separated list of procedure names.
-
-Billable Procedures:"""
-    inputs = tokenizer(prompt, return_tensors="pt").to("cuda")
-    outputs = model.generate(**inputs, max_new_tokens=256, temperature=0.3, top_p=0.9, do_sample=True, pad_token_id=tokenizer.eos_token_id)
-    generated = tokenizer.decode(outputs[0], skip_special_tokens=True)
-    if "Billable Procedures:" in generated:
-        text = generated.split("Billable Procedures:")[-1].strip()
-    else:
-        text = generated[len(prompt):].strip()
-    return [p.strip() for p in text.split(",") if p.strip()]
-
-# Test on unseen reports (indices 1000-1020)
-test_df = pd.read_json(TEST_DATA, lines=True).iloc[1000:1020]
-print(f"Testing on {len(test_df)} unseen reports...\n")
-
-results = []
-for idx, row in test_df.iterrows():
-    report_with_radlex = row['text']
-    report_no_radlex = report_with_radlex.split("Radiology Report:")[-1].strip() if "Radiology Report:" in report_with_radlex else report_with_radlex
-
-    proc_radlex = extract_procedures(report_with_radlex, model_radlex, tokenizer_radlex)
-    proc_no_radlex = extract_procedures(report_no_radlex, model_no_radlex, tokenizer_no_radlex)
-
-    results.append({
-        'report_id': idx,
-        'with_radlex': ', '.join(proc_radlex),
-        'without_radlex': ', '.join(proc_no_radlex),
-        'radlex_count': len(proc_radlex),
-        'no_radlex_count': len(proc_no_radlex),
-    })
-    print(f"Report {idx}: RadLex={len(proc_radlex)}, NoRadLex={len(proc_no_radlex)}")
-
-results_df = pd.DataFrame(results)
-results_df.to_csv('ablation_results.csv', index=False)
-
-print(f"\nResults saved to ablation_results.csv")
-print(f"\nAverage procedures extracted:")
-print(f"  WITH RadLex:    {results_df['radlex_count'].mean():.2f}")
-print(f"  WITHOUT RadLex: {results_df['no_radlex_count'].mean():.2f}")
+VARIANTS = {"with_radlex": RADLEX_MODEL, "without_radlex": NO_RADLEX_MODEL}
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def load_test_split():
+    test_df = pd.read_json(TEST_DATA, lines=True).iloc[TEST_START:TEST_END]
+    reference_df = pd.read_csv(REFERENCE_DATA, usecols=["note_id", REFERENCE_COLUMN])
+    test_df = test_df.merge(reference_df, on="note_id", how="inner")
+    return test_df.sort_values("note_id").reset_index(drop=True)
+
+
+def shard_path(variant, num_shards, shard_index):
+    return RESULTS_DIR / f"{variant}.shard-{shard_index:03d}-of-{num_shards:03d}.jsonl"
+
+
+def run_shard(variant, num_shards, shard_index, batch_size=BATCH_SIZE):
+    from llm.inference import extract_procedures_batch, load_model
+
+    test_df = load_test_split()
+    shard = test_df.iloc[shard_indices(len(test_df), num_shards, shard_index)]
+    checkpoint = ShardCheckpoint(shard_path(variant, num_shards, shard_index))
+    pending = shard[~shard["note_id"].astype(str).isin(checkpoint.done)].copy()
+    if pending.empty:
+        print(f"[{variant} {shard_index}/{num_shards}] already complete ({len(shard)} reports)")
+        return
+
+    if variant == "without_radlex":
+        from llm.data_preparation import load_variant
+
+        # The same reports as prepare-data wrote them before any RadLex context was added
+        no_context = load_variant(DATA_DIR, TEST_SPLIT, "no_context")
+        texts = dict(zip(no_context["note_id"].astype(str), no_context["text"]))
+        pending["text"] = pending["note_id"].astype(str).map(texts)
+        missing = pending["text"].isna()
+        if missing.any():
+            # Never send NaN to the model; these reports are left out of this variant's shard
+            print(f"[{variant} {shard_index}/{num_shards}] {int(missing.sum())} reports have no no_context "
+                  f"text in {DATA_DIR}, skipping: {pending['note_id'][missing].astype(str).tolist()[:10]}")
+            pending = pending[~missing]
+            if pending.empty:
+                return
+    # Length-sorted batches waste far less compute on padding
+    pending = pending.iloc[pending["text"].str.len().argsort()]
+
+    print(f"[{variant} {shard_index}/{num_shards}] {len(pending)} of {len(shard)} reports to evaluate")
+    model, tokenizer = load_model(VARIANTS[variant])
+
+    for start in range(0, len(pending), batch_size):
+        batch = pending.iloc[start:start + batch_size]
+        predictions = extract_procedures_batch(batch["text"].tolist(), model, tokenizer)
+        records = []
+        for note_id, raw_reference, predicted in zip(batch["note_id"], batch[REFERENCE_COLUMN], predictions):
+            reference = parse_reference(raw_reference)
+            tp, fp, fn = score_report(predicted, reference)
+            records.append({
+                "report_id": str(note_id), "predicted": predicted, "reference": reference,
+                "tp": tp, "fp": fp, "fn": fn,
+            })
+        checkpoint.append(records)
+        print(f"[{variant} {shard_index}/{num_shards}] {len(checkpoint.done)}/{len(shard)} reports")
+
+
+def launch_shards(num_shards, variants, gpus, batch_size=BATCH_SIZE):
+    """Run every (variant, shard) job as a subprocess, one job per GPU at a time"""
+    free_gpus = queue.Queue()
+    for gpu in gpus:
+        free_gpus.put(gpu)
+
+    def run(job):
+        variant, shard_index = job
+        gpu = free_gpus.get()
+        try:
+            cmd = [
+                sys.executable, "-m", "ablation_study.compare_models",
+                "--variant", variant, "--num-shards", str(num_shards),
+                "--shard-index", str(shard_index), "--batch-size", str(batch_size),
+            ]
+            env = {**os.environ, "CUDA_VISIBLE_DEVICES": gpu}
+            return job, subprocess.run(cmd, env=env, cwd=REPO_ROOT).returncode
+        finally:
+            free_gpus.put(gpu)
+
+    jobs = [(variant, i) for variant in variants for i in range(num_shards)]
+    with ThreadPoolExecutor(max_workers=len(gpus)) as pool:
+        failed = [job for job, code in pool.map(run, jobs) if code != 0]
+    if failed:
+        print(f"Failed shards (rerun to resume): {failed}")
+    return not failed
+
+
+def aggregate():
+    results = {variant: load_shard_results(RESULTS_DIR, variant) for variant in VARIANTS}
+    shared_ids = sorted(set(results["with_radlex"]) & set(results["without_radlex"]))
+    if not shared_ids:
+        print(f"No reports evaluated by both models in {RESULTS_DIR}")
+        return
+
+    counts = {
+        variant: [[records[i]["tp"], records[i]["fp"], records[i]["fn"]] for i in shared_ids]
+        for variant, records in results.items()
+    }
+    from llm.prompts import BILLING_PROMPT
+
+    summary = {"n_reports": len(shared_ids), "prompt": BILLING_PROMPT.key}
+    for variant in VARIANTS:
+        summary[variant] = bootstrap_ci(counts[variant], n_boot=N_BOOTSTRAP)
+    summary["f1_delta"] = paired_bootstrap_delta(counts["with_radlex"], counts["without_radlex"], n_boot=N_BOOTSTRAP)
+
+    results_df = pd.DataFrame([{
+        "report_id": i,
+        "reference": ", ".join(results["with_radlex"][i]["reference"]),
+        "with_radlex": ", ".join(results["with_radlex"][i]["predicted"]),
+        "without_radlex": ", ".join(results["without_radlex"][i]["predicted"]),
+        "radlex_count": len(results["with_radlex"][i]["predicted"]),
+        "no_radlex_count": len(results["without_radlex"][i]["predicted"]),
+    } for i in shared_ids])
+    results_df.to_csv(RESULTS_DIR / "ablation_results.csv", index=False)
+    with open(RESULTS_DIR / "summary.json", "w") as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"\nEvaluated {len(shared_ids)} reports (95% bootstrap CIs)")
+    for variant in VARIANTS:
+        line = "  ".join(
+            f"{name}={m['value']:.3f} [{m['ci'][0]:.3f}, {m['ci'][1]:.3f}]" for name, m in summary[variant].items()
+        )
+        print(f"  {variant:<15} {line}")
+    delta = summary["f1_delta"]
+    print(f"  F1 delta (with - without): {delta['value']:+.3f} [{delta['ci'][0]:+.3f}, {delta['ci'][1]:+.3f}]")
+    print(f"\nAverage procedures extracted:")
+    print(f"  WITH RadLex:    {results_df['radlex_count'].mean():.2f}")
+    print(f"  WITHOUT RadLex: {results_df['no_radlex_count'].mean():.2f}")
+    print(f"\nResults saved to {RESULTS_DIR}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variant", choices=[*VARIANTS, "both"], default="both")
+    parser.add_argument("--num-shards", type=int, default=1)
+    parser.add_argument("--shard-index", type=int, help="Run a single shard in this process")
+    parser.add_argument("--gpus", default=os.getenv("CUDA_VISIBLE_DEVICES", "0"),
+                        help="Comma-separated GPU ids to spread shards over")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--aggregate", action="store_true", help="Only compute metrics from existing results")
+    args = parser.parse_args()
+
+    if args.aggregate:
+        aggregate()
+        return
+
+    variants = list(VARIANTS) if args.variant == "both" else [args.variant]
+    if args.shard_index is not None:
+        for variant in variants:
+            run_shard(variant, args.num_shards, args.shard_index, args.batch_size)
+        return
+
+    if launch_shards(args.num_shards, variants, args.gpus.split(","), args.batch_size):
+        aggregate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Evaluation helpers for the ablation study: sharding, checkpoints and metrics
+Predictions are scored against reference procedures (CPT codes or billed procedure names)
+"""
+import json
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+
+from llm.inference import normalize_procedure
+
+# Bootstrap resamples are drawn in chunks of at most this many report weights
+BOOT_CHUNK_ELEMENTS = 1 << 22
+
+
+def parse_reference(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return []
+    if isinstance(value, str):
+        value = re.split(r"[,;|]", value)
+    return [v.strip() for v in value if str(v).strip()]
+
+
+def score_report(predicted, reference):
+    """Return (tp, fp, fn) for one report using set semantics over normalized procedures"""
+    pred = {normalize_procedure(p) for p in predicted} - {""}
+    ref = {normalize_procedure(r) for r in reference} - {""}
+    tp = len(pred & ref)
+    return tp, len(pred) - tp, len(ref) - tp
+
+
+def precision_recall_f1(tp, fp, fn):
+    """Micro-averaged metrics; works on scalars or arrays of summed counts"""
+    tp, fp, fn = (np.asarray(x, dtype=np.float64) for x in (tp, fp, fn))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        recall = np.where(tp + fn > 0, tp / (tp + fn), 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+    return precision, recall, f1
+
+
+def resampled_sums(n_boot, *counts, seed=42):
+    """
+    Summed tp/fp/fn per bootstrap resample, (n_boot, 3) for each counts array, all over the
+    same resamples. Each resample is a multinomial weight per report rather than an index
+    array, and weights are drawn in chunks, so memory stays bounded however many reports.
+    """
+    counts = [np.asarray(c, dtype=np.int64).reshape(-1, 3) for c in counts]
+    n = len(counts[0])
+    rng = np.random.default_rng(seed)
+    pvals = np.full(n, 1.0 / n)
+    chunk = max(1, BOOT_CHUNK_ELEMENTS // n)
+    sums = [np.empty((n_boot, 3), dtype=np.int64) for _ in counts]
+    for start in range(0, n_boot, chunk):
+        weights = rng.multinomial(n, pvals, size=min(chunk, n_boot - start))
+        for out, c in zip(sums, counts):
+            out[start:start + len(weights)] = weights @ c
+    return sums
+
+
+def bootstrap_ci(counts, n_boot=1000, alpha=0.05, seed=42):
+    """Percentile bootstrap over reports. counts is an (n_reports, 3) array of tp/fp/fn"""
+    counts = np.asarray(counts, dtype=np.int64).reshape(-1, 3)
+    sums, = resampled_sums(n_boot, counts, seed=seed)
+    samples = precision_recall_f1(sums[:, 0], sums[:, 1], sums[:, 2])
+    point = precision_recall_f1(*counts.sum(axis=0))
+    bounds = [100 * alpha / 2, 100 * (1 - alpha / 2)]
+    return {
+        name: {"value": float(p), "ci": [float(b) for b in np.percentile(s, bounds)]}
+        for name, p, s in zip(("precision", "recall", "f1"), point, samples)
+    }
+
+
+def paired_bootstrap_delta(counts_a, counts_b, n_boot=1000, alpha=0.05, seed=42):
+    """CI for F1(a) - F1(b) when both systems were scored on the same reports"""
+    counts_a = np.asarray(counts_a, dtype=np.int64).reshape(-1, 3)
+    counts_b = np.asarray(counts_b, dtype=np.int64).reshape(-1, 3)
+    sums_a, sums_b = resampled_sums(n_boot, counts_a, counts_b, seed=seed)
+    delta = precision_recall_f1(*sums_a.T)[2] - precision_recall_f1(*sums_b.T)[2]
+    point = precision_recall_f1(*counts_a.sum(axis=0))[2] - precision_recall_f1(*counts_b.sum(axis=0))[2]
+    return {
+        "value": float(point),
+        "ci": [float(b) for b in np.percentile(delta, [100 * alpha / 2, 100 * (1 - alpha / 2)])],
+        "p_le_zero": float((delta <= 0).mean()),
+    }
+
+
+def shard_indices(n, num_shards, shard_index):
+    """Strided assignment keeps long and short reports spread evenly across shards"""
+    if not 0 <= shard_index < num_shards:
+        raise ValueError(f"shard_index must be in [0, {num_shards}), got {shard_index}")
+    return np.arange(shard_index, n, num_shards)
+
+
+class ShardCheckpoint:
+    """Append-only JSONL of finished reports so an interrupted shard resumes where it stopped"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.done = set()
+        if self.path.exists():
+            for record in read_jsonl(self.path):
+                self.done.add(str(record["report_id"]))
+            # Terminate a line left half-written by a killed worker before appending
+            with open(self.path, "rb+") as f:
+                if f.seek(0, os.SEEK_END) > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")
+
+    def append(self, records):
+        with open(self.path, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.done.update(str(r["report_id"]) for r in records)
+
+
+def read_jsonl(path):
+    records = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A partially written line from a killed worker
+                continue
+    return records
+
+
+def load_shard_results(results_dir, variant):
+    """Merge every shard checkpoint for a variant, keeping one record per report"""
+    merged = {}
+    for path in sorted(Path(results_dir).glob(f"{variant}.shard-*.jsonl")):
+        for record in read_jsonl(path):
+            merged[str(record["report_id"])] = record
+    return merged
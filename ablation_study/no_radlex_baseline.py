@@ -7,14 +7,16 @@ os.environ["CUDA_VISIBLE_DEVICES"] = "0"
 
 from unsloth import FastLanguageModel, UnslothTrainer, UnslothTrainingArguments
 import torch
-import pandas as pd
 import json
 from pathlib import Path
 from datasets import Dataset
 import wandb
 
+from llm.data_preparation import load_variant
+from llm.prompts import BILLING_PROMPT
+
 # Config
-DATA_DIR = Path("YOUR_NO_RADLEX_DATA_DIR")  # Data without RadLex context
+DATA_DIR = Path("YOUR_DATA_DIR")  # prepare-data output; the no_context column has no RadLex context
 OUTPUT_DIR = Path("YOUR_OUTPUT_DIR")
 MODEL_NAME = "unsloth/medgemma-27b-text-it"
 MAX_SEQ_LENGTH = 4096
@@ -32,9 +34,12 @@ WANDB_RUN_NAME = "medgemma-27b-NO-RADLEX-baseline"
 
 OUTPUT_DIR.mkdir(exist_ok=True)
 
-# Load datasets (WITHOUT RadLex)
-train_df = pd.read_json(DATA_DIR / "train_dataset.jsonl", lines=True)
-val_df = pd.read_json(DATA_DIR / "val_dataset.jsonl", lines=True)
+# Load datasets (WITHOUT RadLex): same reports and split as the RadLex run
+train_df = load_variant(DATA_DIR, "train", "no_context")
+val_df = load_variant(DATA_DIR, "val", "no_context")
+# Train on exactly the prompt that inference sends
+for df in (train_df, val_df):
+    df['text'] = df['text'].map(lambda text: BILLING_PROMPT.render(report=text))
 train_dataset = Dataset.from_pandas(train_df[['text']]).select(range(TRAIN_SAMPLES))
 val_dataset = Dataset.from_pandas(val_df[['text']]).select(range(VAL_SAMPLES))
 
@@ -105,6 +110,7 @@ model.save_pretrained(str(lora_dir))
 tokenizer.save_pretrained(str(lora_dir))
 
 with open(OUTPUT_DIR / "training_info.json", 'w') as f:
-    json.dump({"model": MODEL_NAME, "train_samples": TRAIN_SAMPLES, "loss": float(trainer_stats.training_loss), "type": "NO-RADLEX-BASELINE"}, f)
+    json.dump({"model": MODEL_NAME, "train_samples": TRAIN_SAMPLES, "loss": float(trainer_stats.training_loss), "type": "NO-RADLEX-BASELINE",
+               "prompt": BILLING_PROMPT.key}, f)
 
 wandb.finish()
@@ -0,0 +1 @@
+"""Synthetic-fixture benchmarks for retrieval and the data pipeline"""
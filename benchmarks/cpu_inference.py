@@ -0,0 +1,110 @@
+"""
+Latency and throughput of int8 CPU exports against the merged fp16 model
+    python -m benchmarks.cpu_inference OUTPUT_DIR/full_model cpu_torch cpu_onnx \\
+        --reports reports.csv --batch-sizes 1,8 --threads 8 --output cpu_bench.json
+
+Every model decodes the same reports greedily. Per batch size it reports per-batch latency
+percentiles, reports/s, generated tokens/s, the speed-up over the fp16 baseline and how
+often the int8 output matches the baseline exactly. The baseline runs on --baseline-device
+(cpu by default; cuda gives the GPU reference the exports are replacing).
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+
+from benchmarks.run import git_commit, latency_summary, throughput
+from llm import cpu_inference
+
+
+def bench_model(model, tokenizer, texts, batch_size, max_new_tokens):
+    # One warm-up batch so lazy allocation and kernel selection are not timed
+    cpu_inference.generate(texts[:batch_size], model, tokenizer, batch_size, max_new_tokens)
+    batch_seconds, tokens = [], [0]
+
+    def on_batch(n_reports, n_tokens, seconds):
+        batch_seconds.append(seconds)
+        tokens[0] += n_tokens
+
+    start = time.perf_counter()
+    outputs = cpu_inference.generate(texts, model, tokenizer, batch_size, max_new_tokens, on_batch)
+    elapsed = time.perf_counter() - start
+    return outputs, {
+        "batch_latency": latency_summary(batch_seconds),
+        "reports": throughput(len(texts), elapsed),
+        "generated_tokens": throughput(tokens[0], elapsed),
+    }
+
+
+def run(args):
+    import pandas as pd
+
+    texts = pd.read_csv(args.reports, usecols=["text"])["text"].dropna().head(args.limit).tolist()
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+    results = {
+        "meta": {
+            "git_commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "params": {k: v for k, v in vars(args).items() if k != "output"},
+        },
+        "models": {},
+    }
+
+    print(f"Baseline fp16 on {args.baseline_device}...")
+    model, tokenizer = cpu_inference.load_baseline(args.baseline_dir, args.baseline_device, args.threads)
+    baseline = {}
+    results["models"]["fp16"] = {}
+    for batch_size in batch_sizes:
+        baseline[batch_size], results["models"]["fp16"][str(batch_size)] = bench_model(
+            model, tokenizer, texts, batch_size, args.max_new_tokens)
+    del model
+
+    for export_dir in args.exports:
+        with open(f"{export_dir}/{cpu_inference.EXPORT_INFO}") as f:
+            name = json.load(f)["runtime"]
+        print(f"{name} from {export_dir}...")
+        model, tokenizer = cpu_inference.load_cpu_model(export_dir, args.threads)
+        results["models"][name] = {}
+        for batch_size in batch_sizes:
+            outputs, stats = bench_model(model, tokenizer, texts, batch_size, args.max_new_tokens)
+            reference = results["models"]["fp16"][str(batch_size)]
+            stats["speedup"] = stats["reports"]["per_second"] / reference["reports"]["per_second"]
+            stats["exact_match_vs_fp16"] = sum(
+                a == b for a, b in zip(outputs, baseline[batch_size])) / max(len(outputs), 1)
+            results["models"][name][str(batch_size)] = stats
+        del model
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline_dir", help="Merged fp16 full_model directory")
+    parser.add_argument("exports", nargs="+", help="Directories written by python -m llm.cpu_inference export")
+    parser.add_argument("--reports", required=True, help="CSV with a text column")
+    parser.add_argument("--limit", type=int, default=64)
+    parser.add_argument("--batch-sizes", default="1,8")
+    parser.add_argument("--threads", type=int, default=cpu_inference.THREADS)
+    parser.add_argument("--max-new-tokens", type=int, default=cpu_inference.MAX_NEW_TOKENS)
+    parser.add_argument("--baseline-device", default="cpu")
+    parser.add_argument("--output", default="cpu_inference_results.json")
+    args = parser.parse_args()
+
+    results = run(args)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved {args.output}")
+    for name, by_batch in results["models"].items():
+        for batch_size, r in by_batch.items():
+            extra = (f" speedup={r['speedup']:.2f}x match={r['exact_match_vs_fp16']:.0%}"
+                     if "speedup" in r else "")
+            print(f"{name:<11} batch={batch_size:<3} p50={r['batch_latency']['p50_ms']:.0f}ms "
+                  f"p95={r['batch_latency']['p95_ms']:.0f}ms {r['reports']['per_second']:.2f} reports/s "
+                  f"{r['generated_tokens']['per_second']:.1f} tok/s{extra}")
+
+
+if __name__ == "__main__":
+    main()
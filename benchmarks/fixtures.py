@@ -0,0 +1,142 @@
+"""
+Synthetic RadLex-shaped ontology and radiology report corpus for benchmarks
+Concepts have the same fields as graphrag.ontology_import.extract_radlex output, the
+hierarchy is a balanced tree of SUBCLASSOF edges, and reports mention concept names inside
+templated sections, with a share of exact and near duplicates as in real corpora.
+"""
+import zlib
+
+import numpy as np
+import pandas as pd
+
+RID_BASE = "http://www.radlex.org/RID/"
+HIERARCHY_REL = "RDF_SCHEMA_SUBCLASSOF"
+TYPED_RELS = ("PART_OF", "HAS_PART", "CONTAINED_IN", "ANATOMICAL_SITE", "MAY_CAUSE", "HAS_SUBTYPE")
+HIERARCHY_FANOUT = 6
+TYPED_EDGES_PER_CONCEPT = 1.5
+
+MODALITIES = ["CT", "MRI", "ultrasound", "radiograph", "PET", "fluoroscopy", "mammography", "angiography"]
+ANATOMY = ["abdomen", "pelvis", "chest", "head", "neck", "spine", "liver", "kidney", "lung", "heart",
+           "brain", "knee", "shoulder", "hip", "breast", "thyroid", "pancreas", "spleen", "bladder", "colon"]
+QUALIFIERS = ["with contrast", "without contrast", "left", "right", "bilateral", "limited", "complete",
+              "lateral", "posterior", "anterior", "upper", "lower", "proximal", "distal"]
+FINDINGS = ["mass", "nodule", "cyst", "fracture", "effusion", "lesion", "calcification", "stenosis",
+            "hemorrhage", "edema", "opacity", "thickening"]
+FILLER = ["No acute abnormality.", "Stable compared to prior.", "Clinical correlation recommended.",
+          "Findings discussed with the referring physician.", "Normal size and contour.",
+          "No evidence of metastatic disease."]
+
+
+def _name(rng, i):
+    parts = [rng.choice(MODALITIES) if i % 3 == 0 else rng.choice(FINDINGS), rng.choice(ANATOMY)]
+    if rng.random() < 0.5:
+        parts.append(rng.choice(QUALIFIERS))
+    return f"{' '.join(parts)} {i}"
+
+
+def synthetic_ontology(n_concepts=46000, seed=0):
+    """(concepts, relationships_by_type) shaped like extract_radlex()"""
+    rng = np.random.default_rng(seed)
+    concepts = []
+    for i in range(n_concepts):
+        name = _name(rng, i)
+        uri = f"{RID_BASE}RID{i + 1}"
+        concepts.append({
+            "uri": uri,
+            "rid": f"RID{i + 1}",
+            "label": name,
+            "preferredName": name,
+            "definition": f"{name.capitalize()}. " + " ".join(rng.choice(FILLER, size=rng.integers(1, 4))),
+            "synonyms": [name.replace("with contrast", "w contrast")] if "with contrast" in name else [],
+            "fmaid": None,
+            "umlsId": None,
+            "umlsTerm": None,
+        })
+
+    uris = np.array([c["uri"] for c in concepts])
+    relationships_by_type = {}
+    # Node i's parent always comes before it, which keeps the hierarchy a tree
+    children = np.arange(1, n_concepts)
+    parents = (children - 1) // HIERARCHY_FANOUT
+    relationships_by_type[HIERARCHY_REL] = [
+        {"source": s, "target": t} for s, t in zip(uris[children], uris[parents])
+    ]
+    n_typed = int(n_concepts * TYPED_EDGES_PER_CONCEPT)
+    sources = rng.integers(0, n_concepts, n_typed)
+    targets = rng.integers(0, n_concepts, n_typed)
+    types = rng.integers(0, len(TYPED_RELS), n_typed)
+    for k, rel_type in enumerate(TYPED_RELS):
+        pick = (types == k) & (sources != targets)
+        relationships_by_type[rel_type] = [
+            {"source": s, "target": t} for s, t in zip(uris[sources[pick]], uris[targets[pick]])
+        ]
+    return concepts, relationships_by_type
+
+
+def backend_records(concepts, relationships_by_type, embeddings):
+    """Inputs for InMemoryGraphBackend.from_records"""
+    rid_of = {c["uri"]: c["rid"] for c in concepts}
+    records = [
+        {"rid": c["rid"], "name": c["preferredName"] or c["label"], "definition": c["definition"] or "",
+         "synonyms": c["synonyms"], "embedding": vector}
+        for c, vector in zip(concepts, embeddings.tolist())
+    ]
+    edges = [
+        (rel_type, rid_of[r["source"]], rid_of[r["target"]])
+        for rel_type, rels in relationships_by_type.items() for r in rels
+    ]
+    return records, edges
+
+
+def concept_texts(concepts):
+    """Embedding input, built the same way as vector_embeddings.main"""
+    return [c["label"] + (": " + c["definition"] if c["definition"] else "") for c in concepts]
+
+
+def synthetic_reports(concepts, n_reports=2000, duplicate_rate=0.2, seed=0):
+    """DataFrame with note_id, subject_id, text, like the MIMIC-style input to data_preparation"""
+    rng = np.random.default_rng(seed)
+    names = [c["preferredName"] for c in concepts]
+    rows = []
+    for i in range(n_reports):
+        if rows and rng.random() < duplicate_rate:
+            # Templated duplicate: same text, sometimes with different spacing
+            text = rows[rng.integers(0, len(rows))]["text"]
+            if rng.random() < 0.5:
+                text = text.replace("\n\n", "\n")
+        else:
+            exam = names[rng.integers(0, len(names))]
+            mentions = [names[j] for j in rng.integers(0, len(names), rng.integers(1, 5))]
+            text = (
+                f"EXAMINATION: {exam}\n\n"
+                f"INDICATION: ___ year old with {rng.choice(FINDINGS)} of the {rng.choice(ANATOMY)}.\n\n"
+                f"TECHNIQUE: {rng.choice(MODALITIES)} of the {rng.choice(ANATOMY)} {rng.choice(QUALIFIERS)}.\n\n"
+                f"FINDINGS: {' '.join(rng.choice(FILLER, size=3))} {'. '.join(mentions)}.\n\n"
+                f"IMPRESSION: {mentions[0]}. {rng.choice(FILLER)}"
+            )
+        rows.append({"note_id": f"N{i:08d}", "subject_id": int(rng.integers(1e7, 2e7)), "text": text})
+    return pd.DataFrame(rows)
+
+
+class HashingEncoder:
+    """Deterministic bag-of-token-hashes embeddings, a model-free stand-in for the encoder"""
+
+    def __init__(self, dim=384):
+        self.dim = dim
+        self._vectors = {}
+
+    def _token_vector(self, token):
+        vector = self._vectors.get(token)
+        if vector is None:
+            rng = np.random.default_rng(zlib.crc32(token.encode()))
+            vector = self._vectors[token] = rng.standard_normal(self.dim).astype(np.float32)
+        return vector
+
+    def __call__(self, texts):
+        if isinstance(texts, str):
+            texts = [texts]
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for token in text.lower().split():
+                out[i] += self._token_vector(token)
+        return out
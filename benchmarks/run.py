@@ -0,0 +1,273 @@
+"""
+Retrieval and pipeline benchmarks on a synthetic RadLex-shaped ontology
+    python -m benchmarks.run --concepts 46000 --reports 2000 --output bench.json
+    python -m benchmarks.run --baseline bench.json      # exit 1 on a regression
+    python -m benchmarks.run --backends neo4j --encoder model --allow-wipe
+
+Measures embedding throughput, then per-report retrieval latency (p50/p95/p99) and
+dataset-build throughput for each backend:
+    memory  InMemoryGraphBackend built from the fixtures
+    cached  the same behind retrieval.CachedBackend
+    neo4j   imports the fixtures into NEO4J_URI (import throughput is measured too).
+            This DELETES every RadLexConcept there first, so it only runs with --allow-wipe;
+            point it at a scratch container:
+            docker run -p 7687:7687 -e NEO4J_AUTH=neo4j/benchmark neo4j:5
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks import fixtures
+from graphrag import retrieval
+
+BACKENDS = ("memory", "cached", "neo4j")
+EMBED_BATCH = 256
+# Metric suffixes with a better direction; other numbers are workload sizes, raw elapsed seconds
+# that per_second already covers, or write settings the scheduler adapts per run
+HIGHER_BETTER = ("per_second",)
+LOWER_BETTER = ("_ms", "_seconds", ".retries", ".splits")
+
+
+def latency_summary(seconds):
+    ms = np.asarray(seconds) * 1000
+    return {
+        "count": len(ms),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+
+def throughput(items, seconds):
+    return {"items": items, "seconds": seconds, "per_second": items / seconds if seconds > 0 else 0.0}
+
+
+def bench_embedding(encode, texts, batch_size=EMBED_BATCH):
+    start = time.perf_counter()
+    vectors = [np.asarray(encode(texts[i:i + batch_size]), dtype=np.float32)
+               for i in range(0, len(texts), batch_size)]
+    return np.concatenate(vectors), throughput(len(texts), time.perf_counter() - start)
+
+
+def bench_neo4j_import(concepts, relationships_by_type, embeddings):
+    from graphrag import graph_db, ontology_import, vector_embeddings
+    from graphrag.write_scheduler import WriteScheduler
+
+    with graph_db.session() as session:
+        session.run("MATCH (n:RadLexConcept) DETACH DELETE n")
+    n_rels = sum(len(rels) for rels in relationships_by_type.values())
+    start = time.perf_counter()
+    import_writes = ontology_import.import_radlex(concepts, relationships_by_type)
+    imported = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with graph_db.session() as session:
+        session.execute_write(vector_embeddings.create_vector_index)
+        with WriteScheduler() as writer:
+            rows = [{"rid": c["rid"], "embedding": v} for c, v in zip(concepts, embeddings.tolist())]
+            writer.submit(vector_embeddings.update_embeddings, rows, model_name="benchmark-hashing")
+        session.run("CALL db.awaitIndexes(600)")
+    return {
+        "concepts_and_relationships": throughput(len(concepts) + n_rels, imported),
+        "embeddings": throughput(len(concepts), time.perf_counter() - start),
+        "writes": {"import": import_writes, "embeddings": writer.summary()},
+    }
+
+
+def bench_retrieval(backend, texts, top_k, depth):
+    retrieval.build_radlex_context(backend, texts[0], top_k, depth)
+    seconds = []
+    for text in texts:
+        start = time.perf_counter()
+        retrieval.build_radlex_context(backend, text, top_k, depth)
+        seconds.append(time.perf_counter() - start)
+    return latency_summary(seconds)
+
+
+def bench_dataset_build(backend, df, top_k, depth):
+    """
+    Reports to training examples with every ablation variant through
+    data_preparation.process_dataframe, so retrieval runs once per duplicate cluster as in
+    prepare-data. Clustering is timed as part of the build.
+    """
+    from llm import data_preparation, dedup
+
+    # process_dataframe reads its retrieval settings from the module config
+    data_preparation.RADLEX_TOP_K = top_k
+    data_preparation.GRAPH_DEPTH = depth
+    start = time.perf_counter()
+    df = df.assign(cluster=dedup.cluster_ids(df["text"]))
+    examples = data_preparation.process_dataframe(df, "benchmark", backend)
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(Path(tmp) / "dataset.jsonl", "w") as f:
+            for example in examples:
+                f.write(json.dumps(example) + "\n")
+    return throughput(len(examples), time.perf_counter() - start)
+
+
+def make_backend(name, records, edges, encoder, vector_dtype):
+    if name == "neo4j":
+        from graphrag import neo4j_backend
+
+        return neo4j_backend
+    from graphrag.memory_backend import InMemoryGraphBackend
+
+    backend = InMemoryGraphBackend.from_records(records, edges, encoder, vector_dtype)
+    return retrieval.CachedBackend(backend) if name == "cached" else backend
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    backends = args.backends.split(",")
+    unknown = set(backends) - set(BACKENDS)
+    if unknown:
+        raise ValueError(f"Unknown backends {sorted(unknown)}; expected some of {BACKENDS}")
+    if "neo4j" in backends and args.encoder != "model":
+        # neo4j_backend always encodes queries with the real model
+        raise ValueError("The neo4j backend needs --encoder model")
+    if "neo4j" in backends and not args.allow_wipe:
+        raise ValueError("The neo4j backend deletes every RadLexConcept in NEO4J_URI first; "
+                         "rerun with --allow-wipe against a scratch database")
+
+    print(f"Generating {args.concepts} concepts and {args.reports} reports...")
+    concepts, relationships_by_type = fixtures.synthetic_ontology(args.concepts, args.seed)
+    reports = fixtures.synthetic_reports(concepts, args.reports, args.duplicate_rate, args.seed)
+    if args.encoder == "model":
+        from graphrag import embedding
+
+        encode = embedding.encode
+    else:
+        encode = fixtures.HashingEncoder()
+
+    results = {
+        "meta": {
+            "git_commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "params": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        },
+        "backends": {},
+    }
+    print("Embedding concepts...")
+    embeddings, results["embedding"] = bench_embedding(encode, fixtures.concept_texts(concepts))
+    records, edges = fixtures.backend_records(concepts, relationships_by_type, embeddings)
+    if "neo4j" in backends:
+        print("Importing into Neo4j...")
+        results["neo4j_import"] = bench_neo4j_import(concepts, relationships_by_type, embeddings)
+
+    texts = reports["text"].tolist()
+    for name in backends:
+        print(f"Benchmarking {name}...")
+        start = time.perf_counter()
+        backend = make_backend(name, records, edges, encode, args.vector_dtype)
+        setup = time.perf_counter() - start
+        results["backends"][name] = {
+            "setup_seconds": setup,
+            "retrieval": bench_retrieval(backend, texts, args.top_k, args.depth),
+            # A fresh backend, so the cached variant does not start warm
+            "dataset_build": bench_dataset_build(make_backend(name, records, edges, encode, args.vector_dtype),
+                                                 reports, args.top_k, args.depth),
+        }
+    if "neo4j" in backends:
+        from graphrag import graph_db
+
+        results["neo4j_query_metrics"] = graph_db.METRICS.report()
+        graph_db.close()
+    return results
+
+
+def _flatten(tree, prefix=""):
+    flat = {}
+    for key, value in tree.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(baseline, current, tolerance=0.2):
+    """
+    (regressions, changes) between two results files. Regressions are metrics with a better
+    direction (HIGHER_BETTER / LOWER_BETTER) that got worse by more than tolerance; changes are
+    every other number that moved by more than tolerance or is missing from one run, listed so
+    that a different workload or write setting is visible next to the regressions it explains.
+    """
+    old, new = _flatten(baseline), _flatten(current)
+    regressions, changes = [], []
+    for key in sorted(old.keys() | new.keys()):
+        if key.startswith("meta."):
+            continue
+        if key not in old or key not in new:
+            changes.append(f"{key}: only in the {'baseline' if key in old else 'current run'}")
+            continue
+        before, after = old[key], new[key]
+        if before == after:
+            continue
+        change = (after - before) / abs(before) if before else float("inf")
+        if key.endswith(HIGHER_BETTER + LOWER_BETTER):
+            worse = -change if key.endswith(HIGHER_BETTER) else change
+            if worse > tolerance:
+                regressions.append(f"{key}: {before:.4g} -> {after:.4g} ({worse:+.0%} worse)")
+        elif abs(change) > tolerance:
+            changes.append(f"{key}: {before:.4g} -> {after:.4g} ({change:+.0%})")
+    return regressions, changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concepts", type=int, default=46000)
+    parser.add_argument("--reports", type=int, default=2000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.2)
+    parser.add_argument("--backends", default="memory,cached", help=f"Comma-separated subset of {BACKENDS}")
+    parser.add_argument("--encoder", choices=("hash", "model"), default="hash",
+                        help="hash avoids loading torch; model uses graphrag.embedding")
+    parser.add_argument("--vector-dtype", default="float32")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Earlier results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--allow-wipe", action="store_true",
+                        help="Let the neo4j backend delete every RadLexConcept in NEO4J_URI")
+    args = parser.parse_args()
+
+    results = run(args)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved {args.output}")
+    for name, r in results["backends"].items():
+        print(f"{name:<8} p50={r['retrieval']['p50_ms']:.2f}ms p95={r['retrieval']['p95_ms']:.2f}ms "
+              f"p99={r['retrieval']['p99_ms']:.2f}ms build={r['dataset_build']['per_second']:.1f} reports/s")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions, changes = compare(json.load(f), results, args.tolerance)
+        for line in changes:
+            print(f"CHANGED {line}")
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
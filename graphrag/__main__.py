@@ -0,0 +1,231 @@
+"""
+Single entry point for the GraphRAG tools
+    python -m graphrag <command> [options]
+
+Each command imports only what it needs, so lightweight commands such as
+stats and context never load torch or the embedding model.
+"""
+import argparse
+import json
+import time
+
+
+def cmd_import(args):
+    from graphrag import ontology_import
+
+    ontology_import.main(args.owl or ontology_import.RADLEX_OWL, assume_yes=args.yes)
+
+
+def cmd_sync(args):
+    from graphrag import ontology_import, ontology_sync
+
+    ontology_sync.main(args.owl or ontology_import.RADLEX_OWL, dry_run=args.dry_run)
+
+
+def cmd_import_subclasses(args):
+    from graphrag import subclass_import
+
+    subclass_import.main(args.owl or subclass_import.RADLEX_OWL)
+
+
+def cmd_reset_embeddings(args):
+    from graphrag import test
+
+    test.main()
+
+
+def cmd_embed(args):
+    from graphrag import vector_embeddings
+
+    vector_embeddings.main(batch_size=args.batch_size, jobs_dir=args.jobs_dir or vector_embeddings.JOBS_DIR)
+
+
+def cmd_jobs(args):
+    from graphrag.jobs import list_jobs
+
+    for manifest in list_jobs(args.path):
+        print(json.dumps({**manifest.status(), "params": manifest.params}))
+
+
+def cmd_stats(args):
+    from graphrag import graph_db
+
+    counts = graph_db.read("""
+        MATCH (c:RadLexConcept)
+        RETURN count(c) as concepts, count(c.embedding) as embedded
+    """, name="stats")[0]
+    rel_types = graph_db.read("""
+        CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType
+    """, name="relationship_types")
+    counts["relationship_types"] = sorted(r["relationshipType"] for r in rel_types)
+    print(json.dumps(counts, indent=2))
+    graph_db.close()
+
+
+def cmd_search(args):
+    from graphrag import graph_db
+    from graphrag.retrieval import get_backend
+
+    for concept in get_backend().semantic_search(args.text, limit=args.top_k):
+        print(f"{concept['score']:.3f}  [{concept['rid']}] {concept['name']}")
+    graph_db.close()
+
+
+def cmd_mentions(args):
+    from graphrag import graph_db
+    from graphrag.retrieval import get_backend
+
+    for concept in get_backend().lexical_search(args.text, limit=args.top_k):
+        print(f"{concept['mention']!r:<32} [{concept['rid']}] {concept['name']}")
+    graph_db.close()
+
+
+def cmd_context(args):
+    from graphrag import graph_db
+    from graphrag.retrieval import get_backend
+
+    for item in get_backend().get_concept_context(args.rid, depth=args.depth):
+        print(f"{item['rel_type']:<32} {item['name']}")
+    graph_db.close()
+
+
+def cmd_snapshot(args):
+    from graphrag import graph_db
+    from graphrag.memory_backend import export_snapshot
+
+    backend = export_snapshot(args.path)
+    print(f"Saved {len(backend.rids)} concepts and {len(backend.adjacency)} relationship types to {args.path}")
+    graph_db.close()
+
+
+def cmd_fragments(args):
+    from graphrag import graph_db
+    from graphrag.fragments import FragmentStore
+    from graphrag.retrieval import get_backend, list_concepts
+
+    backend = get_backend()
+    concepts = list_concepts(backend)
+    FragmentStore(backend).precompute(concepts, args.depth).save(args.path)
+    print(f"Saved {len(concepts)} fragments (depth {args.depth}) to {args.path}")
+    graph_db.close()
+
+
+def cmd_features(args):
+    from graphrag import graph_features
+
+    graph_features.main(snapshot=args.snapshot, write_back=not args.no_write)
+
+
+def cmd_index_recall(args):
+    import numpy as np
+
+    from graphrag.vector_index import recall_report
+
+    embeddings = np.load(f"{args.snapshot}/graph.npz")["embeddings"]
+    for row in recall_report(embeddings, args.dtype.split(","), n_queries=args.queries, k=args.top_k):
+        print(f"{row['dtype']:<8} recall@{row['k']}={row['recall_at_k']:.4f}  "
+              f"{row['megabytes']:.1f} MB  {row['ms_per_query']:.3f} ms/query batched  "
+              f"{row['ms_single_query']:.2f} ms single query")
+
+
+def cmd_demo(args):
+    from graphrag import query_test
+
+    query_test.main()
+
+
+def cmd_prepare_data(args):
+    from llm import data_preparation
+
+    data_preparation.main()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m graphrag", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--timing", action="store_true", help="Print per-stage timings and wall-clock time on exit")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("import", help="Delete the graph and import RadLex with all relationship types")
+    p.add_argument("--owl", help="Path to RadLex.owl")
+    p.add_argument("--yes", action="store_true", help="Skip the delete confirmation")
+    p.set_defaults(func=cmd_import)
+
+    p = commands.add_parser("sync", help="Apply only the changes between RadLex.owl and the live graph")
+    p.add_argument("--owl", help="Path to RadLex.owl")
+    p.add_argument("--dry-run", action="store_true", help="Print the change counts without writing")
+    p.set_defaults(func=cmd_sync)
+
+    p = commands.add_parser("import-subclasses", help="Import RadLex concepts with SUBCLASS_OF only")
+    p.add_argument("--owl", help="Path to Radlex.owl")
+    p.set_defaults(func=cmd_import_subclasses)
+
+    p = commands.add_parser("reset-embeddings", help="Drop the vector index and stored embeddings")
+    p.set_defaults(func=cmd_reset_embeddings)
+
+    p = commands.add_parser("embed", help="Embed concepts that have no embedding yet (resumable, multi-worker)")
+    p.add_argument("--batch-size", type=int, default=100)
+    p.add_argument("--jobs-dir", help="Job manifest directory shared by workers (default: $GRAPHRAG_JOBS_DIR or jobs)")
+    p.set_defaults(func=cmd_embed)
+
+    p = commands.add_parser("jobs", help="Progress and parameters of every job manifest under PATH")
+    p.add_argument("path", nargs="?", default="jobs")
+    p.set_defaults(func=cmd_jobs)
+
+    p = commands.add_parser("stats", help="Concept, embedding and relationship-type counts")
+    p.set_defaults(func=cmd_stats)
+
+    p = commands.add_parser("search", help="Vector search for concepts similar to TEXT")
+    p.add_argument("text")
+    p.add_argument("--top-k", type=int, default=10)
+    p.set_defaults(func=cmd_search)
+
+    p = commands.add_parser("mentions", help="RadLex labels and synonyms that occur verbatim in TEXT")
+    p.add_argument("text")
+    p.add_argument("--top-k", type=int, default=10)
+    p.set_defaults(func=cmd_mentions)
+
+    p = commands.add_parser("context", help="Graph neighbourhood of a concept")
+    p.add_argument("rid")
+    p.add_argument("--depth", type=int, default=2)
+    p.set_defaults(func=cmd_context)
+
+    p = commands.add_parser("snapshot", help="Export the graph for the in-memory backend")
+    p.add_argument("path")
+    p.set_defaults(func=cmd_snapshot)
+
+    p = commands.add_parser("fragments", help="Pre-render every concept's context block and neighbourhood")
+    p.add_argument("path")
+    p.add_argument("--depth", type=int, default=2)
+    p.set_defaults(func=cmd_fragments)
+
+    p = commands.add_parser("features", help="Degree, hierarchy depth, subtree size, PageRank and hub score per concept")
+    p.add_argument("--snapshot", help="Also save features.npz into this snapshot directory")
+    p.add_argument("--no-write", action="store_true", help="Do not write the features back as node properties")
+    p.set_defaults(func=cmd_features)
+
+    p = commands.add_parser("index-recall", help="Recall and memory of quantized exact search vs float32")
+    p.add_argument("snapshot")
+    p.add_argument("--dtype", default="float32,float16,int8")
+    p.add_argument("--queries", type=int, default=1000)
+    p.add_argument("--top-k", type=int, default=10)
+    p.set_defaults(func=cmd_index_recall)
+
+    p = commands.add_parser("demo", help="Run the example GraphRAG questions")
+    p.set_defaults(func=cmd_demo)
+
+    p = commands.add_parser("prepare-data", help="Build the RadLex-augmented training dataset")
+    p.set_defaults(func=cmd_prepare_data)
+
+    args = parser.parse_args()
+    start = time.perf_counter()
+    args.func(args)
+    if args.timing:
+        from graphrag import tracing
+
+        print(tracing.REGISTRY.report())
+        print(f"Done in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
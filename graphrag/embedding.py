@@ -0,0 +1,25 @@
+"""
+Lazily loaded sentence-embedding model shared by every graphrag and llm module
+Loading pulls in torch, so nothing touches it until the first encode
+"""
+import threading
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+EMBEDDING_DIM = 384
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    global _model
+    with _model_lock:
+        if _model is None:
+            from sentence_transformers import SentenceTransformer
+
+            _model = SentenceTransformer(EMBEDDING_MODEL)
+        return _model
+
+
+def encode(texts, batch_size=64):
+    return get_model().encode(texts, batch_size=batch_size)
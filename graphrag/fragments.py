@@ -0,0 +1,126 @@
+"""
+Pre-rendered per-concept context fragments
+A concept's block in the RadLex context (name, truncated definition, grouped relatives)
+depends only on the concept, the graph depth and the rendering options, so it is rendered
+once and reused. A report's context is then mostly string joins.
+
+    python -m graphrag fragments radlex_fragments.json --depth 2
+    GRAPH_FRAGMENTS=radlex_fragments.json python -m graphrag prepare-data
+
+Re-ranked contexts pick relatives per report, so there the store supplies the cached header
+and the wider neighbourhood the relatives are chosen from; with a precomputed file neither
+mode queries the graph for a stored concept. Rebuild the file whenever the ontology changes.
+"""
+import json
+
+DEFINITION_CHARS = 200
+NAMES_PER_GROUP = 5
+CONTEXT_HEADER = "RadLex Knowledge Graph Context:"
+# Neighbourhood sizes that re-ranking chooses relatives from
+RANKED_HIERARCHY_LIMIT = 10
+RANKED_TYPED_LIMIT = 20
+
+
+def render_header(concept, definition_chars=DEFINITION_CHARS):
+    lines = [f"{concept['name']} (RID: {concept['rid']})"]
+    if concept['definition']:
+        lines.append(f"   Definition: {concept['definition'][:definition_chars]}...")
+    return "\n".join(lines)
+
+
+def render_related(related, names_per_group=NAMES_PER_GROUP):
+    rel_groups = {}
+    for item in related:
+        rel_groups.setdefault(item['rel_type'].replace('_', ' ').lower(), []).append(item['name'])
+    return [f"   {rel_type.title()}: {', '.join(names[:names_per_group])}" for rel_type, names in rel_groups.items()]
+
+
+def render_fragment(concept, related, definition_chars=DEFINITION_CHARS, names_per_group=NAMES_PER_GROUP):
+    return "\n".join([render_header(concept, definition_chars), *render_related(related, names_per_group)])
+
+
+def assemble(fragments):
+    """Full context text from concept fragments, best first"""
+    if not fragments:
+        return "RadLex Context: None"
+    return "\n".join([CONTEXT_HEADER, *(f"\n{i}. {fragment}" for i, fragment in enumerate(fragments, 1))])
+
+
+class FragmentStore:
+    """Fragments and re-ranking neighbourhoods keyed by (rid, depth) for one backend and one set of options"""
+
+    def __init__(self, backend, definition_chars=DEFINITION_CHARS, names_per_group=NAMES_PER_GROUP,
+                 hierarchy_limit=RANKED_HIERARCHY_LIMIT, typed_limit=RANKED_TYPED_LIMIT):
+        self.backend = backend
+        self.definition_chars = definition_chars
+        self.names_per_group = names_per_group
+        self.hierarchy_limit = hierarchy_limit
+        self.typed_limit = typed_limit
+        self.headers = {}
+        self.fragments = {}
+        self.neighbourhoods = {}
+
+    @property
+    def options(self):
+        return {"definition_chars": self.definition_chars, "names_per_group": self.names_per_group,
+                "hierarchy_limit": self.hierarchy_limit, "typed_limit": self.typed_limit}
+
+    def header(self, concept):
+        text = self.headers.get(concept['rid'])
+        if text is None:
+            text = self.headers[concept['rid']] = render_header(concept, self.definition_chars)
+        return text
+
+    def fragment(self, concept, depth=2):
+        """Header plus the concept's unranked relatives; the graph is queried only on a miss"""
+        key = (concept['rid'], depth)
+        text = self.fragments.get(key)
+        if text is None:
+            related = self.backend.get_concept_context(concept['rid'], depth)
+            text = "\n".join([self.header(concept), *render_related(related, self.names_per_group)])
+            self.fragments[key] = text
+        return text
+
+    def neighbourhood(self, rid, depth=2):
+        """get_concept_context() items that re-ranking chooses from; the graph is queried only on a miss"""
+        key = (rid, depth)
+        items = self.neighbourhoods.get(key)
+        if items is None:
+            items = self.neighbourhoods[key] = self.backend.get_concept_context(
+                rid, depth, hierarchy_limit=self.hierarchy_limit, typed_limit=self.typed_limit)
+        return items
+
+    def ranked_fragment(self, concept):
+        """Cached header plus relatives chosen for this report"""
+        return "\n".join([self.header(concept), *render_related(concept['related'], self.names_per_group)])
+
+    def precompute(self, concepts, depth=2):
+        for concept in concepts:
+            self.fragment(concept, depth)
+            self.neighbourhood(concept['rid'], depth)
+        return self
+
+    def save(self, path):
+        by_depth, neighbourhoods = {}, {}
+        for (rid, depth), text in self.fragments.items():
+            by_depth.setdefault(str(depth), {})[rid] = text
+        for (rid, depth), items in self.neighbourhoods.items():
+            neighbourhoods.setdefault(str(depth), {})[rid] = items
+        with open(path, "w") as f:
+            json.dump({"options": self.options, "headers": self.headers, "fragments": by_depth,
+                       "neighbourhoods": neighbourhoods}, f)
+
+    @classmethod
+    def load(cls, path, backend):
+        with open(path) as f:
+            data = json.load(f)
+        store = cls(backend, **data["options"])
+        store.headers = data["headers"]
+        store.fragments = {
+            (rid, int(depth)): text for depth, texts in data["fragments"].items() for rid, text in texts.items()
+        }
+        store.neighbourhoods = {
+            (rid, int(depth)): items
+            for depth, by_rid in data.get("neighbourhoods", {}).items() for rid, items in by_rid.items()
+        }
+        return store
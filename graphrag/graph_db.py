@@ -0,0 +1,221 @@
+"""
+Shared Neo4j access for the graphrag scripts and the llm data pipeline
+One pooled driver per process, configured from the environment:
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, NEO4J_DATABASE, NEO4J_MAX_POOL_SIZE
+
+Reads go through execute_read so they are routed to followers on a cluster, and
+every managed transaction is retried by the driver with exponential backoff.
+execute_write_once runs a single explicit transaction for callers with their own retry
+policy (graphrag.write_scheduler), so retries are not stacked on top of each other.
+Per-query timings, connection-acquisition waits and pool usage are kept in METRICS,
+and every query duration also lands in the tracing histograms as neo4j.<query name>.
+"""
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from graphrag import tracing
+
+NEO4J_URI = os.getenv("NEO4J_URI", "neo4j://localhost:7687")
+NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
+NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE") or None
+MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+CONNECTION_ACQUISITION_TIMEOUT_S = 60
+MAX_TRANSACTION_RETRY_TIME_S = 30
+FETCH_SIZE = 1000
+MAX_RETRIES = 5
+# Same values as neo4j.READ_ACCESS / WRITE_ACCESS; the driver is imported only on first use
+READ_ACCESS = "READ"
+WRITE_ACCESS = "WRITE"
+
+_driver = None
+_driver_lock = threading.Lock()
+_local = threading.local()
+
+
+class QueryMetrics:
+    """Thread-safe per-query timing plus counters of connections held by running transactions"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queries = {}
+        self.in_use = 0
+        self.peak_in_use = 0
+
+    def record(self, name, seconds, acquire_seconds=0.0, retries=0, failed=False):
+        tracing.REGISTRY.observe(f"neo4j.{name}", seconds)
+        with self._lock:
+            stats = self.queries.setdefault(name, {
+                "count": 0, "total_s": 0.0, "max_s": 0.0, "acquire_s": 0.0, "retries": 0, "errors": 0,
+            })
+            stats["count"] += 1
+            stats["total_s"] += seconds
+            stats["max_s"] = max(stats["max_s"], seconds)
+            stats["acquire_s"] += acquire_seconds
+            stats["retries"] += retries
+            stats["errors"] += failed
+
+    def checkout(self):
+        with self._lock:
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def checkin(self):
+        with self._lock:
+            self.in_use -= 1
+
+    def report(self):
+        with self._lock:
+            lines = [f"Neo4j transactions: peak {self.peak_in_use}/{MAX_POOL_SIZE} pooled connections in use"]
+            lines.append(f"{'query':<32} {'count':>8} {'mean ms':>9} {'max ms':>9} {'wait ms':>9} {'retries':>8} {'errors':>7}")
+            for name, s in sorted(self.queries.items(), key=lambda item: -item[1]["total_s"]):
+                lines.append(
+                    f"{name[:32]:<32} {s['count']:>8} {1000 * s['total_s'] / s['count']:>9.2f} "
+                    f"{1000 * s['max_s']:>9.2f} {1000 * s['acquire_s'] / s['count']:>9.2f} "
+                    f"{s['retries']:>8} {s['errors']:>7}"
+                )
+        return "\n".join(lines)
+
+
+METRICS = QueryMetrics()
+
+
+def get_driver():
+    global _driver
+    with _driver_lock:
+        if _driver is None:
+            from neo4j import GraphDatabase
+
+            auth = (NEO4J_USER, NEO4J_PASSWORD) if NEO4J_PASSWORD else None
+            _driver = GraphDatabase.driver(
+                NEO4J_URI,
+                auth=auth,
+                max_connection_pool_size=MAX_POOL_SIZE,
+                connection_acquisition_timeout=CONNECTION_ACQUISITION_TIMEOUT_S,
+                max_transaction_retry_time=MAX_TRANSACTION_RETRY_TIME_S,
+                keep_alive=True,
+            )
+        return _driver
+
+
+def close():
+    global _driver
+    with _driver_lock:
+        if _driver is not None:
+            _driver.close()
+            _driver = None
+
+
+def _query_name(query):
+    return " ".join(query.split())[:48]
+
+
+class GraphSession:
+    """A pooled session reused across many queries; not safe to share between threads"""
+
+    def __init__(self, session):
+        self._session = session
+
+    def _timed(self, execute, work, name, *args, **kwargs):
+        # A session holds a pooled connection only while a transaction runs, so pool use is
+        # counted here, for the thread-local helper sessions as well as session()
+        METRICS.checkout()
+        submitted = time.perf_counter()
+        attempts = []
+
+        def timed_work(tx, *a, **kw):
+            attempts.append(time.perf_counter())
+            return work(tx, *a, **kw)
+
+        failed = False
+        try:
+            return execute(timed_work, *args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            METRICS.checkin()
+            started = attempts[0] if attempts else submitted
+            METRICS.record(name, time.perf_counter() - started, started - submitted,
+                           retries=max(len(attempts) - 1, 0), failed=failed)
+
+    def execute_read(self, work, *args, name=None, **kwargs):
+        return self._timed(self._session.execute_read, work, name or work.__name__, *args, **kwargs)
+
+    def execute_write(self, work, *args, name=None, **kwargs):
+        return self._timed(self._session.execute_write, work, name or work.__name__, *args, **kwargs)
+
+    def execute_write_once(self, work, *args, name=None, **kwargs):
+        """One explicit write transaction; a failure is raised to the caller instead of retried"""
+        def execute(timed_work, *a, **kw):
+            with self._session.begin_transaction() as tx:
+                result = timed_work(tx, *a, **kw)
+                tx.commit()
+            return result
+
+        return self._timed(execute, work, name or work.__name__, *args, **kwargs)
+
+    def read(self, query, name=None, **params):
+        """Run a read query on a routed reader and return its records as dicts"""
+        return self.execute_read(_fetch_all, query, params, name=name or _query_name(query))
+
+    def write(self, query, name=None, **params):
+        return self.execute_write(_fetch_all, query, params, name=name or _query_name(query))
+
+    def run(self, query, name=None, **params):
+        """Auto-commit query (schema changes, CALL IN TRANSACTIONS) with retry and backoff"""
+        from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
+
+        name = name or _query_name(query)
+        for attempt in range(MAX_RETRIES):
+            start = time.perf_counter()
+            try:
+                # Counted only while the query runs, not through the backoff sleep
+                METRICS.checkout()
+                try:
+                    records = _fetch_all(self._session, query, params)
+                finally:
+                    METRICS.checkin()
+            except (TransientError, ServiceUnavailable, SessionExpired):
+                METRICS.record(name, time.perf_counter() - start, failed=True)
+                if attempt == MAX_RETRIES - 1:
+                    raise
+                time.sleep(min(2 ** attempt, 30) * random.uniform(0.5, 1.5))
+                continue
+            METRICS.record(name, time.perf_counter() - start, retries=attempt)
+            return records
+
+
+def _fetch_all(tx, query, params):
+    return [record.data() for record in tx.run(query, params)]
+
+
+@contextmanager
+def session(access_mode=WRITE_ACCESS):
+    """Check out one session for a batch of work"""
+    with get_driver().session(database=NEO4J_DATABASE, default_access_mode=access_mode,
+                              fetch_size=FETCH_SIZE) as s:
+        yield GraphSession(s)
+
+
+def _thread_session():
+    # Sessions hold a connection only while a transaction runs, so one idle session
+    # per thread is cheap and saves the setup cost on every helper call
+    if getattr(_local, "driver", None) is not get_driver():
+        _local.driver = get_driver()
+        _local.session = GraphSession(_local.driver.session(database=NEO4J_DATABASE,
+                                                             default_access_mode=READ_ACCESS,
+                                                             fetch_size=FETCH_SIZE))
+    return _local.session
+
+
+def read(query, name=None, **params):
+    """One-off read on this thread's reusable session"""
+    return _thread_session().read(query, name=name, **params)
+
+
+def write(query, name=None, **params):
+    return _thread_session().write(query, name=name, **params)
@@ -0,0 +1,196 @@
+"""
+Per-concept graph features computed offline with SciPy sparse matrices
+For every concept: in/out degree per relationship type, depth below the hierarchy roots,
+subtree size, PageRank and a hub score. Features are written back as node properties
+and, given a snapshot directory, to features.npz next to it, so retrieval can use them
+without any query-time graph work.
+
+    python -m graphrag features --snapshot radlex_snapshot/
+
+hubScore = log(subtreeSize) / log(concepts) is 0 for a leaf and 1 for a root above
+everything; re-ranking subtracts ranking.W_HUB * hubScore so broad concepts such as
+"anatomical entity" stop crowding out specific ones. Subtree sizes are counted over a
+spanning tree that keeps each concept's shallowest parent, which is exact wherever the
+hierarchy has single inheritance. PageRank values are scaled so their mean is 1.
+"""
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+from graphrag import graph_db
+from graphrag.neo4j_backend import HIERARCHY_REL
+from graphrag.write_scheduler import WriteScheduler
+
+DAMPING = 0.85
+PAGERANK_TOL = 1e-10
+PAGERANK_MAX_ITER = 100
+FEATURES_FILE = "features.npz"
+
+
+def adjacency_matrix(sources, targets, n):
+    """n x n CSR matrix with a 1 for every distinct source -> target edge"""
+    matrix = sparse.csr_matrix((np.ones(len(sources), dtype=np.float64), (sources, targets)), shape=(n, n))
+    matrix.data[:] = 1.0
+    return matrix
+
+
+def hierarchy_depth(child_to_parent):
+    """Hops below the nearest root (a concept without parents), -1 where no root is reachable"""
+    n = child_to_parent.shape[0]
+    depth = np.full(n, -1, dtype=np.int32)
+    frontier = np.asarray(child_to_parent.sum(axis=1)).ravel() == 0
+    level = 0
+    while frontier.any():
+        depth[frontier] = level
+        # Row c of child_to_parent @ frontier counts c's parents in the frontier
+        reached = np.asarray(child_to_parent @ frontier.astype(np.float64)).ravel() > 0
+        frontier = reached & (depth < 0)
+        level += 1
+    return depth
+
+
+def subtree_size(child_to_parent, depth):
+    """Concepts at or below each concept, over the shallowest-parent spanning tree"""
+    n = child_to_parent.shape[0]
+    coo = child_to_parent.tocoo()
+    # Keep one parent per child: the one closest to a root
+    candidates = (depth[coo.row] >= 0) & (depth[coo.col] == depth[coo.row] - 1)
+    rows, cols = coo.row[candidates], coo.col[candidates]
+    order = np.lexsort((cols, rows))
+    rows, cols = rows[order], cols[order]
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = rows[1:] != rows[:-1]
+    parent = np.full(n, -1, dtype=np.int64)
+    parent[rows[first]] = cols[first]
+
+    sizes = np.ones(n, dtype=np.int64)
+    for level in range(int(depth.max(initial=0)), 0, -1):
+        nodes = np.flatnonzero((depth == level) & (parent >= 0))
+        np.add.at(sizes, parent[nodes], sizes[nodes])
+    return sizes
+
+
+def pagerank(matrix, damping=DAMPING, tol=PAGERANK_TOL, max_iter=PAGERANK_MAX_ITER):
+    """Power iteration on a row-stochastic transition matrix; dangling mass is spread evenly"""
+    n = matrix.shape[0]
+    if n == 0:
+        return np.empty(0)
+    out = np.asarray(matrix.sum(axis=1)).ravel()
+    dangling = out == 0
+    inv_out = np.divide(1.0, out, out=np.zeros(n), where=~dangling)
+    transition_t = (sparse.diags(inv_out) @ matrix).T.tocsr()
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        new = damping * (transition_t @ rank + rank[dangling].sum() / n) + (1 - damping) / n
+        if np.abs(new - rank).sum() < tol:
+            return new
+        rank = new
+    return rank
+
+
+def compute_features(n, edges_by_type):
+    """edges_by_type: rel_type -> (source indices, target indices), directed as stored"""
+    features = {}
+    total = sparse.csr_matrix((n, n))
+    for rel_type, (sources, targets) in sorted(edges_by_type.items()):
+        matrix = adjacency_matrix(np.asarray(sources), np.asarray(targets), n)
+        features[f"outDegree_{rel_type}"] = np.diff(matrix.indptr).astype(np.int32)
+        features[f"inDegree_{rel_type}"] = np.bincount(matrix.indices, minlength=n).astype(np.int32)
+        total = total + matrix
+    total.data[:] = 1.0
+    features["outDegree"] = np.diff(total.indptr).astype(np.int32)
+    features["inDegree"] = np.bincount(total.indices, minlength=n).astype(np.int32)
+
+    if HIERARCHY_REL in edges_by_type:
+        child_to_parent = adjacency_matrix(*map(np.asarray, edges_by_type[HIERARCHY_REL]), n)
+    else:
+        child_to_parent = sparse.csr_matrix((n, n))
+    depth = hierarchy_depth(child_to_parent)
+    sizes = subtree_size(child_to_parent, depth)
+    features["hierarchyDepth"] = depth
+    features["subtreeSize"] = sizes
+    features["pageRank"] = pagerank(total) * n
+    features["hubScore"] = np.log(sizes) / np.log(max(n, 2))
+    return features
+
+
+def read_graph(session):
+    """(rids, {rel_type: (source indices, target indices)}) from Neo4j"""
+    rids = [r["rid"] for r in session.read(
+        "MATCH (c:RadLexConcept) WHERE c.rid IS NOT NULL RETURN c.rid as rid ORDER BY rid", name="feature_concepts")]
+    index = {rid: i for i, rid in enumerate(rids)}
+    edges = {}
+    for row in session.read("""
+        MATCH (a:RadLexConcept)-[r]->(b:RadLexConcept)
+        RETURN type(r) as rel_type, collect([a.rid, b.rid]) as pairs
+    """, name="feature_edges"):
+        pairs = [(index[s], index[t]) for s, t in row["pairs"] if s in index and t in index]
+        edges[row["rel_type"]] = (np.array([p[0] for p in pairs], dtype=np.int64),
+                                  np.array([p[1] for p in pairs], dtype=np.int64))
+    return rids, edges
+
+
+def write_properties_batch(tx, batch):
+    tx.run("""
+        UNWIND $batch AS row
+        MATCH (c:RadLexConcept {rid: row.rid})
+        SET c += row.props
+    """, batch=batch)
+
+
+def write_to_graph(rids, features):
+    columns = {name: values.tolist() for name, values in features.items()}
+    rows = ({"rid": rid, "props": {name: values[i] for name, values in columns.items()}} for i, rid in enumerate(rids))
+    with WriteScheduler() as writer:
+        writer.submit(write_properties_batch, rows)
+    return writer.summary()
+
+
+def save_features(path, rids, features):
+    np.savez(Path(path) / FEATURES_FILE, rids=np.array(rids), **features)
+
+
+def load_features(path, rids):
+    """Feature arrays aligned to rids (missing concepts get zeros), or None without a features file"""
+    path = Path(path) / FEATURES_FILE
+    if not path.exists():
+        return None
+    arrays = np.load(path)
+    position = {rid: i for i, rid in enumerate(arrays["rids"].tolist())}
+    take = np.array([position.get(rid, -1) for rid in rids], dtype=np.int64)
+    found = take >= 0
+    aligned = {}
+    for name in arrays.files:
+        if name == "rids":
+            continue
+        values = np.zeros(len(rids), dtype=arrays[name].dtype)
+        values[found] = arrays[name][take[found]]
+        aligned[name] = values
+    return aligned
+
+
+def summarize(features):
+    hub = features["hubScore"]
+    return {
+        "concepts": len(hub),
+        "max_depth": int(features["hierarchyDepth"].max(initial=0)),
+        "roots": int((features["hierarchyDepth"] == 0).sum()),
+        "unreachable": int((features["hierarchyDepth"] < 0).sum()),
+        "leaves": int((features["subtreeSize"] == 1).sum()),
+        "hubs_over_0.5": int((hub > 0.5).sum()),
+    }
+
+
+def main(snapshot=None, write_back=True):
+    with graph_db.session(graph_db.READ_ACCESS) as session:
+        rids, edges = read_graph(session)
+    features = compute_features(len(rids), edges)
+    print(f"Features: {summarize(features)}")
+    if write_back:
+        print(f"Writes: {write_to_graph(rids, features)}")
+    if snapshot:
+        save_features(snapshot, rids, features)
+        print(f"Saved {len(features)} features for {len(rids)} concepts to {Path(snapshot) / FEATURES_FILE}")
+    print(graph_db.METRICS.report())
+    graph_db.close()
@@ -0,0 +1,233 @@
+"""
+Resumable work-unit manifests for long batch jobs (embedding, dataset preparation)
+A job is a fixed list of units (concept ranges, note_id shards) plus the parameters that
+define its output: model, ontology version, retrieval settings. The manifest lives in a
+directory named after a fingerprint of both, so changing any of them starts a fresh job
+and the old directory stays behind as a record of what was run.
+
+Workers claim a unit by creating its claim file with O_EXCL and finish it by renaming a
+completion record into done/, so any number of processes on hosts sharing the directory
+can work through one job. A claim whose worker has not heartbeated for LEASE_SECONDS is
+taken over by renaming a new claim record over it and reading it back once any worker
+that saw the same expired claim has had TAKEOVER_SETTLE_SECONDS to do likewise; only the
+last writer keeps the unit. A worker that finds its record replaced stops heartbeating
+and leaves the new claim alone. At worst a unit then runs twice, which is harmless
+because unit outputs are written atomically.
+
+    manifest = JobManifest.open("jobs", "embed", params, units)
+    manifest.run(process_unit)
+    python -m graphrag jobs jobs/
+"""
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from pathlib import Path
+
+LEASE_SECONDS = 600
+HEARTBEAT_SECONDS = 60
+TAKEOVER_SETTLE_SECONDS = 2.0
+
+
+def fingerprint(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def ontology_version(concepts):
+    """Content hash of (rid, name, definition) rows, independent of their order"""
+    return fingerprint(sorted([c["rid"], c.get("name") or c.get("label"), c.get("definition")] for c in concepts))
+
+
+def chunk_units(prefix, items, unit_size):
+    """[(unit id, items)] in order, unit_size items each"""
+    return [(f"{prefix}-{i // unit_size:05d}", items[i:i + unit_size]) for i in range(0, len(items), unit_size)]
+
+
+def atomic_write(path, data):
+    """Write text or bytes so readers see either the old file or the complete new one"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{socket.gethostname()}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "wb" if isinstance(data, bytes) else "w") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobManifest:
+    def __init__(self, path, worker=None):
+        self.path = Path(path)
+        with open(self.path / "manifest.json") as f:
+            data = json.load(f)
+        self.job = data["job"]
+        self.params = data["params"]
+        self.units = {unit["id"]: unit for unit in data["units"]}
+        self.worker = worker or worker_id()
+        # unit id -> token of the claim record this worker wrote
+        self._held = {}
+        self._lock = threading.Lock()
+        self._heartbeat = None
+
+    @classmethod
+    def open(cls, root, job, params, units, worker=None):
+        """Manifest for this job, params and units, created on first use; units are dicts with an 'id'"""
+        key = fingerprint({"job": job, "params": params, "units": units})
+        path = Path(root) / f"{job}-{key[:12]}"
+        if not (path / "manifest.json").exists():
+            for sub in ("claims", "done", "outputs"):
+                (path / sub).mkdir(parents=True, exist_ok=True)
+            # Concurrent creators write identical content, so the last replace wins harmlessly
+            atomic_write(path / "manifest.json", json.dumps({
+                "job": job, "params": params, "fingerprint": key,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "units": units,
+            }))
+        return cls(path, worker)
+
+    def _claim_path(self, unit_id):
+        return self.path / "claims" / unit_id
+
+    def _done_path(self, unit_id):
+        return self.path / "done" / f"{unit_id}.json"
+
+    def output_path(self, unit_id, suffix):
+        return self.path / "outputs" / f"{unit_id}{suffix}"
+
+    def is_done(self, unit_id):
+        return self._done_path(unit_id).exists()
+
+    def done(self):
+        return {p.stem for p in (self.path / "done").glob("*.json")}
+
+    def is_complete(self):
+        return self.done() >= set(self.units)
+
+    def _claim_token(self, unit_id):
+        """Token of the claim record on disk, None if there is none or it is still being written"""
+        try:
+            with open(self._claim_path(unit_id)) as f:
+                return json.load(f).get("token")
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _take_over(self, unit_id, record):
+        """Replace an expired claim with this worker's record; True if it is still ours after settling"""
+        try:
+            if time.time() - self._claim_path(unit_id).stat().st_mtime < LEASE_SECONDS:
+                return False
+        except FileNotFoundError:
+            return False
+        atomic_write(self._claim_path(unit_id), json.dumps(record))
+        # Every worker that saw the expired claim writes within the settle time, so the last writer wins
+        time.sleep(TAKEOVER_SETTLE_SECONDS)
+        return self._claim_token(unit_id) == record["token"]
+
+    def claim(self, unit_id):
+        """True if this worker now holds the unit"""
+        if self.is_done(unit_id):
+            return False
+        record = {"worker": self.worker, "token": uuid.uuid4().hex, "claimed": time.time()}
+        try:
+            fd = os.open(self._claim_path(unit_id), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if not self._take_over(unit_id, record):
+                return False
+        else:
+            with os.fdopen(fd, "w") as f:
+                json.dump(record, f)
+        with self._lock:
+            self._held[unit_id] = record["token"]
+        self._start_heartbeat()
+        # A worker that finished the unit may have released its claim just before ours
+        if self.is_done(unit_id):
+            self.release(unit_id)
+            return False
+        return True
+
+    def holds(self, unit_id):
+        """Whether the claim on disk is still this worker's"""
+        with self._lock:
+            token = self._held.get(unit_id)
+        return token is not None and self._claim_token(unit_id) == token
+
+    def _start_heartbeat(self):
+        if self._heartbeat is None:
+            self._heartbeat = threading.Thread(target=self._beat, daemon=True)
+            self._heartbeat.start()
+
+    def _beat(self):
+        while True:
+            time.sleep(HEARTBEAT_SECONDS)
+            with self._lock:
+                held = list(self._held)
+            for unit_id in held:
+                if not self.holds(unit_id):
+                    # Taken over after a missed lease; refreshing it would extend the new owner's claim
+                    with self._lock:
+                        self._held.pop(unit_id, None)
+                    continue
+                try:
+                    os.utime(self._claim_path(unit_id))
+                except FileNotFoundError:
+                    pass
+
+    def release(self, unit_id):
+        """Drop the claim, unless another worker has taken it over"""
+        owned = self.holds(unit_id)
+        with self._lock:
+            self._held.pop(unit_id, None)
+        if owned:
+            try:
+                os.remove(self._claim_path(unit_id))
+            except FileNotFoundError:
+                pass
+
+    def complete(self, unit_id, result=None):
+        atomic_write(self._done_path(unit_id), json.dumps({
+            "worker": self.worker, "finished": time.time(), **(result or {}),
+        }))
+        self.release(unit_id)
+
+    def claim_units(self):
+        """Units this worker claims, in manifest order, until none are left unclaimed"""
+        for unit_id, unit in self.units.items():
+            if self.claim(unit_id):
+                yield unit
+
+    def run(self, process_unit):
+        """process_unit(unit) -> result dict for done/; a failing unit is released for another try"""
+        failed = []
+        for unit in self.claim_units():
+            start = time.perf_counter()
+            try:
+                result = process_unit(unit) or {}
+            except Exception as e:
+                print(f"Unit {unit['id']} failed: {e}")
+                self.release(unit["id"])
+                failed.append(unit["id"])
+                continue
+            self.complete(unit["id"], {"seconds": round(time.perf_counter() - start, 3), **result})
+        return failed
+
+    def status(self):
+        done = self.done() & set(self.units)
+        claims = {p.name for p in (self.path / "claims").iterdir() if p.name in self.units}
+        return {
+            "job": self.job,
+            "path": str(self.path),
+            "units": len(self.units),
+            "done": len(done),
+            "claimed": len(claims - done),
+            "pending": len(set(self.units) - done - claims),
+        }
+
+
+def list_jobs(root):
+    return [JobManifest(p.parent) for p in sorted(Path(root).glob("*/manifest.json"))]
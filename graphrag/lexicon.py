@@ -0,0 +1,140 @@
+"""
+Exact RadLex mention finding with an Aho-Corasick automaton over normalized tokens
+Every label, preferred name and synonym becomes a token phrase, so a report is scanned
+once, in time linear in its length, and matches always fall on word boundaries.
+"""
+import re
+from collections import deque
+
+TOKEN = re.compile(r"[a-z0-9]+")
+# Whole-phrase stopwords; RadLex has concepts for some of them but as mentions they are noise
+STOP_PHRASES = {"a", "an", "and", "at", "by", "for", "in", "is", "no", "not", "of", "on", "or", "the", "to", "with"}
+
+
+def tokenize(text):
+    return TOKEN.findall(text.lower())
+
+
+class PhraseMatcher:
+    """Token-level Aho-Corasick automaton mapping phrases to arbitrary payloads"""
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [()]
+        self.phrases = []
+        self.payloads = []
+        self._phrase_ids = {}
+        self._compiled = False
+
+    def add(self, phrase_tokens, payload):
+        phrase_tokens = tuple(phrase_tokens)
+        if not phrase_tokens:
+            return
+        phrase_id = self._phrase_ids.get(phrase_tokens)
+        if phrase_id is not None:
+            self.payloads[phrase_id].append(payload)
+            return
+        state = 0
+        for token in phrase_tokens:
+            nxt = self.goto[state].get(token)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][token] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append(())
+            state = nxt
+        phrase_id = len(self.phrases)
+        self._phrase_ids[phrase_tokens] = phrase_id
+        self.phrases.append(phrase_tokens)
+        self.payloads.append([payload])
+        self.out[state] = (phrase_id,)
+        self._compiled = False
+
+    def compile(self):
+        """Breadth-first pass that sets failure links and folds suffix outputs into each state"""
+        queue = deque()
+        for state in self.goto[0].values():
+            self.fail[state] = 0
+            queue.append(state)
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and token not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(token, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+        self._compiled = True
+        return self
+
+    def find(self, tokens):
+        """All (start, end, phrase_id) matches, end exclusive, in order of end position"""
+        if not self._compiled:
+            self.compile()
+        goto, fail, out, phrases = self.goto, self.fail, self.out, self.phrases
+        matches = []
+        state = 0
+        for i, token in enumerate(tokens):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            for phrase_id in out[state]:
+                matches.append((i + 1 - len(phrases[phrase_id]), i + 1, phrase_id))
+        return matches
+
+
+def longest_matches(matches):
+    """Drop matches contained in a longer match, e.g. 'abdomen' inside 'ct abdomen'"""
+    ordered = sorted(matches, key=lambda m: (m[0], -(m[1] - m[0])))
+    kept = []
+    furthest = -1
+    for start, end, phrase_id in ordered:
+        if end > furthest:
+            kept.append((start, end, phrase_id))
+            furthest = end
+    return kept
+
+
+class LexicalIndex:
+    """Phrase matcher over concept names and synonyms that returns retrieval-shaped hits"""
+
+    def __init__(self, concepts):
+        # concepts: iterable of (rid, name, definition, [terms]) where terms are labels and synonyms
+        self.concepts = {}
+        self.matcher = PhraseMatcher()
+        for rid, name, definition, terms in concepts:
+            self.concepts[rid] = (name, definition or "")
+            for term in {name, *terms}:
+                tokens = tokenize(term or "")
+                if tokens and " ".join(tokens) not in STOP_PHRASES and not "".join(tokens).isdigit():
+                    self.matcher.add(tokens, rid)
+        self.matcher.compile()
+
+    def __len__(self):
+        return len(self.matcher.phrases)
+
+    def search(self, text, limit=10, longest_only=True):
+        """Concepts mentioned verbatim in the text, most specific (longest) mentions first"""
+        tokens = tokenize(text)
+        matches = self.matcher.find(tokens)
+        if longest_only:
+            matches = longest_matches(matches)
+        matches.sort(key=lambda m: (-(m[1] - m[0]), m[0]))
+        hits = []
+        seen = set()
+        for start, end, phrase_id in matches:
+            for rid in self.matcher.payloads[phrase_id]:
+                if rid in seen:
+                    continue
+                seen.add(rid)
+                name, definition = self.concepts[rid]
+                hits.append({
+                    "rid": rid, "name": name, "definition": definition, "score": 1.0,
+                    "mention": " ".join(tokens[start:end]), "match": "lexical",
+                })
+                if len(hits) >= limit:
+                    return hits
+        return hits
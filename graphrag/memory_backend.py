@@ -0,0 +1,265 @@
+"""
+In-memory RadLex backend loaded from a snapshot, for batch jobs and tests without Neo4j
+Concepts live in arrays, adjacency is CSR per relationship type, and traversal and
+scoring are NumPy-vectorized. Results match graphrag.neo4j_backend in shape and meaning.
+
+    python -m graphrag snapshot radlex_snapshot/
+    GRAPH_BACKEND=memory GRAPH_SNAPSHOT=radlex_snapshot/ python -m graphrag prepare-data
+
+GRAPH_VECTOR_DTYPE=float16 or int8 keeps the embedding store at half or a quarter of its size.
+With features.npz in the snapshot (python -m graphrag features --snapshot ...), hits carry
+each concept's hub_score for re-ranking.
+"""
+import json
+import os
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+from graphrag.lexicon import LexicalIndex
+from graphrag.neo4j_backend import HIERARCHY_REL
+from graphrag.tracing import span
+from graphrag.vector_index import ExactVectorIndex
+
+VECTOR_DTYPE = os.getenv("GRAPH_VECTOR_DTYPE", "float32")
+HIERARCHY_LIMIT = 5
+TYPED_LIMIT = 10
+SNAPSHOT_PAGE_SIZE = 5000
+
+
+class CSRAdjacency:
+    """Undirected adjacency for one relationship type in compressed sparse row form"""
+
+    def __init__(self, indptr, indices):
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def from_edges(cls, sources, targets, n_nodes):
+        # Neo4j patterns here ignore direction, so store every edge both ways
+        src = np.concatenate([sources, targets]).astype(np.int32)
+        dst = np.concatenate([targets, sources]).astype(np.int32)
+        order = np.lexsort((dst, src))
+        src, dst = src[order], dst[order]
+        keep = np.ones(len(src), dtype=bool)
+        keep[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+        src, dst = src[keep], dst[keep]
+        indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n_nodes), out=indptr[1:])
+        return cls(indptr, dst)
+
+    def neighbors(self, nodes):
+        """Concatenated neighbour lists of an array of nodes"""
+        starts = self.indptr[nodes]
+        lengths = self.indptr[nodes + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.empty(0, dtype=self.indices.dtype)
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        return self.indices[offsets + np.arange(total)]
+
+
+class InMemoryGraphBackend:
+    """semantic_search / get_concept_context over arrays instead of Cypher"""
+
+    def __init__(self, rids, names, definitions, embeddings, adjacency, synonyms=None, encoder=None,
+                 vector_dtype=VECTOR_DTYPE, features=None):
+        self.rids = list(rids)
+        self.names = list(names)
+        self.definitions = list(definitions)
+        self.synonyms = synonyms or [[] for _ in self.rids]
+        self.index = {rid: i for i, rid in enumerate(self.rids)}
+        self.adjacency = adjacency
+        self.typed_rels = sorted(rel for rel in adjacency if rel != HIERARCHY_REL)
+        # Concepts without an embedding never appear in vector results, as in the Neo4j index
+        self.vectors = ExactVectorIndex(embeddings, vector_dtype)
+        self._encoder = encoder
+        self._lexicon = None
+        self.features = features
+        self.hub_scores = features["hubScore"] if features else np.zeros(len(self.rids))
+
+    @classmethod
+    def from_records(cls, concepts, edges, encoder=None, vector_dtype=VECTOR_DTYPE):
+        """concepts: dicts with rid/name/definition/embedding; edges: (rel_type, source_rid, target_rid)"""
+        rids = [c["rid"] for c in concepts]
+        index = {rid: i for i, rid in enumerate(rids)}
+        dim = next((len(c["embedding"]) for c in concepts if c.get("embedding")), 0)
+        embeddings = np.zeros((len(concepts), dim), dtype=np.float32)
+        for i, c in enumerate(concepts):
+            if c.get("embedding"):
+                embeddings[i] = c["embedding"]
+
+        by_type = {}
+        for rel_type, source, target in edges:
+            if source in index and target in index:
+                by_type.setdefault(rel_type, ([], []))
+                by_type[rel_type][0].append(index[source])
+                by_type[rel_type][1].append(index[target])
+        adjacency = {
+            rel_type: CSRAdjacency.from_edges(np.array(src), np.array(dst), len(rids))
+            for rel_type, (src, dst) in by_type.items()
+        }
+        return cls(rids, [c["name"] for c in concepts], [c.get("definition") or "" for c in concepts],
+                   embeddings, adjacency, [c.get("synonyms") or [] for c in concepts], encoder, vector_dtype)
+
+    @classmethod
+    def load(cls, path, encoder=None, vector_dtype=VECTOR_DTYPE):
+        from graphrag.graph_features import load_features
+
+        path = Path(path)
+        with open(path / "concepts.json") as f:
+            table = json.load(f)
+        arrays = np.load(path / "graph.npz")
+        adjacency = {
+            rel_type: CSRAdjacency(arrays[f"{rel_type}.indptr"], arrays[f"{rel_type}.indices"])
+            for rel_type in table["rel_types"]
+        }
+        return cls(table["rids"], table["names"], table["definitions"], arrays["embeddings"],
+                   adjacency, table["synonyms"], encoder, vector_dtype, load_features(path, table["rids"]))
+
+    def save(self, path):
+        """Write the snapshot; float16/int8 backends can only write their dequantized embeddings"""
+        if self.vectors.dtype != "float32":
+            warnings.warn(f"saving a {self.vectors.dtype} backend writes dequantized embeddings; the original "
+                          "float32 vectors are not kept, so export from Neo4j again for a lossless snapshot")
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        with open(path / "concepts.json", "w") as f:
+            json.dump({
+                "rids": self.rids, "names": self.names, "definitions": self.definitions,
+                "synonyms": self.synonyms, "rel_types": sorted(self.adjacency),
+            }, f)
+        arrays = {"embeddings": self.vectors.to_float32()}
+        for rel_type, adj in self.adjacency.items():
+            arrays[f"{rel_type}.indptr"] = adj.indptr
+            arrays[f"{rel_type}.indices"] = adj.indices
+        np.savez(path / "graph.npz", **arrays)
+        if self.features:
+            from graphrag.graph_features import save_features
+
+            save_features(path, self.rids, self.features)
+
+    def encode(self, texts):
+        if self._encoder is None:
+            from graphrag import embedding
+
+            self._encoder = embedding.get_model().encode
+        with span("retrieval.encode"):
+            return np.atleast_2d(np.asarray(self._encoder(texts), dtype=np.float32))
+
+    def semantic_search_batch(self, query_texts, limit=10):
+        if not self.vectors.mask.any():
+            return [[] for _ in query_texts]
+        queries = self.encode(list(query_texts))
+        results = [[] for _ in query_texts]
+        # A zero query vector has no cosine similarity to anything, so it gets no hits
+        # rather than whichever concepts happen to come first
+        rows = np.flatnonzero(np.linalg.norm(queries, axis=1) > 0)
+        if len(rows) == 0:
+            return results
+        with span("retrieval.vector_index"):
+            top, cosine = self.vectors.search(queries[rows], limit)
+        # Same score scale as the Neo4j cosine vector index: (1 + cos) / 2
+        scores = (1 + np.clip(cosine, -1, 1)) / 2
+        for row, row_idx, row_scores in zip(rows, top, scores):
+            results[row] = [
+                {"rid": self.rids[i], "name": self.names[i], "definition": self.definitions[i], "score": float(s),
+                 "hub_score": float(self.hub_scores[i])}
+                for i, s in zip(row_idx, row_scores)]
+        return results
+
+    def semantic_search(self, query_text, limit=10):
+        return self.semantic_search_batch([query_text], limit)[0]
+
+    def lexical_search(self, query_text, limit=10):
+        if self._lexicon is None:
+            self._lexicon = LexicalIndex(zip(self.rids, self.names, self.definitions, self.synonyms))
+        hits = self._lexicon.search(query_text, limit=limit)
+        for hit in hits:
+            hit["hub_score"] = float(self.hub_scores[self.index[hit["rid"]]])
+        return hits
+
+    def _hierarchy(self, node, depth, limit=HIERARCHY_LIMIT):
+        """Hierarchy relatives closest first, as (node indices, hop counts)"""
+        adj = self.adjacency.get(HIERARCHY_REL)
+        if adj is None:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+        seen = np.array([node])
+        frontier = seen
+        found = []
+        hops = []
+        for hop in range(1, depth + 1):
+            reached = np.setdiff1d(np.unique(adj.neighbors(frontier)), seen, assume_unique=True)
+            if len(reached) == 0:
+                break
+            found.append(reached)
+            hops.append(np.full(len(reached), hop, dtype=np.int32))
+            if sum(len(f) for f in found) >= limit:
+                break
+            seen = np.union1d(seen, reached)
+            frontier = reached
+        if not found:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+        return np.concatenate(found)[:limit], np.concatenate(hops)[:limit]
+
+    def get_concept_context(self, rid, depth=2, hierarchy_limit=HIERARCHY_LIMIT, typed_limit=TYPED_LIMIT):
+        node = self.index.get(rid)
+        if node is None:
+            return []
+        node = np.array([node])
+        context = [
+            {"name": self.names[i], "rel_type": "hierarchy", "hops": int(h)}
+            for i, h in zip(*self._hierarchy(node[0], depth, hierarchy_limit))
+        ]
+        typed = []
+        seen = set()
+        for rel_type in self.typed_rels:
+            for i in self.adjacency[rel_type].neighbors(node):
+                key = (self.names[i], rel_type)
+                if key not in seen:
+                    seen.add(key)
+                    typed.append({"name": self.names[i], "rel_type": rel_type, "hops": 1})
+            if len(typed) >= typed_limit:
+                break
+        return context + typed[:typed_limit]
+
+
+def export_snapshot(path, page_size=SNAPSHOT_PAGE_SIZE):
+    """Dump concepts, embeddings and every relationship type from Neo4j into a snapshot"""
+    from graphrag import graph_db
+
+    concepts = []
+    edges = []
+    with graph_db.session(graph_db.READ_ACCESS) as session:
+        after = ""
+        while True:
+            page = session.read("""
+                MATCH (c:RadLexConcept)
+                WHERE c.rid > $after
+                RETURN c.rid as rid, coalesce(c.preferredName, c.label) as name,
+                       coalesce(c.definition, '') as definition,
+                       coalesce(c.synonyms, []) as synonyms, c.embedding as embedding
+                ORDER BY c.rid
+                LIMIT $limit
+            """, name="snapshot_concepts", after=after, limit=page_size)
+            if not page:
+                break
+            concepts.extend(page)
+            after = page[-1]["rid"]
+            print(f"  Exported {len(concepts)} concepts...")
+
+        rel_types = [r["relationshipType"] for r in session.read(
+            "CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType")]
+        for rel_type in rel_types:
+            rows = session.read(f"""
+                MATCH (a:RadLexConcept)-[:{rel_type}]->(b:RadLexConcept)
+                RETURN a.rid as source, b.rid as target
+            """, name="snapshot_edges")
+            edges.extend((rel_type, r["source"], r["target"]) for r in rows)
+            print(f"  Exported {len(rows)} {rel_type} relationships")
+
+    # Always float32 here: GRAPH_VECTOR_DTYPE applies when a snapshot is loaded, not to what it stores
+    backend = InMemoryGraphBackend.from_records(concepts, edges, vector_dtype="float32")
+    backend.save(path)
+    return backend
@@ -0,0 +1,69 @@
+"""
+Neo4j retrieval backend: vector search plus typed-relationship expansion
+The module itself satisfies the backend interface used by graphrag.retrieval
+"""
+from functools import lru_cache
+
+from graphrag import embedding, graph_db
+from graphrag.tracing import span
+from graphrag.lexicon import LexicalIndex
+
+HIERARCHY_REL = "RDF_SCHEMA_SUBCLASSOF"
+
+
+@lru_cache(maxsize=1)
+def get_all_relationship_types():
+    result = graph_db.read("CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType")
+    return tuple(r['relationshipType'] for r in result)
+
+
+def semantic_search(query_text, limit=10):
+    with span("retrieval.encode"):
+        query_embedding = embedding.get_model().encode(query_text).tolist()
+    return graph_db.read("""
+        CALL db.index.vector.queryNodes('concept_embeddings', $limit, $embedding)
+        YIELD node, score
+        RETURN node.rid as rid, coalesce(node.preferredName, node.label) as name,
+               coalesce(node.definition, '') as definition, score,
+               coalesce(node.hubScore, 0.0) as hub_score
+    """, name="vector_search", embedding=query_embedding, limit=limit)
+
+
+def get_concept_context(rid, depth=2, hierarchy_limit=5, typed_limit=10):
+    rel_pattern = "|".join(get_all_relationship_types())
+    hierarchy = graph_db.read(f"""
+        MATCH p = (c:RadLexConcept {{rid: $rid}})-[:{HIERARCHY_REL}*1..{depth}]-(related:RadLexConcept)
+        WHERE related <> c
+        WITH related, min(length(p)) as hops
+        RETURN coalesce(related.preferredName, related.label) as name, 'hierarchy' as rel_type, hops
+        ORDER BY hops LIMIT $limit
+    """, name="hierarchy_context", rid=rid, limit=hierarchy_limit)
+    typed = graph_db.read(f"""
+        MATCH (c:RadLexConcept {{rid: $rid}})-[r:{rel_pattern}]-(related:RadLexConcept)
+        WHERE type(r) <> '{HIERARCHY_REL}'
+        RETURN DISTINCT coalesce(related.preferredName, related.label) as name, type(r) as rel_type, 1 as hops
+        LIMIT $limit
+    """, name="typed_context", rid=rid, limit=typed_limit)
+    return hierarchy + typed
+
+
+@lru_cache(maxsize=1)
+def get_lexical_index():
+    """(LexicalIndex, {rid: hubScore}) loaded once per process"""
+    rows = graph_db.read("""
+        MATCH (c:RadLexConcept)
+        RETURN c.rid as rid, coalesce(c.preferredName, c.label) as name,
+               coalesce(c.definition, '') as definition,
+               [c.label] + coalesce(c.synonyms, []) as terms,
+               coalesce(c.hubScore, 0.0) as hub_score
+    """, name="lexicon_terms")
+    index = LexicalIndex((r['rid'], r['name'], r['definition'], [t for t in r['terms'] if t]) for r in rows)
+    return index, {r['rid']: r['hub_score'] for r in rows}
+
+
+def lexical_search(query_text, limit=10):
+    index, hub_scores = get_lexical_index()
+    hits = index.search(query_text, limit=limit)
+    for hit in hits:
+        hit['hub_score'] = hub_scores.get(hit['rid'], 0.0)
+    return hits
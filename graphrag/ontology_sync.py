@@ -0,0 +1,148 @@
+"""
+Incremental RadLex update: diff a new extract against the live graph and apply only the changes
+Concepts are matched by uri and compared by a hash of their imported properties;
+relationships are compared as (type, source uri, target uri) triples. Inserts, updates
+and deletes run as batched write transactions, so the graph stays online and
+embeddings of unchanged concepts are kept.
+
+    python -m graphrag sync --owl RadLex.owl --dry-run
+    python -m graphrag sync --owl RadLex.owl && python -m graphrag embed
+"""
+import hashlib
+import json
+
+from graphrag import graph_db
+from graphrag.ontology_import import (
+    RADLEX_OWL, create_constraints, extract_radlex, import_concepts_batch, make_rel_importer,
+)
+from graphrag.write_scheduler import WriteScheduler
+
+CONCEPT_PROPERTIES = ("rid", "label", "preferredName", "definition", "synonyms", "fmaid", "umlsId", "umlsTerm")
+# Properties that go into the embedding text; changing them drops the stored embedding
+EMBEDDED_PROPERTIES = ("label", "definition")
+
+
+def property_hash(concept, properties=CONCEPT_PROPERTIES):
+    values = {p: concept.get(p) for p in properties}
+    values["synonyms"] = sorted(values.get("synonyms") or [])
+    return hashlib.sha1(json.dumps(values, sort_keys=True).encode()).hexdigest()
+
+
+def read_graph_state(session):
+    """({uri: {property: value}}, {(rel_type, source_uri, target_uri)}) currently in Neo4j"""
+    returns = ", ".join(f"c.{p} as {p}" for p in CONCEPT_PROPERTIES)
+    concepts = {
+        row.pop("uri"): row
+        for row in session.read(f"MATCH (c:RadLexConcept) RETURN c.uri as uri, {returns}", name="sync_read_concepts")
+    }
+    edges = {
+        (row["rel_type"], row["source"], row["target"])
+        for row in session.read("""
+            MATCH (a:RadLexConcept)-[r]->(b:RadLexConcept)
+            RETURN type(r) as rel_type, a.uri as source, b.uri as target
+        """, name="sync_read_edges")
+    }
+    return concepts, edges
+
+
+def diff_ontology(current_concepts, current_edges, concepts, relationships_by_type):
+    new = {c["uri"]: c for c in concepts}
+    current_hashes = {uri: property_hash(props) for uri, props in current_concepts.items()}
+    inserts = [c for uri, c in new.items() if uri not in current_hashes]
+    updates = [c for uri, c in new.items() if uri in current_hashes and property_hash(c) != current_hashes[uri]]
+    deletes = [uri for uri in current_hashes if uri not in new]
+    reembed = [
+        c["uri"] for c in updates
+        if property_hash(c, EMBEDDED_PROPERTIES) != property_hash(current_concepts[c["uri"]], EMBEDDED_PROPERTIES)
+    ]
+
+    new_edges = {
+        (rel_type, r["source"], r["target"])
+        for rel_type, rels in relationships_by_type.items() for r in rels
+        if r["source"] in new and r["target"] in new
+    }
+    return {
+        "insert": inserts,
+        "update": updates,
+        "delete": deletes,
+        "reembed": reembed,
+        "insert_edges": sorted(new_edges - current_edges),
+        # Edges of deleted concepts go with DETACH DELETE
+        "delete_edges": sorted((t, s, o) for t, s, o in current_edges - new_edges if s in new and o in new),
+    }
+
+
+def update_concepts_batch(tx, batch):
+    tx.run("""
+        UNWIND $batch AS c
+        MATCH (n:RadLexConcept {uri: c.uri})
+        SET n.rid = c.rid, n.label = c.label, n.preferredName = c.preferredName,
+            n.definition = c.definition, n.synonyms = c.synonyms, n.fmaid = c.fmaid,
+            n.umlsId = c.umlsId, n.umlsTerm = c.umlsTerm
+    """, batch=batch)
+
+
+def clear_embeddings_batch(tx, uris):
+    tx.run("UNWIND $uris AS uri MATCH (n:RadLexConcept {uri: uri}) REMOVE n.embedding", uris=uris)
+
+
+def delete_concepts_batch(tx, uris):
+    tx.run("UNWIND $uris AS uri MATCH (n:RadLexConcept {uri: uri}) DETACH DELETE n", uris=uris)
+
+
+def make_rel_deleter(rel_type):
+    def delete_rels(tx, batch):
+        tx.run(f"""
+            UNWIND $batch AS r
+            MATCH (:RadLexConcept {{uri: r.source}})-[x:{rel_type}]->(:RadLexConcept {{uri: r.target}})
+            DELETE x
+        """, batch=batch)
+    return delete_rels
+
+
+def _by_type(edges):
+    grouped = {}
+    for rel_type, source, target in edges:
+        grouped.setdefault(rel_type, []).append({"source": source, "target": target})
+    return grouped
+
+
+def apply_diff(session, diff):
+    """Each phase is flushed before the next, so edges are added only once their endpoints exist"""
+    session.execute_write(create_constraints)
+    with WriteScheduler() as writer:
+        for rel_type, rels in _by_type(diff["delete_edges"]).items():
+            writer.submit(make_rel_deleter(rel_type), rels, name=f"sync_delete_{rel_type}")
+        writer.flush()
+        writer.submit(delete_concepts_batch, diff["delete"])
+        writer.submit(update_concepts_batch, diff["update"])
+        writer.flush()
+        writer.submit(clear_embeddings_batch, diff["reembed"])
+        writer.submit(import_concepts_batch, diff["insert"])
+        writer.flush()
+        for rel_type, rels in _by_type(diff["insert_edges"]).items():
+            writer.submit(make_rel_importer(rel_type), rels, name=f"sync_insert_{rel_type}")
+    return writer.summary()
+
+
+def summarize(diff):
+    return {key: len(value) for key, value in diff.items()}
+
+
+def sync_radlex(concepts, relationships_by_type, dry_run=False):
+    with graph_db.session() as session:
+        current_concepts, current_edges = read_graph_state(session)
+        diff = diff_ontology(current_concepts, current_edges, concepts, relationships_by_type)
+        if not dry_run:
+            print(f"Writes: {apply_diff(session, diff)}")
+    return diff
+
+
+def main(owl_path=RADLEX_OWL, dry_run=False):
+    concepts, relationships_by_type = extract_radlex(owl_path)
+    diff = sync_radlex(concepts, relationships_by_type, dry_run=dry_run)
+    print(("Would apply" if dry_run else "Applied") + f": {json.dumps(summarize(diff))}")
+    if diff["insert"] or diff["reembed"]:
+        print("Run `python -m graphrag embed` to embed new and changed concepts")
+    print(graph_db.METRICS.report())
+    graph_db.close()
@@ -1,42 +1,31 @@
-from neo4j import GraphDatabase
-from sentence_transformers import SentenceTransformer
-
-# Initialize
-model = SentenceTransformer('all-MiniLM-L6-v2')
-driver = GraphDatabase.driver("localhost")
+from graphrag import embedding, graph_db
 
 def semantic_search(query_text, limit=5):
     """Find similar concepts using vector search"""
-    query_embedding = model.encode(query_text).tolist()
-
-    with driver.session() as session:
-        result = session.run("""
-            CALL db.index.vector.queryNodes('concept_embeddings', $limit, $embedding)
-            YIELD node, score
-            RETURN node.rid as rid, 
-                   node.label as label, 
-                   coalesce(node.definition, '') as definition, 
-                   score
-            ORDER BY score DESC
-        """, embedding=query_embedding, limit=limit)
-
-        return [dict(record) for record in result]
+    query_embedding = embedding.get_model().encode(query_text).tolist()
+
+    return graph_db.read("""
+        CALL db.index.vector.queryNodes('concept_embeddings', $limit, $embedding)
+        YIELD node, score
+        RETURN node.rid as rid, 
+               node.label as label, 
+               coalesce(node.definition, '') as definition, 
+               score
+        ORDER BY score DESC
+    """, name="semantic_search", embedding=query_embedding, limit=limit)
 
 def get_concept_context(rid, depth=2):
     """Get graph context around a concept"""
-    with driver.session() as session:
-        result = session.run("""
-            MATCH path = (c:RadLexConcept {rid: $rid})-[:SUBCLASS_OF*0..%d]-(related:RadLexConcept)
-            RETURN DISTINCT 
-                related.rid as rid, 
-                related.label as label,
-                coalesce(related.definition, '') as definition,
-                length(path) as distance
-            ORDER BY distance
-            LIMIT 20
-        """ % depth, rid=rid)
-
-        return [dict(record) for record in result]
+    return graph_db.read("""
+        MATCH path = (c:RadLexConcept {rid: $rid})-[:SUBCLASS_OF*0..%d]-(related:RadLexConcept)
+        RETURN DISTINCT 
+            related.rid as rid, 
+            related.label as label,
+            coalesce(related.definition, '') as definition,
+            length(path) as distance
+        ORDER BY distance
+        LIMIT 20
+    """ % depth, name="concept_context", rid=rid)
 
 def graphrag_query(user_question, top_k=3, depth=2):
     """Complete GraphRAG pipeline"""
@@ -91,8 +80,7 @@ def graphrag_query(user_question, top_k=3, depth=2):
 
     return context_text
 
-# Test queries
-if __name__ == "__main__":
+def main():
     # Example 1: Imaging modality question
     graphrag_query("What imaging modality is best for detecting brain tumors?")
 
@@ -102,4 +90,9 @@ if __name__ == "__main__":
     # Example 3: Technical imaging question
     graphrag_query("What is the difference between T1 and T2 weighted MRI?")
 
-driver.close()
\ No newline at end of file
+    print(graph_db.METRICS.report())
+    graph_db.close()
+
+# Test queries
+if __name__ == "__main__":
+    main()
\ No newline at end of file
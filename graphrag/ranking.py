@@ -0,0 +1,104 @@
+"""
+Graph-aware re-ranking of retrieved concepts and their relatives
+Vector hits, exact mentions and each candidate's neighbourhood are scored together,
+so the concepts and relationship lines that reach the prompt are the ones most tied
+to the report rather than whatever the graph queries returned first.
+"""
+import numpy as np
+
+from graphrag.lexicon import tokenize
+
+W_VECTOR = 1.0
+W_LEXICAL = 0.5
+# Reward for being linked to other candidates; capped at SUPPORT_CAP links
+W_SUPPORT = 0.3
+SUPPORT_CAP = 3
+HOP_DECAY = 0.6
+# Penalty per unit of a concept's hub score (graphrag.graph_features); 0 for leaves
+W_HUB = 0.15
+# rel_type -> weight for related items; anything not listed counts as 1.0
+REL_TYPE_WEIGHTS = {"hierarchy": 0.8}
+DEFAULT_REL_WEIGHT = 1.0
+
+
+def _mentioned(names, report_text):
+    """Whether each name occurs as a whole-token phrase in the report"""
+    padded = f" {' '.join(tokenize(report_text))} "
+    return np.array([bool(t) and f" {t} " in padded for t in (" ".join(tokenize(n)) for n in names)], dtype=bool)
+
+
+def score_concepts(vector_scores, lexical, support, hub=0.0):
+    return (W_VECTOR * vector_scores + W_LEXICAL * lexical + W_SUPPORT * np.minimum(support, SUPPORT_CAP) / SUPPORT_CAP
+            - W_HUB * hub)
+
+
+def score_related(concept_scores, rel_weights, hops, mentioned, neighbor_vector_scores):
+    """Related items inherit their concept's score, discounted by relationship type and distance"""
+    return concept_scores * rel_weights * HOP_DECAY ** (hops - 1) + W_LEXICAL * mentioned + W_VECTOR * neighbor_vector_scores
+
+
+def rerank(vector_hits, lexical_hits, contexts, report_text, top_k=10, related_budget=None):
+    """
+    Pick the best top_k concepts and the best related_budget relationship lines overall.
+    contexts maps rid -> get_concept_context() items. Returns concept dicts, best first,
+    each with a 'related' list ordered by score. Exact mentions outrank every concept
+    that is only a vector hit, since W_LEXICAL exceeds W_SUPPORT + W_HUB.
+    """
+    pool = {}
+    for hit in vector_hits + lexical_hits:
+        pool.setdefault(hit["rid"], hit)
+    if not pool:
+        return []
+    rids = list(pool)
+    position = {rid: i for i, rid in enumerate(rids)}
+    vector = np.zeros(len(rids))
+    for hit in vector_hits:
+        vector[position[hit["rid"]]] = hit["score"]
+    lexical = np.zeros(len(rids))
+    mentions = [position[hit["rid"]] for hit in lexical_hits]
+    lexical[mentions] = 1.0
+    # Lexical hits carry no cosine of their own, and a zero would rank an exact mention below a
+    # weak semantic neighbour; a mention counts as at least as similar as the best vector hit
+    vector[mentions] = np.maximum(vector[mentions], vector.max())
+    # Backends without graph features leave hub_score out, which means no penalty
+    hub = np.array([pool[rid].get("hub_score", 0.0) for rid in rids])
+
+    # Flatten every related item once; all scoring below is array arithmetic
+    owner, names, rel_types, hops = [], [], [], []
+    for i, rid in enumerate(rids):
+        for item in contexts.get(rid, []):
+            owner.append(i)
+            names.append(item["name"])
+            rel_types.append(item["rel_type"])
+            hops.append(item.get("hops", 1))
+    owner = np.array(owner, dtype=np.int64)
+    hops = np.array(hops, dtype=np.float64)
+
+    by_name = {}
+    for i, rid in enumerate(rids):
+        by_name.setdefault(pool[rid]["name"], i)
+    linked = np.array([by_name.get(name, -1) for name in names], dtype=np.int64)
+    is_link = (linked >= 0) & (linked != owner)
+    support = np.bincount(owner[is_link], minlength=len(rids))
+
+    concept_scores = score_concepts(vector, lexical, support, hub)
+    chosen = np.argsort(-concept_scores, kind="stable")[:top_k]
+    if len(owner) == 0:
+        return [dict(pool[rids[i]], rank_score=float(concept_scores[i]), related=[]) for i in chosen]
+
+    keep = np.isin(owner, chosen)
+    rel_weights = np.array([REL_TYPE_WEIGHTS.get(r, DEFAULT_REL_WEIGHT) for r in rel_types])
+    neighbor_vector = np.where(is_link, vector[np.maximum(linked, 0)], 0.0)
+    item_scores = score_related(concept_scores[owner], rel_weights, hops, _mentioned(names, report_text),
+                                neighbor_vector)
+    item_scores[~keep] = -np.inf
+    # A chosen concept adds nothing when repeated as another chosen concept's relative
+    item_scores[is_link & np.isin(linked, chosen)] = -np.inf
+
+    budget = int(keep.sum()) if related_budget is None else related_budget
+    order = np.argsort(-item_scores, kind="stable")[:budget]
+    order = order[np.isfinite(item_scores[order])]
+    related = {i: [] for i in chosen}
+    for j in order:
+        related[owner[j]].append({"name": names[j], "rel_type": rel_types[j], "score": float(item_scores[j])})
+    return [dict(pool[rids[i]], rank_score=float(concept_scores[i]), related=related[i]) for i in chosen]
@@ -0,0 +1,178 @@
+"""
+RadLex context assembly shared by dataset preparation and the billing service
+A backend is any object with semantic_search(query_text, limit) and get_concept_context(rid, depth)
+and optionally lexical_search(query_text, limit) for exact label/synonym mentions.
+Select the backend with GRAPH_BACKEND=neo4j (default) or GRAPH_BACKEND=memory plus GRAPH_SNAPSHOT.
+Concept blocks and re-ranking neighbourhoods are fetched once per backend (see
+graphrag.fragments); GRAPH_FRAGMENTS points at a precomputed fragment file.
+"""
+import os
+from functools import lru_cache
+
+from graphrag.fragments import FragmentStore, assemble
+from graphrag.tracing import span
+
+GRAPH_BACKEND = os.getenv("GRAPH_BACKEND", "neo4j")
+GRAPH_SNAPSHOT = os.getenv("GRAPH_SNAPSHOT", "radlex_snapshot")
+GRAPH_FRAGMENTS = os.getenv("GRAPH_FRAGMENTS")
+LEXICAL_MATCHING = os.getenv("GRAPH_LEXICAL_MATCHING", "1") != "0"
+# At most this share of the top_k slots goes to exact mentions; vector hits fill the rest
+LEXICAL_SHARE = 0.5
+RERANK = os.getenv("GRAPH_RERANK", "1") != "0"
+# With re-ranking, retrieve CANDIDATE_POOL * top_k concepts, take their wider neighbourhoods
+# from the fragment store, and keep the best RELATED_PER_CONCEPT * top_k relationship lines overall
+CANDIDATE_POOL = 2
+RELATED_PER_CONCEPT = 8
+REPORT_MARKER = "Radiology Report:"
+
+_backends = {}
+_fragment_stores = {}
+
+
+def get_backend(name=None):
+    """Configured backend, created once per process"""
+    name = name or GRAPH_BACKEND
+    if name not in _backends:
+        if name == "neo4j":
+            from graphrag import neo4j_backend
+
+            _backends[name] = neo4j_backend
+        elif name == "memory":
+            from graphrag.memory_backend import InMemoryGraphBackend
+
+            _backends[name] = InMemoryGraphBackend.load(GRAPH_SNAPSHOT)
+        else:
+            raise ValueError(f"Unknown GRAPH_BACKEND {name!r}; expected 'neo4j' or 'memory'")
+    return _backends[name]
+
+
+def get_fragment_store(backend):
+    """Fragment store for a backend, created once and seeded from GRAPH_FRAGMENTS if set"""
+    entry = _fragment_stores.get(id(backend))
+    if entry is None or entry[0] is not backend:
+        store = FragmentStore.load(GRAPH_FRAGMENTS, backend) if GRAPH_FRAGMENTS else FragmentStore(backend)
+        entry = _fragment_stores[id(backend)] = (backend, store)
+    return entry[1]
+
+
+def list_concepts(backend):
+    """Every concept as {rid, name, definition}, from the snapshot tables or from Neo4j"""
+    if hasattr(backend, "rids"):
+        return [{"rid": rid, "name": name, "definition": definition}
+                for rid, name, definition in zip(backend.rids, backend.names, backend.definitions)]
+    from graphrag import graph_db
+
+    return graph_db.read("""
+        MATCH (c:RadLexConcept)
+        RETURN c.rid as rid, coalesce(c.preferredName, c.label) as name,
+               coalesce(c.definition, '') as definition
+    """, name="list_concepts")
+
+
+class CachedBackend:
+    """Memoizes a backend's searches and neighbourhood lookups; templated reports repeat both"""
+
+    def __init__(self, backend, maxsize=100000):
+        self.backend = backend
+        self.semantic_search = lru_cache(maxsize)(backend.semantic_search)
+        self.get_concept_context = lru_cache(maxsize)(backend.get_concept_context)
+        if hasattr(backend, "lexical_search"):
+            self.lexical_search = lru_cache(maxsize)(backend.lexical_search)
+
+
+def _search(backend, report_text, limit, lexical):
+    with span("retrieval.semantic_search"):
+        vector_hits = backend.semantic_search(report_text, limit=limit)
+    lexical_search = getattr(backend, "lexical_search", None)
+    if not lexical or lexical_search is None:
+        return vector_hits, []
+    with span("retrieval.lexical_search"):
+        return vector_hits, lexical_search(report_text, limit=max(1, int(limit * LEXICAL_SHARE)))
+
+
+def _merge_hits(lexical_hits, vector_hits, top_k):
+    merged = []
+    seen = set()
+    for hit in lexical_hits + vector_hits:
+        if hit['rid'] not in seen:
+            seen.add(hit['rid'])
+            merged.append(hit)
+    return merged[:top_k]
+
+
+def find_candidates(backend, report_text, top_k=10, lexical=LEXICAL_MATCHING):
+    """Exact mentions first, then vector hits, de-duplicated by rid"""
+    vector_hits, lexical_hits = _search(backend, report_text, top_k, lexical)
+    return _merge_hits(lexical_hits, vector_hits, top_k)
+
+
+def _rerank_contexts(store, hits, depth):
+    contexts = {}
+    with span("retrieval.graph_context"):
+        for hit in hits:
+            if hit['rid'] not in contexts:
+                contexts[hit['rid']] = store.neighbourhood(hit['rid'], depth)
+    return contexts
+
+
+def _rerank(vector_hits, lexical_hits, contexts, report_text, top_k):
+    from graphrag.ranking import rerank
+
+    with span("retrieval.rerank"):
+        return rerank(vector_hits, lexical_hits, contexts, report_text, top_k, RELATED_PER_CONCEPT * top_k)
+
+
+def rank_candidates(backend, report_text, top_k=10, depth=2, lexical=LEXICAL_MATCHING):
+    """Concepts with their 'related' items, chosen by graph-aware re-ranking over a wider pool"""
+    vector_hits, lexical_hits = _search(backend, report_text, top_k * CANDIDATE_POOL, lexical)
+    contexts = _rerank_contexts(get_fragment_store(backend), lexical_hits + vector_hits, depth)
+    return _rerank(vector_hits, lexical_hits, contexts, report_text, top_k)
+
+
+def build_radlex_context(backend, report_text, top_k=10, depth=2, rerank=RERANK):
+    store = get_fragment_store(backend)
+    if rerank:
+        concepts = rank_candidates(backend, report_text, top_k, depth)
+        with span("retrieval.format"):
+            return assemble([store.ranked_fragment(c) for c in concepts])
+    candidates = find_candidates(backend, report_text, top_k)
+    # Cached fragments skip both the neighbourhood query and the formatting
+    with span("retrieval.graph_context"):
+        fragments = [store.fragment(c, depth) for c in candidates]
+    with span("retrieval.format"):
+        return assemble(fragments)
+
+
+def build_context_variants(backend, report_text, top_k=10, depths=(1, 2), rerank=RERANK):
+    """
+    Contexts for an ablation grid from one search: {"top_k": concepts without relatives,
+    "depth_<d>": full context per depth}. With re-ranking, neighbourhoods are fetched once at
+    the deepest depth and filtered by hop count for the shallower ones, and "top_k" holds the
+    headers of the concepts chosen at the deepest depth, so it differs from that context
+    only by the relatives.
+    """
+    store = get_fragment_store(backend)
+    limit = top_k * CANDIDATE_POOL if rerank else top_k
+    vector_hits, lexical_hits = _search(backend, report_text, limit, LEXICAL_MATCHING)
+    if rerank:
+        contexts = _rerank_contexts(store, lexical_hits + vector_hits, max(depths))
+        chosen = {}
+        for depth in depths:
+            within = {rid: [item for item in items if item.get('hops', 1) <= depth] for rid, items in contexts.items()}
+            chosen[depth] = _rerank(vector_hits, lexical_hits, within, report_text, top_k)
+        return {"top_k": assemble([store.header(c) for c in chosen[max(depths)]]),
+                **{f"depth_{depth}": assemble([store.ranked_fragment(c) for c in concepts])
+                   for depth, concepts in chosen.items()}}
+    candidates = _merge_hits(lexical_hits, vector_hits, top_k)
+    variants = {"top_k": assemble([store.header(c) for c in candidates])}
+    with span("retrieval.graph_context"):
+        for depth in depths:
+            variants[f"depth_{depth}"] = assemble([store.fragment(c, depth) for c in candidates])
+    return variants
+
+
+def compose_report_with_context(context, report_text):
+    """The report under REPORT_MARKER, after its context block if there is one; this is the
+    report field of llm.prompts.BILLING_PROMPT"""
+    prefix = f"{context}\n\n" if context else ""
+    return f"{prefix}{REPORT_MARKER}\n{report_text}\n"
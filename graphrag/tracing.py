@@ -0,0 +1,135 @@
+"""
+Per-stage timing for the retrieval and generation pipeline
+Stages are timed with span("retrieval.encode") into latency histograms in REGISTRY,
+which export as Prometheus text or a JSON summary:
+
+    print(tracing.REGISTRY.report())
+    tracing.REGISTRY.dump("metrics.prom")    # or metrics.json
+
+With GRAPHRAG_OTEL=1 and opentelemetry installed, every span is also an OpenTelemetry span.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds, from sub-millisecond lookups to long generations
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+OTEL_ENABLED = os.getenv("GRAPHRAG_OTEL") == "1"
+METRIC_NAME = "graphrag_stage_seconds"
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Linear interpolation inside the bucket holding the q-th observation, as histogram_quantile does"""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, n in enumerate(self.counts):
+            if cumulative + n >= rank and n:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - cumulative) / n, self.max)
+            cumulative += n
+        return self.max
+
+
+class TimerRegistry:
+    """Thread-safe histograms keyed by stage name"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+
+    def summary(self):
+        with self._lock:
+            return {
+                name: {
+                    "count": h.count, "total_s": h.sum, "mean_ms": 1000 * h.sum / h.count,
+                    "p50_ms": 1000 * h.quantile(0.5), "p95_ms": 1000 * h.quantile(0.95),
+                    "p99_ms": 1000 * h.quantile(0.99), "max_ms": 1000 * h.max,
+                }
+                for name, h in sorted(self.histograms.items()) if h.count
+            }
+
+    def prometheus(self):
+        lines = [f"# HELP {METRIC_NAME} Wall-clock time per pipeline stage", f"# TYPE {METRIC_NAME} histogram"]
+        with self._lock:
+            for name, h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, n in zip(h.buckets, h.counts):
+                    cumulative += n
+                    lines.append(f'{METRIC_NAME}_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{METRIC_NAME}_bucket{{stage="{name}",le="+Inf"}} {h.count}')
+                lines.append(f'{METRIC_NAME}_sum{{stage="{name}"}} {h.sum}')
+                lines.append(f'{METRIC_NAME}_count{{stage="{name}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+    def report(self):
+        lines = [f"{'stage':<36} {'count':>8} {'total s':>9} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"]
+        for name, s in sorted(self.summary().items(), key=lambda item: -item[1]["total_s"]):
+            lines.append(f"{name[:36]:<36} {s['count']:>8} {s['total_s']:>9.2f} {s['mean_ms']:>9.2f} "
+                         f"{s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} {s['p99_ms']:>9.2f}")
+        return "\n".join(lines)
+
+    def dump(self, path):
+        """Prometheus text for .prom/.txt paths, JSON summary otherwise"""
+        path = str(path)
+        with open(path, "w") as f:
+            if path.endswith((".prom", ".txt")):
+                f.write(self.prometheus())
+            else:
+                json.dump(self.summary(), f, indent=2)
+
+
+REGISTRY = TimerRegistry()
+_tracer = None
+
+
+def _otel_span(name):
+    global _tracer
+    if _tracer is None:
+        from opentelemetry import trace
+
+        _tracer = trace.get_tracer("graphrag")
+    return _tracer.start_as_current_span(name)
+
+
+@contextmanager
+def span(name, registry=REGISTRY):
+    start = time.perf_counter()
+    try:
+        if OTEL_ENABLED:
+            with _otel_span(name):
+                yield
+        else:
+            yield
+    finally:
+        registry.observe(name, time.perf_counter() - start)
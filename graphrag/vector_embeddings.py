@@ -1,12 +1,12 @@
-from neo4j import GraphDatabase
-from sentence_transformers import SentenceTransformer
+import os
 import time
 
-# Load embedding model
-print("Loading embedding model...")
-model = SentenceTransformer('all-MiniLM-L6-v2')
+from graphrag import embedding, graph_db, jobs
+from graphrag.write_scheduler import WriteScheduler
 
-driver = GraphDatabase.driver("localhost")
+JOBS_DIR = os.getenv("GRAPHRAG_JOBS_DIR", "jobs")
+# Concepts per work unit; a rerun of an interrupted unit embeds only what it had not written yet
+UNIT_SIZE = 5000
 
 def create_vector_index(tx):
     # Create vector index for semantic search
@@ -21,62 +21,102 @@ def create_vector_index(tx):
     """
     tx.run(query)
 
-def get_concepts_without_embeddings(tx, limit=100):
+def get_embedding_inputs(tx):
     query = """
     MATCH (c:RadLexConcept)
-    WHERE c.embedding IS NULL AND c.label IS NOT NULL
-    RETURN c.rid as rid, c.label as label, 
+    WHERE c.label IS NOT NULL
+    RETURN c.rid as rid, c.label as label, coalesce(c.definition, '') as definition
+    ORDER BY rid
+    """
+    return [dict(record) for record in tx.run(query)]
+
+def get_unit_concepts(tx, first, last, model_name):
+    # Concepts in [first, last] still missing an embedding from this model
+    query = """
+    MATCH (c:RadLexConcept)
+    WHERE c.rid >= $first AND c.rid <= $last AND c.label IS NOT NULL
+      AND (c.embedding IS NULL OR coalesce(c.embeddingModel, $model) <> $model)
+    RETURN c.rid as rid, c.label as label,
            coalesce(c.definition, '') as definition
-    LIMIT $limit
+    ORDER BY rid
     """
-    result = tx.run(query, limit=limit)
+    result = tx.run(query, first=first, last=last, model=model_name)
     return [dict(record) for record in result]
 
-def update_embeddings(tx, embeddings_batch):
+def update_embeddings(tx, embeddings_batch, model_name=embedding.EMBEDDING_MODEL):
     query = """
     UNWIND $batch AS item
     MATCH (c:RadLexConcept {rid: item.rid})
-    SET c.embedding = item.embedding
+    SET c.embedding = item.embedding, c.embeddingModel = $model
     """
-    tx.run(query, batch=embeddings_batch)
-
-print("Creating vector index...")
-with driver.session() as session:
-    session.execute_write(create_vector_index)
-
-print("Adding vector embeddings...")
-total_processed = 0
-start_time = time.time()
-
-with driver.session() as session:
-    while True:
-        # Get batch of concepts without embeddings
-        concepts = session.execute_read(get_concepts_without_embeddings, limit=100)
-
-        if not concepts:
-            break
-
-        # Generate embeddings
-        embeddings_batch = []
-        for concept in concepts:
-            # Combine label and definition for richer embedding
-            text = concept['label']
-            if concept['definition']:
-                text += ": " + concept['definition']
-
-            embedding = model.encode(text)
-            embeddings_batch.append({
-                "rid": concept['rid'],
-                "embedding": embedding.tolist()
-            })
-
-        # Update in Neo4j
-        session.execute_write(update_embeddings, embeddings_batch)
-        total_processed += len(embeddings_batch)
-
-        elapsed = time.time() - start_time
-        rate = total_processed / elapsed if elapsed > 0 else 0
-        print(f"Processed {total_processed} embeddings... ({rate:.1f} concepts/sec)")
-
-print(f"\n Embeddings complete! Processed {total_processed} concepts in {elapsed:.1f} seconds")
-driver.close()
\ No newline at end of file
+    tx.run(query, batch=embeddings_batch, model=model_name)
+
+def embedding_text(concept):
+    # Combine label and definition for richer embedding
+    text = concept['label']
+    if concept['definition']:
+        text += ": " + concept['definition']
+    return text
+
+def open_manifest(session, jobs_dir=JOBS_DIR, unit_size=UNIT_SIZE):
+    """Concept-range units over rid order; the ontology version covers exactly what is embedded"""
+    concepts = session.execute_read(get_embedding_inputs)
+    params = {
+        "model": embedding.EMBEDDING_MODEL,
+        "dimensions": embedding.EMBEDDING_DIM,
+        "concepts": len(concepts),
+        "ontology": jobs.fingerprint([[c['rid'], embedding_text(c)] for c in concepts]),
+    }
+    units = [{"id": unit_id, "first": chunk[0]['rid'], "last": chunk[-1]['rid']}
+             for unit_id, chunk in jobs.chunk_units("concepts", concepts, unit_size)]
+    return jobs.JobManifest.open(jobs_dir, "embed", params, units)
+
+def main(batch_size=100, jobs_dir=JOBS_DIR):
+    print("Loading embedding model...")
+    model = embedding.get_model()
+
+    print("Creating vector index...")
+    with graph_db.session() as session:
+        session.execute_write(create_vector_index)
+
+    print("Adding vector embeddings...")
+    start_time = time.time()
+
+    with graph_db.session() as session, WriteScheduler() as writer:
+        manifest = open_manifest(session, jobs_dir)
+        print(f"Job {manifest.path}: {manifest.status()}")
+        total_processed = 0
+
+        def process_unit(unit):
+            nonlocal total_processed
+            concepts = session.execute_read(
+                get_unit_concepts, unit['first'], unit['last'], embedding.EMBEDDING_MODEL)
+            for start in range(0, len(concepts), batch_size):
+                batch = concepts[start:start + batch_size]
+                vectors = model.encode([embedding_text(c) for c in batch], batch_size=batch_size)
+                embeddings_batch = [{"rid": c['rid'], "embedding": v.tolist()} for c, v in zip(batch, vectors)]
+                # Written in the background, sized by payload; encoding continues meanwhile
+                writer.submit(update_embeddings, embeddings_batch, model_name=embedding.EMBEDDING_MODEL)
+                total_processed += len(embeddings_batch)
+            # The unit only counts as done once its embeddings are committed
+            writer.flush()
+
+            elapsed = time.time() - start_time
+            rate = total_processed / elapsed if elapsed > 0 else 0
+            print(f"{unit['id']}: processed {total_processed} embeddings... ({rate:.1f} concepts/sec)")
+            return {"embedded": len(concepts)}
+
+        failed = manifest.run(process_unit)
+
+    elapsed = time.time() - start_time
+    print(f"\n Embeddings complete! Processed {total_processed} concepts in {elapsed:.1f} seconds")
+    status = manifest.status()
+    print(f"Job {manifest.path}: {status}" + (f", failed units: {failed}" if failed else ""))
+    print(f"Writes: {writer.summary()}")
+    if status["pending"] or status["claimed"]:
+        print("Units remain; rerun (or run more workers) to finish")
+    print(graph_db.METRICS.report())
+    graph_db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Adaptive batching and backpressure for Neo4j bulk writes (import, sync, embeddings)
+Rows are packed into batches by estimated Bolt payload size rather than by count, so a
+batch of embedding vectors and a batch of short relationship rows cost the server about
+the same. After every commit the byte budget moves toward what the measured throughput
+can commit in TARGET_COMMIT_SECONDS. A batch that still fails with a transient, memory or
+timeout error is split in half and retried with backoff; the budget, a ceiling below the
+failed size and the number of concurrent transactions shrink with it and recover slowly
+as commits succeed. Each attempt is one explicit transaction, so this is the only retry
+layer: the driver's managed-transaction retries would keep resending the failing size.
+A failure is raised once, by the next submit or flush, after which the scheduler can be
+reused (embedding runs keep one across work units).
+
+    with WriteScheduler() as writer:
+        writer.submit(import_concepts_batch, concepts)
+        writer.flush()  # concepts must exist before their relationships
+        writer.submit(importer, rels, name="import_SUBCLASS_OF")
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from graphrag import graph_db
+
+MAX_IN_FLIGHT = int(os.getenv("NEO4J_WRITE_IN_FLIGHT", "2"))
+TARGET_COMMIT_SECONDS = float(os.getenv("NEO4J_WRITE_TARGET_SECONDS", "1.0"))
+INITIAL_BATCH_BYTES = 256 * 1024
+MIN_BATCH_BYTES = 8 * 1024
+MAX_BATCH_BYTES = 16 * 1024 * 1024
+MAX_BATCH_ROWS = 20000
+# One commit can suggest at most MAX_GROWTH x the budget; smoothing keeps a single slow commit from halving it
+MAX_GROWTH = 2.0
+SMOOTHING = 0.3
+# Successful commits before one more concurrent transaction is allowed again and the
+# size ceiling learned from a failure is relaxed by CEILING_RECOVERY
+RECOVERY_COMMITS = 10
+CEILING_RECOVERY = 1.25
+MAX_RETRIES = 5
+# Server-side failures that a smaller batch can avoid
+RESOURCE_ERRORS = ("MemoryPoolOutOfMemoryError", "TransactionTimedOut", "OutOfMemoryError")
+
+
+def payload_bytes(value):
+    """Rough Bolt-encoded size; numeric lists such as embeddings are costed without a walk"""
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 9
+    if isinstance(value, str):
+        return len(value) + 5
+    if isinstance(value, dict):
+        return 5 + sum(len(k) + 5 + payload_bytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        if value and isinstance(value[0], (int, float)) and not isinstance(value[0], bool):
+            return 5 + 9 * len(value)
+        return 5 + sum(payload_bytes(v) for v in value)
+    return len(str(value)) + 5
+
+
+def is_retryable(error):
+    from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
+
+    if isinstance(error, (TransientError, ServiceUnavailable, SessionExpired)):
+        return True
+    return any(marker in (getattr(error, "code", None) or "") for marker in RESOURCE_ERRORS)
+
+
+class WriteScheduler:
+    """Runs write batches on up to max_in_flight pooled sessions; submit blocks when they are busy"""
+
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, target_seconds=TARGET_COMMIT_SECONDS,
+                 initial_bytes=INITIAL_BATCH_BYTES, min_bytes=MIN_BATCH_BYTES, max_bytes=MAX_BATCH_BYTES,
+                 max_rows=MAX_BATCH_ROWS):
+        self.max_in_flight = max_in_flight
+        self.target_seconds = target_seconds
+        self.min_bytes = min_bytes
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.batch_bytes = initial_bytes
+        self.ceiling = max_bytes
+        self.limit = max_in_flight
+        self.in_flight = 0
+        self._successes = 0
+        self._error = None
+        self._futures = []
+        self._cond = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_in_flight, thread_name_prefix="neo4j-write")
+        self.stats = {"batches": 0, "rows": 0, "bytes": 0, "retries": 0, "splits": 0, "commit_s": 0.0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.flush()
+        finally:
+            self._pool.shutdown(wait=True)
+
+    def submit(self, work, rows, name=None, **params):
+        """Queue work(tx, batch, **params) over rows, packed to the current byte budget"""
+        name = name or work.__name__
+        batch, size = [], 0
+        for row in rows:
+            row_bytes = payload_bytes(row)
+            if batch and (size + row_bytes > self.batch_bytes or len(batch) >= self.max_rows):
+                self._dispatch(work, batch, size, name, params)
+                batch, size = [], 0
+            batch.append(row)
+            size += row_bytes
+        if batch:
+            self._dispatch(work, batch, size, name, params)
+
+    def flush(self):
+        """Wait for every queued batch; raises the first failure since the last flush and clears it"""
+        futures, self._futures = self._futures, []
+        for future in futures:
+            try:
+                future.result()
+            except Exception:
+                pass  # kept in self._error
+        with self._cond:
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _dispatch(self, work, batch, size, name, params):
+        while True:
+            with self._cond:
+                while self.in_flight >= self.limit and self._error is None:
+                    self._cond.wait()
+                if self._error is None:
+                    # Every batch handed to the pool holds a slot until _commit releases it
+                    self.in_flight += 1
+                    break
+            # Raises the failure once the batches already queued have finished
+            self.flush()
+        self._futures.append(self._pool.submit(self._commit, work, batch, size, name, params))
+
+    def _commit(self, work, batch, size, name, params):
+        try:
+            self._write(work, batch, size, name, params)
+        except Exception as e:
+            with self._cond:
+                self._error = self._error or e
+            raise
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def _write(self, work, batch, size, name, params):
+        for attempt in range(MAX_RETRIES):
+            start = time.perf_counter()
+            try:
+                with graph_db.session() as session:
+                    session.execute_write_once(work, batch, name=name, **params)
+            except Exception as e:
+                if not is_retryable(e) or attempt == MAX_RETRIES - 1:
+                    raise
+                self._shrink(size)
+                time.sleep(min(2 ** attempt, 30) * random.uniform(0.5, 1.5))
+                if len(batch) > 1:
+                    # Each half gets its own retries, at a size the server has a better chance with
+                    mid = len(batch) // 2
+                    with self._cond:
+                        self.stats["splits"] += 1
+                    for half in (batch[:mid], batch[mid:]):
+                        self._write(work, half, sum(payload_bytes(row) for row in half), name, params)
+                    return
+                with self._cond:
+                    self.stats["retries"] += 1
+                continue
+            self._adapt(time.perf_counter() - start, size, len(batch))
+            return
+
+    def _adapt(self, seconds, size, rows):
+        with self._cond:
+            self.stats["batches"] += 1
+            self.stats["rows"] += rows
+            self.stats["bytes"] += size
+            self.stats["commit_s"] += seconds
+            # Size that the observed rate commits in target_seconds
+            ideal = size * self.target_seconds / max(seconds, 1e-3)
+            ideal = min(ideal, self.batch_bytes * MAX_GROWTH)
+            self.batch_bytes = int(min(self.ceiling, max(self.min_bytes,
+                                   (1 - SMOOTHING) * self.batch_bytes + SMOOTHING * ideal)))
+            self._successes += 1
+            if self._successes >= RECOVERY_COMMITS:
+                self._successes = 0
+                self.ceiling = min(self.max_bytes, int(self.ceiling * CEILING_RECOVERY))
+                if self.limit < self.max_in_flight:
+                    self.limit += 1
+                    self._cond.notify_all()
+
+    def _shrink(self, failed_size):
+        with self._cond:
+            self.ceiling = max(self.min_bytes, min(self.ceiling, failed_size // 2))
+            self.batch_bytes = min(self.ceiling, max(self.min_bytes, self.batch_bytes // 2))
+            self.limit = max(1, self.limit // 2)
+            self._successes = 0
+
+    def summary(self):
+        with self._cond:
+            stats = dict(self.stats)
+            stats["batch_bytes"] = self.batch_bytes
+            stats["ceiling_bytes"] = self.ceiling
+            stats["in_flight_limit"] = self.limit
+        batches = stats["batches"] or 1
+        stats["mean_batch_rows"] = stats["rows"] / batches
+        stats["mean_commit_ms"] = 1000 * stats["commit_s"] / batches
+        return stats
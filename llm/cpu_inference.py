@@ -0,0 +1,210 @@
+"""
+CPU export and batched CPU inference for the merged gemma-3-270m key-findings model
+Two int8 runtimes are supported for the full_model written by gemma3-270m_test.py:
+    torch-int8  torch dynamic quantization of every nn.Linear (weights int8, activations
+                quantized on the fly); needs only torch and transformers
+    onnx-int8   ONNX export with dynamic int8 quantization, run by ONNX Runtime
+                (needs optimum[onnxruntime])
+
+    python -m llm.cpu_inference export OUTPUT_DIR/full_model cpu_model --runtime torch-int8
+    python -m llm.cpu_inference generate cpu_model reports.csv findings.jsonl --threads 8 --batch-size 8
+    python -m benchmarks.cpu_inference OUTPUT_DIR/full_model cpu_model --reports reports.csv
+
+Generation is greedy with left padding, and batches are cut from length-sorted reports
+so little compute goes to padding.
+"""
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+from graphrag.tracing import span
+from llm.prompts import KEY_FINDINGS_PROMPT
+
+RUNTIMES = ("torch-int8", "onnx-int8")
+MAX_LENGTH = 2048
+MAX_NEW_TOKENS = 128
+BATCH_SIZE = 8
+THREADS = int(os.getenv("CPU_THREADS", "0")) or os.cpu_count()
+EXPORT_INFO = "cpu_export.json"
+TORCH_WEIGHTS = "model_int8.pt"
+ONNX_QUANTIZED = "model_quantized.onnx"
+
+
+def _load_tokenizer(path):
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(path)
+    # Left padding keeps every prompt's last token at the same position for batched decoding
+    tokenizer.padding_side = "left"
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    return tokenizer
+
+
+def _quantize_torch(model):
+    import torch
+
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def export_torch_int8(model_dir, output_dir):
+    import torch
+    from transformers import AutoModelForCausalLM
+
+    model = AutoModelForCausalLM.from_pretrained(model_dir, torch_dtype=torch.float32).eval()
+    model.config.save_pretrained(output_dir)
+    if model.generation_config is not None:
+        model.generation_config.save_pretrained(output_dir)
+    torch.save(_quantize_torch(model).state_dict(), Path(output_dir) / TORCH_WEIGHTS)
+
+
+def export_onnx_int8(model_dir, output_dir):
+    from optimum.onnxruntime import ORTModelForCausalLM, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    ORTModelForCausalLM.from_pretrained(model_dir, export=True, use_cache=True).save_pretrained(output_dir)
+    quantizer = ORTQuantizer.from_pretrained(output_dir)
+    # avx2 kernels run on any x86-64 CPU of the last decade; per-tensor, dynamic activations
+    config = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+    quantizer.quantize(save_dir=output_dir, quantization_config=config)
+
+
+def export(model_dir, output_dir, runtime="torch-int8"):
+    """Write an int8 CPU model plus its tokenizer; returns the export record"""
+    if runtime not in RUNTIMES:
+        raise ValueError(f"Unknown runtime {runtime!r}; expected one of {RUNTIMES}")
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    if runtime == "torch-int8":
+        export_torch_int8(model_dir, output_dir)
+    else:
+        export_onnx_int8(model_dir, output_dir)
+    _load_tokenizer(model_dir).save_pretrained(output_dir)
+    info = {
+        "runtime": runtime, "source": str(model_dir), "prompt": KEY_FINDINGS_PROMPT.key,
+        "seconds": round(time.perf_counter() - start, 1),
+        "megabytes": round(sum(f.stat().st_size for f in output_dir.iterdir() if f.is_file()) / 2 ** 20, 1),
+    }
+    with open(output_dir / EXPORT_INFO, "w") as f:
+        json.dump(info, f, indent=2)
+    return info
+
+
+def set_threads(threads):
+    import torch
+
+    torch.set_num_threads(threads)
+    try:
+        # Only allowed before any inter-op work has started in this process
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+
+
+def load_cpu_model(path, threads=THREADS):
+    """(model, tokenizer) for an exported directory; threads bounds the intra-op pool"""
+    path = Path(path)
+    with open(path / EXPORT_INFO) as f:
+        runtime = json.load(f)["runtime"]
+    set_threads(threads)
+    if runtime == "torch-int8":
+        import torch
+        from transformers import AutoConfig, AutoModelForCausalLM
+
+        # Build the float structure without loading weights, swap in the int8 Linear layers, then load
+        model = AutoModelForCausalLM.from_config(AutoConfig.from_pretrained(path), torch_dtype=torch.float32)
+        model = _quantize_torch(model.eval())
+        model.load_state_dict(torch.load(path / TORCH_WEIGHTS, map_location="cpu"))
+    else:
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForCausalLM
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        model = ORTModelForCausalLM.from_pretrained(path, file_name=ONNX_QUANTIZED, session_options=options,
+                                                    provider="CPUExecutionProvider")
+    return model, _load_tokenizer(path)
+
+
+def load_baseline(model_dir, device="cpu", threads=THREADS):
+    """The merged model as saved (fp16), for comparison with the int8 exports"""
+    import torch
+    from transformers import AutoModelForCausalLM
+
+    set_threads(threads)
+    model = AutoModelForCausalLM.from_pretrained(model_dir, torch_dtype=torch.float16).to(device).eval()
+    return model, _load_tokenizer(model_dir)
+
+
+def generate_batch(report_texts, model, tokenizer, max_new_tokens=MAX_NEW_TOKENS):
+    """Greedy key findings for one batch of reports"""
+    import torch
+
+    with span("llm.tokenize"):
+        input_ids = KEY_FINDINGS_PROMPT.encode_batch(tokenizer, MAX_LENGTH - max_new_tokens, report=report_texts)
+        inputs = tokenizer.pad({"input_ids": input_ids}, padding=True, return_tensors="pt").to(model.device)
+    with span("llm.generate"), torch.inference_mode():
+        outputs = model.generate(**inputs, max_new_tokens=max_new_tokens, do_sample=False,
+                                 pad_token_id=tokenizer.pad_token_id)
+    with span("llm.decode"):
+        new_tokens = outputs[:, inputs["input_ids"].shape[1]:]
+        texts = tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+    return [text.strip() for text in texts], int((new_tokens != tokenizer.pad_token_id).sum())
+
+
+def generate(report_texts, model, tokenizer, batch_size=BATCH_SIZE, max_new_tokens=MAX_NEW_TOKENS, on_batch=None):
+    """Findings for every report in input order; batches are formed from length-sorted reports"""
+    order = sorted(range(len(report_texts)), key=lambda i: len(report_texts[i]))
+    results = [None] * len(report_texts)
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        began = time.perf_counter()
+        texts, n_tokens = generate_batch([report_texts[i] for i in batch], model, tokenizer, max_new_tokens)
+        for i, text in zip(batch, texts):
+            results[i] = text
+        if on_batch is not None:
+            on_batch(len(batch), n_tokens, time.perf_counter() - began)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m llm.cpu_inference", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("export", help="Quantize a merged model for CPU inference")
+    p.add_argument("model_dir")
+    p.add_argument("output_dir")
+    p.add_argument("--runtime", choices=RUNTIMES, default="torch-int8")
+
+    p = commands.add_parser("generate", help="Key findings for every report in a CSV (note_id, text)")
+    p.add_argument("model_dir", help="Directory written by export")
+    p.add_argument("input_csv")
+    p.add_argument("output_jsonl")
+    p.add_argument("--threads", type=int, default=THREADS)
+    p.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    p.add_argument("--max-new-tokens", type=int, default=MAX_NEW_TOKENS)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        print(json.dumps(export(args.model_dir, args.output_dir, args.runtime), indent=2))
+        return
+
+    import pandas as pd
+
+    reports = pd.read_csv(args.input_csv, usecols=["note_id", "text"]).dropna()
+    model, tokenizer = load_cpu_model(args.model_dir, args.threads)
+    start = time.perf_counter()
+    findings = generate(reports["text"].tolist(), model, tokenizer, args.batch_size, args.max_new_tokens)
+    elapsed = time.perf_counter() - start
+    pd.DataFrame({"note_id": reports["note_id"], "findings": findings}).to_json(
+        args.output_jsonl, orient="records", lines=True)
+    print(f"{len(reports)} reports in {elapsed:.1f}s ({len(reports) / elapsed:.2f} reports/s, {args.threads} threads)")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,100 +3,170 @@ import json
 import numpy as np
 from pathlib import Path
 from tqdm import tqdm
-from neo4j import GraphDatabase
-from sentence_transformers import SentenceTransformer
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import GroupShuffleSplit
+
+from graphrag import embedding, graph_db, jobs, retrieval, tracing
+from llm import dedup
+from llm.report_normalization import normalize_reports
 
 # Config - UPDATE THESE
 DATA_PATH = "YOUR_DATA_PATH.csv"
+FHIR_SOURCE = None  # "search" or "export" to read reports from FHIR_BASE_URL instead of DATA_PATH
+FHIR_PATIENT_IDS = None  # patient ids to search when FHIR_SOURCE = "search"
 OUTPUT_DIR = Path("YOUR_OUTPUT_DIR")
-NEO4J_URI = "YOUR_NEO4J_URI"
-NEO4J_USER = "YOUR_NEO4J_USER"
-NEO4J_PASSWORD = "YOUR_NEO4J_PASSWORD"
 TRAIN_RATIO = 0.8
 RADLEX_TOP_K = 10
 GRAPH_DEPTH = 2
+DEDUP_NEAR = True  # cluster near-duplicates with MinHash/LSH, not just exact copies
+DEDUP_THRESHOLD = 0.8
+# Ablation columns written next to the JSONL: no_context, top_k and depth_<d> for each depth
+VARIANT_DEPTHS = (1, 2, 3)
+# Reports per work unit (whole duplicate clusters); workers sharing OUTPUT_DIR split the units
+UNIT_ROWS = 5000
+# Reports at or below this many characters after cleanup are dropped (None keeps every report)
+MIN_REPORT_CHARS = None
+
+def variant_depths():
+    return sorted(set(VARIANT_DEPTHS) | {GRAPH_DEPTH})
 
-OUTPUT_DIR.mkdir(exist_ok=True)
-model = SentenceTransformer('all-MiniLM-L6-v2')
-driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
-
-def get_all_relationship_types():
-    with driver.session() as session:
-        result = session.run("CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType")
-        return [r['relationshipType'] for r in result]
-
-ALL_RELATIONSHIPS = get_all_relationship_types()
-
-def semantic_search_radlex(query_text, limit=10):
-    embedding = model.encode(query_text).tolist()
-    with driver.session() as session:
-        result = session.run("""
-            CALL db.index.vector.queryNodes('concept_embeddings', $limit, $embedding)
-            YIELD node, score
-            RETURN node.rid as rid, coalesce(node.preferredName, node.label) as name,
-                   coalesce(node.definition, '') as definition, score
-        """, embedding=embedding, limit=limit)
-        return [dict(r) for r in result]
-
-def get_concept_context(rid, depth=2):
-    rel_pattern = "|".join(ALL_RELATIONSHIPS)
-    with driver.session() as session:
-        h = session.run(f"""
-            MATCH (c:RadLexConcept {{rid: $rid}})-[:RDF_SCHEMA_SUBCLASSOF*1..{depth}]-(related:RadLexConcept)
-            RETURN DISTINCT coalesce(related.preferredName, related.label) as name, 'hierarchy' as rel_type LIMIT 5
-        """, rid=rid)
-        hierarchy = [dict(r) for r in h]
-        o = session.run(f"""
-            MATCH (c:RadLexConcept {{rid: $rid}})-[r:{rel_pattern}]-(related:RadLexConcept)
-            WHERE type(r) <> 'RDF_SCHEMA_SUBCLASSOF'
-            RETURN DISTINCT coalesce(related.preferredName, related.label) as name, type(r) as rel_type LIMIT 10
-        """, rid=rid)
-        return hierarchy + [dict(r) for r in o]
-
-def build_radlex_context(report_text, top_k=10, depth=2):
-    concepts = semantic_search_radlex(report_text, limit=top_k)
-    if not concepts:
-        return "RadLex Context: None"
-    lines = ["RadLex Knowledge Graph Context:"]
-    for i, c in enumerate(concepts, 1):
-        lines.append(f"\n{i}. {c['name']} (RID: {c['rid']})")
-        if c['definition']:
-            lines.append(f"   Definition: {c['definition'][:200]}...")
-        related = get_concept_context(c['rid'], depth)
-        rel_groups = {}
-        for item in related:
-            rel_groups.setdefault(item['rel_type'].replace('_', ' ').lower(), []).append(item['name'])
-        for rel_type, names in rel_groups.items():
-            lines.append(f"   {rel_type.title()}: {', '.join(names[:5])}")
-    return "\n".join(lines)
-
-def create_training_text(report_text, note_id):
-    context = build_radlex_context(report_text, RADLEX_TOP_K, GRAPH_DEPTH)
-    return {"note_id": note_id, "text": f"{context}\n\nRadiology Report:\n{report_text}\n"}
-
-def process_dataframe(df, desc):
+def build_variants(report_text, backend=None):
+    return retrieval.build_context_variants(backend or retrieval.get_backend(), report_text, RADLEX_TOP_K,
+                                            variant_depths())
+
+def process_dataframe(df, desc, backend=None):
+    """
+    Retrieval runs once per duplicate cluster and its contexts are shared by every member.
+    Each row carries the training text of every variant; 'text' is the GRAPH_DEPTH one.
+    backend defaults to the configured retrieval backend.
+    """
     examples = []
-    for _, row in tqdm(df.iterrows(), total=len(df), desc=desc):
+    contexts = {}
+    rows = zip(df['note_id'], df['text'], df['cluster'])
+    for note_id, text, cluster in tqdm(rows, total=len(df), desc=desc):
         try:
-            examples.append(create_training_text(row['text'], row['note_id']))
+            if cluster not in contexts:
+                contexts[cluster] = build_variants(text, backend)
+            example = {"note_id": note_id, "no_context": retrieval.compose_report_with_context("", text)}
+            for name, context in contexts[cluster].items():
+                example[name] = retrieval.compose_report_with_context(context, text)
+            example["text"] = example[f"depth_{GRAPH_DEPTH}"]
+            examples.append(example)
         except Exception as e:
-            print(f"Error {row['note_id']}: {e}")
+            print(f"Error {note_id}: {e}")
     return examples
 
+def variant_names():
+    return ["no_context", "top_k", *(f"depth_{d}" for d in variant_depths())]
+
+def save_examples(examples, split):
+    """JSONL of the default text for training scripts, Parquet with one column per variant"""
+    df = pd.DataFrame(examples, columns=["note_id", "text", *variant_names()])
+    # Written atomically, so a rerun after preemption never leaves a truncated dataset behind
+    jobs.atomic_write(OUTPUT_DIR / f"{split}_dataset.jsonl",
+                      df[["note_id", "text"]].to_json(orient='records', lines=True))
+    jobs.atomic_write(OUTPUT_DIR / f"{split}_variants.parquet", df.drop(columns="text").to_parquet(index=False))
+
+def load_variant(data_dir, split, variant):
+    """note_id and text of one variant, shaped like the JSONL dataset"""
+    df = pd.read_parquet(Path(data_dir) / f"{split}_variants.parquet", columns=["note_id", variant])
+    return df.rename(columns={variant: "text"})
+
+def cluster_units(split, df, unit_rows=UNIT_ROWS):
+    """Work units of whole duplicate clusters, about unit_rows reports each, as note_id lists"""
+    groups = [group.tolist() for _, group in df['note_id'].astype(str).groupby(df['cluster'], sort=False)]
+    units, note_ids = [], []
+    for group in groups:
+        note_ids.extend(group)
+        if len(note_ids) >= unit_rows:
+            units.append(note_ids)
+            note_ids = []
+    if note_ids:
+        units.append(note_ids)
+    return [{"id": f"{split}-{i:05d}", "split": split, "note_ids": ids} for i, ids in enumerate(units)]
+
+def job_params(df):
+    """Everything the dataset depends on: input rows, split, retrieval settings and ontology"""
+    return {
+        "source": FHIR_SOURCE or str(DATA_PATH),
+        "reports": jobs.fingerprint([df['note_id'].astype(str).tolist(), df['text'].tolist()]),
+        "min_report_chars": MIN_REPORT_CHARS,
+        "train_ratio": TRAIN_RATIO,
+        "dedup": {"near": DEDUP_NEAR, "threshold": DEDUP_THRESHOLD},
+        "top_k": RADLEX_TOP_K,
+        "graph_depth": GRAPH_DEPTH,
+        "variant_depths": variant_depths(),
+        "backend": retrieval.GRAPH_BACKEND,
+        "snapshot": retrieval.GRAPH_SNAPSHOT if retrieval.GRAPH_BACKEND == "memory" else None,
+        "fragments": retrieval.GRAPH_FRAGMENTS,
+        "rerank": retrieval.RERANK,
+        "lexical": retrieval.LEXICAL_MATCHING,
+        "embedding_model": embedding.EMBEDDING_MODEL,
+        "ontology": jobs.ontology_version(retrieval.list_concepts(retrieval.get_backend())),
+    }
+
+def merge_units(manifest, split):
+    parts = [pd.read_parquet(manifest.output_path(unit_id, ".parquet"))
+             for unit_id, unit in manifest.units.items() if unit['split'] == split]
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["note_id", "text"])
+
+def load_reports():
+    """Reports from FHIR or DATA_PATH with whitespace and de-identification blanks normalized"""
+    if FHIR_SOURCE:
+        from llm.fhir_ingestion import iter_report_rows
+
+        kwargs = {"patient_ids": FHIR_PATIENT_IDS} if FHIR_SOURCE == "search" else {}
+        df = pd.DataFrame(iter_report_rows(FHIR_SOURCE, **kwargs), columns=["note_id", "subject_id", "text"])
+    else:
+        df = pd.read_csv(DATA_PATH)
+    # Retrieval reads the whole report, so the section columns are not parsed here
+    return normalize_reports(df, min_chars=MIN_REPORT_CHARS, sections=()).reset_index(drop=True)
+
 def main():
-    df = pd.read_csv(DATA_PATH)
-    df = df[df['text'].notna()]
-    train_df, val_df = train_test_split(df, test_size=(1 - TRAIN_RATIO), random_state=42)
+    OUTPUT_DIR.mkdir(exist_ok=True)
+    df = load_reports()
+    df['cluster'] = dedup.cluster_ids(df['text'], threshold=DEDUP_THRESHOLD, near=DEDUP_NEAR)
+    print(f"Duplicates: {dedup.cluster_stats(df['cluster'])}")
+
+    # Whole clusters go to one side so near-identical reports cannot leak into validation
+    splitter = GroupShuffleSplit(n_splits=1, test_size=(1 - TRAIN_RATIO), random_state=42)
+    train_idx, val_idx = next(splitter.split(df, groups=df['cluster']))
+    splits = {"train": df.iloc[train_idx], "val": df.iloc[val_idx]}
+
+    # Finished units survive preemption; rerunning, or starting more workers, picks up the rest
+    units = [unit for split, split_df in splits.items() for unit in cluster_units(split, split_df)]
+    manifest = jobs.JobManifest.open(OUTPUT_DIR / "jobs", "prepare-data", job_params(df), units)
+    print(f"Job {manifest.path}: {manifest.status()}")
+
+    # Indexed by note_id once, so each unit looks up its rows instead of scanning the split
+    by_note_id = {split: split_df.set_axis(split_df['note_id'].astype(str).values)
+                  for split, split_df in splits.items()}
+
+    def process_unit(unit):
+        rows = by_note_id[unit['split']].loc[unit['note_ids']]
+        examples = pd.DataFrame(process_dataframe(rows, unit['id']), columns=["note_id", "text", *variant_names()])
+        jobs.atomic_write(manifest.output_path(unit['id'], ".parquet"), examples.to_parquet(index=False))
+        return {"examples": len(examples)}
 
-    train_examples = process_dataframe(train_df, "Training")
-    val_examples = process_dataframe(val_df, "Validation")
+    failed = manifest.run(process_unit)
+    if not manifest.is_complete():
+        print(f"Units remain ({manifest.status()}, failed here: {failed}); rerun to finish")
+        graph_db.close()
+        return
 
-    pd.DataFrame(train_examples).to_json(OUTPUT_DIR / "train_dataset.jsonl", orient='records', lines=True)
-    pd.DataFrame(val_examples).to_json(OUTPUT_DIR / "val_dataset.jsonl", orient='records', lines=True)
+    counts = {}
+    for split in splits:
+        examples = merge_units(manifest, split)
+        save_examples(examples, split)
+        counts[split] = len(examples)
+    jobs.atomic_write(OUTPUT_DIR / "dataset_info.json", json.dumps(
+        {"job": str(manifest.path), "params": manifest.params, "examples": counts}, indent=2))
 
-    print(f"Saved: train ({len(train_examples)}), val ({len(val_examples)})")
-    driver.close()
+    print(f"Saved: train ({counts['train']}), val ({counts['val']})")
+    print(graph_db.METRICS.report())
+    print(tracing.REGISTRY.report())
+    tracing.REGISTRY.dump(OUTPUT_DIR / "metrics.json")
+    tracing.REGISTRY.dump(OUTPUT_DIR / "metrics.prom")
+    graph_db.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
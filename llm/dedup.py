@@ -0,0 +1,140 @@
+"""
+Exact and near-duplicate report clustering ahead of dataset preparation
+Reports are normalized (case, whitespace, de-identification blanks), exact copies share
+a hash, and near-copies are found with MinHash signatures over word shingles banded
+into an LSH index. Candidate pairs are confirmed by signature agreement, so a cluster
+only joins reports whose estimated Jaccard similarity clears THRESHOLD.
+"""
+import hashlib
+import re
+
+import numpy as np
+
+SHINGLE_SIZE = 3
+NUM_PERM = 128
+BANDS = 16  # 16 bands x 8 rows puts the LSH cut-off near Jaccard 0.7
+THRESHOLD = 0.8
+# Shingles hashed per vectorized MinHash step; bounds memory at NUM_PERM x CHUNK uint64
+CHUNK_SHINGLES = 50000
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+# MIMIC-style de-identification blanks and bracketed placeholders; also used by llm.report_normalization
+DEID_TOKEN = re.compile(r"_{2,}|\[\*\*[^\]]*\*\*\]")
+NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_text(text):
+    text = DEID_TOKEN.sub(" ", str(text).lower())
+    return " ".join(NON_WORD.sub(" ", text).split())
+
+
+def _shingle_hashes(token_ids):
+    """32-bit hashes of consecutive SHINGLE_SIZE-token windows, or the whole text if shorter"""
+    ids = np.asarray(token_ids, dtype=np.uint64)
+    if len(ids) == 0:
+        return ids
+    width = min(SHINGLE_SIZE, len(ids))
+    h = np.zeros(len(ids) - width + 1, dtype=np.uint64)
+    for offset in range(width):
+        h = (h * np.uint64(1000003) + ids[offset:offset + len(h)]) & MAX_HASH
+    return np.unique(_mix(h))
+
+
+def _mix(h):
+    """splitmix64 finalizer, truncated to 32 bits. Window hashes of consecutive token ids are
+    close to linear, and the linear MinHash permutations would then give correlated minima
+    that underestimate Jaccard similarity"""
+    h = h ^ (h >> np.uint64(33))
+    h *= np.uint64(0xFF51AFD7ED558CCD)
+    h ^= h >> np.uint64(33)
+    h *= np.uint64(0xC4CEB9FE1A85EC53)
+    h ^= h >> np.uint64(33)
+    return h & MAX_HASH
+
+
+def minhash_signatures(normalized_texts, num_perm=NUM_PERM, seed=1):
+    """(n, num_perm) uint64 MinHash signatures; empty texts get all-max rows"""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)[:, None] & MAX_HASH
+    b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)[:, None] & MAX_HASH
+    vocabulary = {}
+    shingles = [
+        _shingle_hashes([vocabulary.setdefault(t, len(vocabulary)) for t in text.split()])
+        for text in normalized_texts
+    ]
+    signatures = np.full((len(shingles), num_perm), MAX_HASH, dtype=np.uint64)
+    start = 0
+    while start < len(shingles):
+        # Group documents until the chunk holds CHUNK_SHINGLES shingles, then hash them all at once
+        end, total = start, 0
+        while end < len(shingles) and (total == 0 or total + len(shingles[end]) <= CHUNK_SHINGLES):
+            total += len(shingles[end])
+            end += 1
+        docs = [i for i in range(start, end) if len(shingles[i])]
+        if docs:
+            values = np.concatenate([shingles[i] for i in docs])
+            offsets = np.cumsum([0] + [len(shingles[i]) for i in docs[:-1]])
+            hashed = ((a * values[None, :] + b) % np.uint64(MERSENNE_PRIME)) & MAX_HASH
+            signatures[docs] = np.minimum.reduceat(hashed, offsets, axis=1).T
+        start = end
+    return signatures
+
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        root = i
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[i] != root:
+            self.parent[i], i = root, self.parent[i]
+        return root
+
+    def union(self, i, j):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            # The lower row index stays the representative
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def cluster_ids(texts, threshold=THRESHOLD, near=True):
+    """Row index of each report's cluster representative (its first occurrence)"""
+    normalized = [normalize_text(t) for t in texts]
+    uf = _UnionFind(len(normalized))
+
+    first_seen = {}
+    for i, text in enumerate(normalized):
+        digest = hashlib.blake2b(text.encode(), digest_size=16).digest()
+        uf.union(first_seen.setdefault(digest, i), i)
+    if not near:
+        return np.array([uf.find(i) for i in range(len(normalized))])
+
+    # Near duplicates: only the exact-cluster representatives need signatures
+    reps = np.array(sorted(set(first_seen.values())), dtype=np.int64)
+    signatures = minhash_signatures([normalized[i] for i in reps])
+    has_shingles = signatures[:, 0] != MAX_HASH
+    rows = signatures.shape[1] // BANDS
+    for band in range(BANDS):
+        buckets = {}
+        band_keys = signatures[:, band * rows:(band + 1) * rows]
+        for k in np.flatnonzero(has_shingles):
+            buckets.setdefault(band_keys[k].tobytes(), []).append(k)
+        for members in buckets.values():
+            for k in members[1:]:
+                if (signatures[members[0]] == signatures[k]).mean() >= threshold:
+                    uf.union(int(reps[members[0]]), int(reps[k]))
+    return np.array([uf.find(i) for i in range(len(normalized))])
+
+
+def cluster_stats(labels):
+    labels = np.asarray(labels)
+    n_clusters = len(np.unique(labels))
+    return {
+        "reports": len(labels),
+        "clusters": n_clusters,
+        "duplicates": len(labels) - n_clusters,
+        "duplicate_rate": (len(labels) - n_clusters) / len(labels) if len(labels) else 0.0,
+    }
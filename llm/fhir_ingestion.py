@@ -0,0 +1,338 @@
+"""
+Pull radiology reports from a FHIR R4 server as (note_id, subject_id, text) rows
+Reports come either from paged DiagnosticReport/DocumentReference searches, run
+concurrently over a pooled connection, or from a Bulk Data $export NDJSON stream.
+
+    python -m llm.fhir_ingestion search --patients patient_ids.txt --output reports.csv
+    python -m llm.fhir_ingestion export --group YOUR_GROUP_ID --output reports.csv
+"""
+import argparse
+import asyncio
+import base64
+import csv
+import email.utils
+import html
+import json
+import os
+import queue
+import re
+import threading
+import time
+
+import httpx
+
+FHIR_BASE_URL = os.getenv("FHIR_BASE_URL")
+FHIR_ACCESS_TOKEN = os.getenv("FHIR_ACCESS_TOKEN")
+RESOURCE_TYPES = ("DiagnosticReport",)
+PAGE_SIZE = 50
+MAX_CONNECTIONS = 16
+# Export files hold a connection for their whole download; the rest stay free for attachment fetches
+MAX_STREAMS = MAX_CONNECTIONS // 2
+MAX_RETRIES = 5
+RETRY_BACKOFF_S = 1.0
+REQUEST_TIMEOUT_S = 60
+EXPORT_POLL_INTERVAL_S = 10
+ROW_BUFFER = 1000
+# How often a producer blocked on a full row buffer checks whether the consumer has gone
+PUT_POLL_S = 0.1
+
+HTML_TAG = re.compile(r"<[^>]+>")
+_DONE = object()
+
+
+class FhirError(Exception):
+    pass
+
+
+class _Stopped(Exception):
+    """The consumer of iter_report_rows stopped reading"""
+
+
+def retry_after_seconds(value, default):
+    """Seconds to wait from a Retry-After header given as delta-seconds or an HTTP-date"""
+    if value is None:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    return max(0.0, when.timestamp() - time.time())
+
+
+def decode_attachment(attachment, raw=None):
+    """Text of a FHIR Attachment; raw is the fetched body when the attachment has only a url"""
+    if raw is None:
+        if not attachment.get("data"):
+            return None
+        raw = base64.b64decode(attachment["data"])
+    content_type = attachment.get("contentType", "text/plain").lower()
+    if not content_type.startswith("text/"):
+        return None
+    charset = re.search(r"charset=([\w-]+)", content_type)
+    text = raw.decode(charset.group(1) if charset else "utf-8", errors="replace")
+    if "html" in content_type:
+        text = html.unescape(HTML_TAG.sub(" ", text))
+    return text
+
+
+def report_attachments(resource):
+    if resource.get("resourceType") == "DiagnosticReport":
+        return resource.get("presentedForm", [])
+    if resource.get("resourceType") == "DocumentReference":
+        return [c["attachment"] for c in resource.get("content", []) if "attachment" in c]
+    return []
+
+
+def normalize_report(resource, fetched=None):
+    """Map a DiagnosticReport or DocumentReference to a row, or None if it carries no text"""
+    fetched = fetched or {}
+    texts = [decode_attachment(a, fetched.get(a.get("url"))) for a in report_attachments(resource)]
+    text = "\n".join(t.strip() for t in texts if t and t.strip()) or resource.get("conclusion")
+    if not text:
+        return None
+    subject = resource.get("subject", {}).get("reference", "")
+    return {"note_id": resource["id"], "subject_id": subject.split("/")[-1] or None, "text": text}
+
+
+class FhirClient:
+    """Async FHIR client over one pooled connection set; pass transport= to target a mock server"""
+
+    def __init__(self, base_url=FHIR_BASE_URL, access_token=FHIR_ACCESS_TOKEN,
+                 max_connections=MAX_CONNECTIONS, max_streams=MAX_STREAMS, transport=None):
+        self.access_token = access_token
+        self.http = httpx.AsyncClient(
+            base_url=base_url.rstrip("/") + "/",
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=REQUEST_TIMEOUT_S,
+            transport=transport,
+            follow_redirects=True,
+        )
+        # Requests and export streams are limited separately, so a consumer of an open stream
+        # that issues requests (attachment urls) never waits on a slot its own stream holds
+        self.slots = asyncio.Semaphore(max(1, max_connections - max_streams))
+        self.streams = asyncio.Semaphore(max(1, max_streams))
+
+    async def close(self):
+        await self.http.aclose()
+
+    def _headers(self, accept="application/fhir+json", authorized=True, **extra):
+        headers = {"Accept": accept, **extra}
+        if authorized and self.access_token:
+            headers["Authorization"] = f"Bearer {self.access_token}"
+        return headers
+
+    async def get(self, url, params=None, **header_kwargs):
+        """GET with retry on throttling, server and connection errors, honouring Retry-After"""
+        for attempt in range(MAX_RETRIES):
+            backoff = RETRY_BACKOFF_S * 2 ** attempt
+            try:
+                async with self.slots:
+                    response = await self.http.get(url, params=params, headers=self._headers(**header_kwargs))
+            except httpx.TransportError as e:
+                if attempt == MAX_RETRIES - 1:
+                    raise FhirError(f"GET {url} failed after {MAX_RETRIES} attempts ({e!r})") from e
+                await asyncio.sleep(backoff)
+                continue
+            if response.status_code not in (429, 500, 502, 503, 504):
+                return response
+            if attempt < MAX_RETRIES - 1:
+                await asyncio.sleep(retry_after_seconds(response.headers.get("Retry-After"), backoff))
+        raise FhirError(f"GET {url} failed after {MAX_RETRIES} attempts ({response.status_code})")
+
+    async def get_json(self, url, params=None):
+        response = await self.get(url, params=params)
+        if response.status_code != 200:
+            raise FhirError(f"GET {url} returned {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+    async def search(self, resource_type, params):
+        """Yield matching resources, following Bundle next links"""
+        bundle = await self.get_json(resource_type, params={"_count": PAGE_SIZE, **params})
+        while True:
+            for entry in bundle.get("entry", []):
+                if entry.get("search", {}).get("mode", "match") == "match":
+                    yield entry["resource"]
+            next_url = next((link["url"] for link in bundle.get("link", []) if link["relation"] == "next"), None)
+            if not next_url:
+                return
+            bundle = await self.get_json(next_url)
+
+    async def fetch_attachments(self, resource):
+        fetched = {}
+        for attachment in report_attachments(resource):
+            if not attachment.get("data") and attachment.get("url"):
+                response = await self.get(attachment["url"], accept=attachment.get("contentType", "*/*"))
+                if response.status_code == 200:
+                    fetched[attachment["url"]] = response.content
+        return fetched
+
+    async def kick_off_export(self, resource_types=RESOURCE_TYPES, group_id=None, since=None):
+        """Start a Bulk Data export and return the status-polling URL"""
+        path = f"Group/{group_id}/$export" if group_id else "Patient/$export"
+        params = {"_type": ",".join(resource_types)}
+        if since:
+            params["_since"] = since
+        async with self.slots:
+            response = await self.http.get(path, params=params, headers=self._headers(Prefer="respond-async"))
+        if response.status_code != 202:
+            raise FhirError(f"$export kick-off returned {response.status_code}: {response.text[:200]}")
+        return response.headers["Content-Location"]
+
+    async def wait_for_export(self, status_url):
+        """Poll the export status endpoint until the manifest is ready"""
+        while True:
+            response = await self.get(status_url, accept="application/json")
+            if response.status_code == 202:
+                progress = response.headers.get("X-Progress", "in progress")
+                print(f"$export {progress}")
+                await asyncio.sleep(retry_after_seconds(response.headers.get("Retry-After"), EXPORT_POLL_INTERVAL_S))
+                continue
+            if response.status_code != 200:
+                raise FhirError(f"$export status returned {response.status_code}: {response.text[:200]}")
+            return response.json()
+
+    async def stream_ndjson(self, url, authorized=True):
+        """Yield resources from one NDJSON export file without buffering it in memory"""
+        headers = self._headers(accept="application/fhir+ndjson", authorized=authorized)
+        async with self.streams, self.http.stream("GET", url, headers=headers) as response:
+            if response.status_code != 200:
+                raise FhirError(f"GET {url} returned {response.status_code}")
+            async for line in response.aiter_lines():
+                if line.strip():
+                    yield json.loads(line)
+
+
+async def _emit_reports(client, resources, emit, seen):
+    async for resource in resources:
+        # Ids are only unique within a resource type
+        key = (resource.get("resourceType"), resource["id"])
+        if key in seen:
+            continue
+        seen.add(key)
+        row = normalize_report(resource, await client.fetch_attachments(resource))
+        if row:
+            await emit(row)
+
+
+async def ingest_search(client, emit, patient_ids=None, resource_types=RESOURCE_TYPES, params=None):
+    """Run one paged search per (patient, resource type) concurrently"""
+    params = params or {}
+    queries = [
+        (resource_type, {**params, "patient": patient_id} if patient_id else params)
+        for resource_type in resource_types
+        for patient_id in (patient_ids or [None])
+    ]
+    seen = set()
+    await asyncio.gather(*(
+        _emit_reports(client, client.search(resource_type, query), emit, seen)
+        for resource_type, query in queries
+    ))
+
+
+async def ingest_export(client, emit, resource_types=RESOURCE_TYPES, group_id=None, since=None):
+    """Run a Bulk Data export and stream every output file concurrently"""
+    manifest = await client.wait_for_export(await client.kick_off_export(resource_types, group_id, since))
+    authorized = manifest.get("requiresAccessToken", True)
+    outputs = [o["url"] for o in manifest.get("output", []) if o["type"] in resource_types]
+    seen = set()
+    await asyncio.gather(*(
+        _emit_reports(client, client.stream_ndjson(url, authorized), emit, seen) for url in outputs
+    ))
+
+
+def iter_report_rows(source="search", base_url=FHIR_BASE_URL, transport=None, **kwargs):
+    """
+    Yield rows as they arrive; ingestion runs on a background event loop with bounded buffering.
+    Closing the generator early (break, or dropping it) stops ingestion and its thread.
+    """
+    rows = queue.Queue(maxsize=ROW_BUFFER)
+    stop = threading.Event()
+    ingest = {"search": ingest_search, "export": ingest_export}[source]
+
+    def put(item):
+        """Blocking put that gives up once the consumer has stopped; False if it did"""
+        while not stop.is_set():
+            try:
+                rows.put(item, timeout=PUT_POLL_S)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    async def produce():
+        client = FhirClient(base_url, transport=transport)
+        loop = asyncio.get_running_loop()
+
+        async def emit(row):
+            # Blocks this coroutine, not the loop, when the consumer falls behind
+            if not await loop.run_in_executor(None, put, row):
+                raise _Stopped
+
+        try:
+            await ingest(client, emit, **kwargs)
+        finally:
+            await client.close()
+
+    def run():
+        try:
+            asyncio.run(produce())
+        except _Stopped:
+            return
+        except Exception as e:
+            put(e)
+        put(_DONE)
+
+    threading.Thread(target=run, name="fhir-ingestion", daemon=True).start()
+    try:
+        while (item := rows.get()) is not _DONE:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        # Free the buffer so a put that is already waiting returns promptly
+        while True:
+            try:
+                rows.get_nowait()
+            except queue.Empty:
+                break
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", choices=["search", "export"])
+    parser.add_argument("--output", required=True, help="CSV usable as DATA_PATH in data_preparation")
+    parser.add_argument("--patients", help="File with one patient id per line (search only)")
+    parser.add_argument("--group", help="Group id to export (export only)")
+    parser.add_argument("--since", help="Only resources updated after this instant (export only)")
+    parser.add_argument("--types", default=",".join(RESOURCE_TYPES))
+    args = parser.parse_args()
+
+    resource_types = tuple(args.types.split(","))
+    if args.source == "search":
+        patient_ids = None
+        if args.patients:
+            with open(args.patients) as f:
+                patient_ids = [line.strip() for line in f if line.strip()]
+        rows = iter_report_rows("search", patient_ids=patient_ids, resource_types=resource_types)
+    else:
+        rows = iter_report_rows("export", resource_types=resource_types, group_id=args.group, since=args.since)
+
+    count = 0
+    with open(args.output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["note_id", "subject_id", "text"])
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+            if count % 1000 == 0:
+                print(f"Ingested {count} reports...")
+    print(f"Saved {count} reports to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
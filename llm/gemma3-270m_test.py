@@ -18,6 +18,10 @@ import wandb
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from llm.prompts import KEY_FINDINGS_PROMPT
+from llm.report_normalization import filter_length, impression_snippets
+
 DATA_DIR = Path(os.getenv("DATA_DIR"))
 RADIOLOGY = DATA_DIR / os.getenv("RADIOLOGY_CSV")
 OUTPUT_DIR = Path(os.getenv("OUTPUT_DIR"))
@@ -46,31 +50,14 @@ wandb.init(
 )
 
 radiology_df = pd.read_csv(RADIOLOGY, usecols=["note_id", "subject_id", "text"])
-radiology_df = radiology_df[radiology_df['text'].notna()]
-radiology_df = radiology_df[radiology_df['text'].str.len() > 200]
+radiology_df = filter_length(radiology_df, min_chars=200)
 
 train_reports = radiology_df.iloc[TRAIN_START_IDX:TRAIN_END_IDX].copy()
 
-def extract_impression(text):
-    if "impression:" in text.lower():
-        idx = text.lower().find("impression:")
-        return text[idx:idx+500].strip()
-    return "Report reviewed. No significant abnormalities."
-
-examples = []
-for _, row in train_reports.iterrows():
-    text = row['text'][:4000]
-    if len(text) < 200:
-        continue
-
-    impression = extract_impression(text)
-    prompt = f"""Analyze this radiology report and provide key findings:
-
-{text}
-
-Key findings:"""
-
-    examples.append({'text': f"{prompt}\n\n{impression}"})
+texts = train_reports['text'].str[:4000]
+impressions = impression_snippets(texts, max_chars=500)
+examples = [{'text': f"{KEY_FINDINGS_PROMPT.render(report=text)}\n\n{impression}"}
+            for text, impression in zip(texts, impressions)]
 
 dataset = Dataset.from_pandas(pd.DataFrame(examples))
 
@@ -156,4 +143,10 @@ merged_model = merged_model.merge_and_unload()
 merged_model.save_pretrained(str(OUTPUT_DIR / "full_model"))
 tokenizer.save_pretrained(str(OUTPUT_DIR / "full_model"))
 
+# Optional int8 export for CPU-only validation nodes ("torch-int8" or "onnx-int8")
+if os.getenv("CPU_EXPORT"):
+    from llm.cpu_inference import export
+
+    print(export(OUTPUT_DIR / "full_model", OUTPUT_DIR / f"cpu_{os.getenv('CPU_EXPORT')}", os.getenv("CPU_EXPORT")))
+
 wandb.finish()
\ No newline at end of file
@@ -0,0 +1,59 @@
+"""
+Billable-procedure extraction with a fine-tuned model
+Shared by the ablation comparison and anything else that runs inference
+"""
+import re
+
+from graphrag.tracing import span
+from llm.prompts import BILLING_PROMPT
+
+MAX_SEQ_LENGTH = 4096
+MAX_NEW_TOKENS = 256
+ANSWER_MARKER = "Billable Procedures:"
+CPT_PATTERN = re.compile(r"\b\d{4}[0-9A-Z]\b")
+
+
+def parse_procedures(generated):
+    if ANSWER_MARKER in generated:
+        generated = generated.split(ANSWER_MARKER)[-1]
+    return [p.strip() for p in generated.strip().split(",") if p.strip()]
+
+
+def normalize_procedure(name):
+    """Reduce a procedure to a comparable key: its CPT code if present, else normalized text"""
+    code = CPT_PATTERN.search(name.upper())
+    if code:
+        return code.group(0)
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", name.lower()).split())
+
+
+def load_model(model_path, max_seq_length=MAX_SEQ_LENGTH):
+    from unsloth import FastLanguageModel
+
+    model, tokenizer = FastLanguageModel.from_pretrained(
+        model_name=model_path, max_seq_length=max_seq_length, dtype=None, load_in_4bit=True,
+    )
+    FastLanguageModel.for_inference(model)
+    # Batched generation needs left padding so every prompt ends at the same position,
+    # and over-long prompts must lose their start rather than the answer marker
+    tokenizer.padding_side = "left"
+    tokenizer.truncation_side = "left"
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    return model, tokenizer
+
+
+def extract_procedures_batch(report_texts, model, tokenizer, max_new_tokens=MAX_NEW_TOKENS):
+    """Greedy-decode a batch of reports and return one procedure list per report"""
+    import torch
+
+    with span("llm.tokenize"):
+        # Over-long reports lose their start; the instruction and answer marker always survive
+        input_ids = BILLING_PROMPT.encode_batch(tokenizer, MAX_SEQ_LENGTH - max_new_tokens, report=report_texts)
+        inputs = tokenizer.pad({"input_ids": input_ids}, padding=True, return_tensors="pt").to(model.device)
+    with span("llm.generate"), torch.inference_mode():
+        outputs = model.generate(**inputs, max_new_tokens=max_new_tokens, do_sample=False,
+                                 pad_token_id=tokenizer.pad_token_id)
+    with span("llm.decode"):
+        generated = tokenizer.batch_decode(outputs[:, inputs["input_ids"].shape[1]:], skip_special_tokens=True)
+    return [parse_procedures(text) for text in generated]
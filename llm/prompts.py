@@ -0,0 +1,135 @@
+"""
+Versioned prompt templates shared by training, evaluation and serving
+A template is split once into static text and named fields. Static segments are
+tokenized once per tokenizer and cached. Each request then only tokenizes its own
+fields (in one batched call) and concatenates ids. That matches tokenizing render()
+as one string, which is how training sees the prompt, only if the tokenizer never
+merges across a segment boundary; this is checked on probe values when a tokenizer
+is first seen, and a tokenizer that fails falls back to whole-string tokenization.
+
+The billing prompt's report field is a dataset text column, built by
+graphrag.retrieval.compose_report_with_context, which already carries the
+"Radiology Report:" marker; training scripts render that column the same way.
+
+    from llm.prompts import BILLING_PROMPT
+    text = BILLING_PROMPT.render(report=composed_text)
+    batch = BILLING_PROMPT.encode_batch(tokenizer, 3840, report=composed_texts)
+"""
+import string
+import threading
+
+# Field values that put whitespace and punctuation on both sides of each segment boundary
+PROBE_VALUES = ("No acute findings.", " Leading space", "Trailing newline\n", "\n\nLeading blank line",
+                "Ends with a colon:", "")
+
+
+class PromptTemplate:
+    def __init__(self, name, version, template, truncate_field=None):
+        self.name = name
+        self.version = version
+        self.template = template
+        # When a prompt is too long, this field loses tokens from its start
+        self.truncate_field = truncate_field
+        self.segments = []
+        self.fields = []
+        for literal, field, _, _ in string.Formatter().parse(template):
+            if literal:
+                self.segments.append(("text", literal))
+            if field is not None:
+                self.segments.append(("field", field))
+                self.fields.append(field)
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    @property
+    def key(self):
+        return f"{self.name}/{self.version}"
+
+    def render(self, **fields):
+        return self.template.format(**fields)
+
+    def _static_ids(self, tokenizer):
+        """(prefix special tokens, {segment text: ids}, exact) for this tokenizer, computed once;
+        exact is whether joining segment ids reproduces tokenizing the rendered probes whole"""
+        cached = self._cache.get(id(tokenizer))
+        if cached is None or cached[0] is not tokenizer:
+            with self._lock:
+                # BOS and similar come from a plain call on empty text, so they are added exactly once
+                special = tokenizer("")["input_ids"]
+                ids = {text: tokenizer(text, add_special_tokens=False)["input_ids"]
+                       for kind, text in self.segments if kind == "text"}
+                exact = all(
+                    self._join(special, ids, {f: tokenizer(value, add_special_tokens=False)["input_ids"]
+                                              for f in self.fields})
+                    == tokenizer(self.render(**{f: value for f in self.fields}))["input_ids"]
+                    for value in PROBE_VALUES
+                )
+                cached = self._cache[id(tokenizer)] = (tokenizer, special, ids, exact)
+        return cached[1:]
+
+    def _join(self, special, static, field_ids, max_length=None):
+        pieces = [static[value] if kind == "text" else field_ids[value] for kind, value in self.segments]
+        if max_length is not None and self.truncate_field is not None:
+            overflow = len(special) + sum(len(p) for p in pieces) - max_length
+            if overflow > 0:
+                for j, (kind, value) in enumerate(self.segments):
+                    if kind == "field" and value == self.truncate_field:
+                        pieces[j] = pieces[j][overflow:]
+        ids = list(special)
+        for piece in pieces:
+            ids.extend(piece)
+        return ids
+
+    def _encode_whole(self, tokenizer, max_length, rows):
+        """Fallback for tokenizers that merge across segment boundaries: tokenize each rendered prompt"""
+        encoded = tokenizer([self.render(**row) for row in rows])["input_ids"]
+        if max_length is None or self.truncate_field is None:
+            return encoded
+        for i, row in enumerate(rows):
+            ids = encoded[i]
+            while len(ids) > max_length and row[self.truncate_field]:
+                field_ids = tokenizer(row[self.truncate_field], add_special_tokens=False)["input_ids"]
+                row[self.truncate_field] = tokenizer.decode(field_ids[len(ids) - max_length:])
+                ids = tokenizer(self.render(**row))["input_ids"]
+            encoded[i] = ids
+        return encoded
+
+    def encode_batch(self, tokenizer, max_length=None, **columns):
+        """input_ids per row; columns map each field to a list of values"""
+        missing = set(self.fields) - set(columns)
+        if missing:
+            raise ValueError(f"{self.key} needs fields {sorted(missing)}")
+        special, static, exact = self._static_ids(tokenizer)
+        n_rows = len(next(iter(columns.values()))) if columns else 1
+        values = {field: [str(v) for v in columns[field]] for field in self.fields}
+        if not exact:
+            return self._encode_whole(tokenizer, max_length,
+                                      [{field: values[field][i] for field in self.fields} for i in range(n_rows)])
+        field_ids = {field: tokenizer(values[field], add_special_tokens=False)["input_ids"] for field in self.fields}
+        return [self._join(special, static, {field: field_ids[field][i] for field in self.fields}, max_length)
+                for i in range(n_rows)]
+
+    def encode(self, tokenizer, max_length=None, **fields):
+        return self.encode_batch(tokenizer, max_length, **{k: [v] for k, v in fields.items()})[0]
+
+
+# v2: the marker moved into the report field, so context-first reports do not repeat it
+BILLING_PROMPT = PromptTemplate("billing", "v2", """{report}
+Based on the above radiology report, list all the billable procedures performed.
+Format as a comma-separated list of procedure names.
+
+Billable Procedures:""", truncate_field="report")
+
+KEY_FINDINGS_PROMPT = PromptTemplate("key_findings", "v1", """Analyze this radiology report and provide key findings:
+
+{report}
+
+Key findings:""", truncate_field="report")
+
+TEMPLATES = {t.key: t for t in (BILLING_PROMPT, KEY_FINDINGS_PROMPT)}
+
+
+def get_template(key):
+    if key not in TEMPLATES:
+        raise ValueError(f"Unknown prompt template {key!r}; expected one of {sorted(TEMPLATES)}")
+    return TEMPLATES[key]
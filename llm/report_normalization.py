@@ -0,0 +1,86 @@
+"""
+Column-at-a-time radiology report cleanup, section parsing and length filtering
+Every step is a pandas string method over a whole Series. With pyarrow installed the
+column uses Arrow strings and the regexes run in Arrow's compiled RE2 kernels, so the
+patterns here avoid lookarounds and backreferences.
+
+    df = normalize_reports(df, min_chars=200)
+    df[["findings", "impression"]]
+"""
+from functools import lru_cache
+
+import pandas as pd
+
+from llm.dedup import DEID_TOKEN
+
+SECTIONS = ("examination", "indication", "technique", "comparison", "findings", "impression")
+
+# Every de-identification blank is rewritten to this one form
+DEID_BLANK = "___"
+DEFAULT_IMPRESSION = "Report reviewed. No significant abnormalities."
+# Marks the start of each known header so a section body is "everything up to the next mark"
+SECTION_MARK = "\x1e"
+HEADER_PATTERN = r"(?i)(^|\n)[ \t]*(" + "|".join(SECTIONS) + r")[ \t]*:"
+
+
+@lru_cache(maxsize=1)
+def string_dtype():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return "string"
+    return "string[pyarrow]"
+
+
+def as_strings(texts):
+    return texts.astype(string_dtype())
+
+
+def clean_text(texts):
+    """Unify de-identification tokens, trim spaces per line and cap blank runs at one line"""
+    texts = as_strings(texts)
+    texts = texts.str.replace(DEID_TOKEN.pattern, DEID_BLANK, regex=True)
+    texts = texts.str.replace(r"[ \t\r\f\v]+", " ", regex=True)
+    texts = texts.str.replace(r" ?\n ?", "\n", regex=True)
+    texts = texts.str.replace(r"\n{3,}", "\n\n", regex=True)
+    return texts.str.strip()
+
+
+def extract_sections(texts, sections=SECTIONS):
+    """DataFrame with one column per section body, from its header to the next known header"""
+    marked = as_strings(texts).str.replace(SECTION_MARK, " ", regex=False)
+    marked = marked.str.replace(HEADER_PATTERN, r"\1" + SECTION_MARK + r"\2:", regex=True)
+    return pd.DataFrame(
+        {
+            name: marked.str.extract(f"(?i){SECTION_MARK}{name}[ \\t]*:(?P<body>[^{SECTION_MARK}]*)",
+                                     expand=False).str.strip()
+            for name in sections
+        },
+        index=texts.index,
+    )
+
+
+def impression_snippets(texts, max_chars=500, default=DEFAULT_IMPRESSION):
+    """Text from the first 'impression:' on, capped at max_chars, header included"""
+    snippets = as_strings(texts).str.extract(r"(?is)(?P<impression>impression:.*)", expand=False)
+    return snippets.str[:max_chars].str.strip().fillna(default)
+
+
+def filter_length(df, column="text", min_chars=None, max_chars=None):
+    lengths = df[column].str.len()
+    keep = df[column].notna()
+    if min_chars is not None:
+        keep &= lengths > min_chars
+    if max_chars is not None:
+        keep &= lengths <= max_chars
+    return df[keep]
+
+
+def normalize_reports(df, column="text", min_chars=None, max_chars=None, sections=SECTIONS):
+    """Cleaned text, length-filtered rows and one column per parsed section; sections=() skips parsing"""
+    df = df[df[column].notna()].copy()
+    df[column] = clean_text(df[column])
+    df = filter_length(df, column, min_chars, max_chars)
+    if sections:
+        df = df.join(extract_sections(df[column], sections))
+    return df
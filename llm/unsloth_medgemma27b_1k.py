@@ -9,6 +9,9 @@ from pathlib import Path
 from datasets import Dataset
 import wandb
 
+from llm.inference import parse_procedures
+from llm.prompts import BILLING_PROMPT
+
 # Config - UPDATE THESE
 DATA_DIR = Path("YOUR_DATA_DIR")
 OUTPUT_DIR = Path("YOUR_OUTPUT_DIR")
@@ -25,12 +28,22 @@ TRAIN_SAMPLES = 1000
 VAL_SAMPLES = 250
 WANDB_PROJECT = "YOUR_WANDB_PROJECT"
 WANDB_RUN_NAME = "YOUR_RUN_NAME"
+TEXT_VARIANT = None  # e.g. "no_context", "top_k" or "depth_1" to train on an ablation column
 
 OUTPUT_DIR.mkdir(exist_ok=True)
 
 # Load datasets
-train_df = pd.read_json(DATA_DIR / "train_dataset.jsonl", lines=True)
-val_df = pd.read_json(DATA_DIR / "val_dataset.jsonl", lines=True)
+if TEXT_VARIANT:
+    from llm.data_preparation import load_variant
+
+    train_df = load_variant(DATA_DIR, "train", TEXT_VARIANT)
+    val_df = load_variant(DATA_DIR, "val", TEXT_VARIANT)
+else:
+    train_df = pd.read_json(DATA_DIR / "train_dataset.jsonl", lines=True)
+    val_df = pd.read_json(DATA_DIR / "val_dataset.jsonl", lines=True)
+# Train on exactly the prompt that inference sends
+for df in (train_df, val_df):
+    df['text'] = df['text'].map(lambda text: BILLING_PROMPT.render(report=text))
 train_dataset = Dataset.from_pandas(train_df[['text']]).select(range(TRAIN_SAMPLES))
 val_dataset = Dataset.from_pandas(val_df[['text']]).select(range(VAL_SAMPLES))
 
@@ -105,7 +118,8 @@ model.save_pretrained(str(lora_dir))
 tokenizer.save_pretrained(str(lora_dir))
 
 with open(OUTPUT_DIR / "training_info.json", 'w') as f:
-    json.dump({"model": MODEL_NAME, "train_samples": TRAIN_SAMPLES, "loss": float(trainer_stats.training_loss)}, f)
+    json.dump({"model": MODEL_NAME, "train_samples": TRAIN_SAMPLES, "loss": float(trainer_stats.training_loss),
+               "prompt": BILLING_PROMPT.key, "text_variant": TEXT_VARIANT or "text"}, f)
 
 wandb.finish()
 
@@ -113,21 +127,8 @@ wandb.finish()
 FastLanguageModel.for_inference(model)
 
 def extract_billable_procedures(report_text):
-    prompt = f"""Radiology Report:
-{report_text}
-
-Based on the above radiology report, list all the billable procedures performed.
-Format as a comma-separated list of procedure names.
-
-Billable Procedures:"""
-
-    inputs = tokenizer(prompt, return_tensors="pt").to("cuda")
-    outputs = model.generate(**inputs, max_new_tokens=256, temperature=0.3, top_p=0.9, do_sample=True, pad_token_id=tokenizer.eos_token_id)
-    generated = tokenizer.decode(outputs[0], skip_special_tokens=True)
-
-    if "Billable Procedures:" in generated:
-        procedures_text = generated.split("Billable Procedures:")[-1].strip()
-    else:
-        procedures_text = generated[len(prompt):].strip()
-
-    return [p.strip() for p in procedures_text.split(",") if p.strip()]
+    input_ids = torch.tensor([BILLING_PROMPT.encode(tokenizer, MAX_SEQ_LENGTH - 256, report=report_text)], device="cuda")
+    outputs = model.generate(input_ids=input_ids, attention_mask=torch.ones_like(input_ids), max_new_tokens=256,
+                             temperature=0.3, top_p=0.9, do_sample=True, pad_token_id=tokenizer.eos_token_id)
+    generated = tokenizer.decode(outputs[0, input_ids.shape[1]:], skip_special_tokens=True)
+    return parse_procedures(generated)
@@ -0,0 +1,244 @@
+"""
+Online billing validation: a radiology report plus its billed procedures in, discrepancies out
+
+    BILLING_MODEL_PATH=/path/to/lora_model uvicorn service.billing_service:app --workers 1
+
+Retrieval runs on a thread pool against the warm Neo4j driver and embedding model.
+Extraction requests are queued and micro-batched onto a single LLM worker thread.
+The graph backend follows GRAPH_BACKEND (neo4j or an in-memory snapshot).
+Set BILLING_SERVICE_STUB_GRAPH=concepts.json to run with the stub LLM and a stub graph.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+
+from graphrag import tracing
+from graphrag.retrieval import build_radlex_context, compose_report_with_context
+from llm.inference import normalize_procedure
+
+MODEL_PATH = os.getenv("BILLING_MODEL_PATH", "YOUR_RADLEX_MODEL_PATH/lora_model")
+STUB_GRAPH_PATH = os.getenv("BILLING_SERVICE_STUB_GRAPH")
+ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",")
+
+RADLEX_TOP_K = 10
+GRAPH_DEPTH = 2
+RETRIEVAL_WORKERS = 8
+RETRIEVAL_TIMEOUT_S = 10.0
+EXTRACTION_TIMEOUT_S = 120.0
+MAX_BATCH_SIZE = 8
+MAX_BATCH_WAIT_MS = 25
+MAX_QUEUE_SIZE = 256
+
+
+class ValidationRequest(BaseModel):
+    report_id: str | None = None
+    report_text: str
+    billed_procedures: list[str] = []
+
+
+class ValidationResponse(BaseModel):
+    report_id: str | None = None
+    extracted_procedures: list[str]
+    matched: list[str]
+    documented_not_billed: list[str]
+    billed_not_documented: list[str]
+    timings_ms: dict[str, float]
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class MicroBatcher:
+    """Gathers concurrent submissions into batches for a blocking batch function on one thread"""
+
+    def __init__(self, batch_fn, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_BATCH_WAIT_MS,
+                 max_queue_size=MAX_QUEUE_SIZE):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue(max_queue_size)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm")
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((item, future))
+        except asyncio.QueueFull:
+            raise QueueFullError(f"extraction queue is full ({self.queue.maxsize} pending)")
+        return await future
+
+    async def _next_batch(self):
+        batch = [await self.queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # Callers that already timed out have cancelled their futures
+        return [(item, future) for item, future in batch if not future.done()]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            if not batch:
+                continue
+            try:
+                results = await loop.run_in_executor(self.executor, self.batch_fn, [item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+def find_discrepancies(extracted, billed):
+    extracted_keys = {normalize_procedure(p): p for p in extracted}
+    billed_keys = {normalize_procedure(p): p for p in billed}
+    extracted_keys.pop("", None)
+    billed_keys.pop("", None)
+    return {
+        "matched": [billed_keys[k] for k in billed_keys.keys() & extracted_keys.keys()],
+        "documented_not_billed": [extracted_keys[k] for k in extracted_keys.keys() - billed_keys.keys()],
+        "billed_not_documented": [billed_keys[k] for k in billed_keys.keys() - extracted_keys.keys()],
+    }
+
+
+class BillingPipeline:
+    """Retrieval + extraction with per-stage timeouts; backend and extractor are injectable"""
+
+    def __init__(self, backend, extractor, top_k=RADLEX_TOP_K, depth=GRAPH_DEPTH):
+        self.backend = backend
+        self.top_k = top_k
+        self.depth = depth
+        self.batcher = MicroBatcher(extractor)
+        self.retrieval_pool = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retrieval")
+
+    def start(self):
+        self.batcher.start()
+
+    async def stop(self):
+        await self.batcher.stop()
+        self.retrieval_pool.shutdown(wait=False, cancel_futures=True)
+
+    async def validate(self, report_text, billed_procedures):
+        loop = asyncio.get_running_loop()
+        timings = {}
+
+        start = time.perf_counter()
+        try:
+            context = await asyncio.wait_for(
+                loop.run_in_executor(self.retrieval_pool, build_radlex_context,
+                                     self.backend, report_text, self.top_k, self.depth),
+                RETRIEVAL_TIMEOUT_S,
+            )
+        except asyncio.TimeoutError:
+            raise HTTPException(504, f"retrieval timed out after {RETRIEVAL_TIMEOUT_S}s")
+        timings["retrieval"] = (time.perf_counter() - start) * 1000
+        tracing.REGISTRY.observe("service.retrieval", timings["retrieval"] / 1000)
+
+        start = time.perf_counter()
+        try:
+            extracted = await asyncio.wait_for(
+                self.batcher.submit(compose_report_with_context(context, report_text)),
+                EXTRACTION_TIMEOUT_S,
+            )
+        except QueueFullError as e:
+            raise HTTPException(503, str(e))
+        except asyncio.TimeoutError:
+            raise HTTPException(504, f"extraction timed out after {EXTRACTION_TIMEOUT_S}s")
+        timings["extraction"] = (time.perf_counter() - start) * 1000
+        tracing.REGISTRY.observe("service.extraction", timings["extraction"] / 1000)
+
+        return extracted, find_discrepancies(extracted, billed_procedures), timings
+
+
+class LLMExtractor:
+    """Keeps the fine-tuned model loaded and extracts procedures for a batch of texts"""
+
+    def __init__(self, model_path):
+        from llm.inference import load_model
+
+        self.model, self.tokenizer = load_model(model_path)
+
+    def __call__(self, texts):
+        from llm.inference import extract_procedures_batch
+
+        return extract_procedures_batch(texts, self.model, self.tokenizer)
+
+
+def default_pipeline():
+    if STUB_GRAPH_PATH:
+        from service.stubs import StubExtractor, StubGraph
+
+        graph = StubGraph.from_json(STUB_GRAPH_PATH)
+        return BillingPipeline(graph, StubExtractor([c["name"] for c in graph.concepts.values()]))
+
+    from graphrag.retrieval import get_backend
+
+    backend = get_backend()
+    # Load the embedding model, driver pool or snapshot before the first request arrives
+    build_radlex_context(backend, "warm-up", top_k=1, depth=1)
+    return BillingPipeline(backend, LLMExtractor(MODEL_PATH))
+
+
+def create_app(pipeline_factory=default_pipeline):
+    @asynccontextmanager
+    async def lifespan(app):
+        # Models and driver are loaded once per worker process and reused by every request
+        app.state.pipeline = pipeline_factory()
+        app.state.pipeline.start()
+        yield
+        await app.state.pipeline.stop()
+
+    app = FastAPI(title="SMARTClaims billing validation", lifespan=lifespan)
+    app.add_middleware(CORSMiddleware, allow_origins=ALLOWED_ORIGINS, allow_methods=["*"], allow_headers=["*"])
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "queued": app.state.pipeline.batcher.queue.qsize()}
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        return tracing.REGISTRY.prometheus()
+
+    @app.post("/validate", response_model=ValidationResponse)
+    async def validate(request: ValidationRequest):
+        extracted, discrepancies, timings = await app.state.pipeline.validate(
+            request.report_text, request.billed_procedures
+        )
+        return ValidationResponse(report_id=request.report_id, extracted_procedures=extracted,
+                                  timings_ms=timings, **discrepancies)
+
+    return app
+
+
+app = create_app()
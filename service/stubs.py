@@ -0,0 +1,55 @@
+"""
+Stand-ins for the LLM and the Neo4j graph so the billing service runs without a GPU or database
+"""
+import json
+import re
+
+
+def _tokens(text):
+    return set(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+class StubExtractor:
+    """Reports every vocabulary procedure whose words all occur in the text"""
+
+    def __init__(self, vocabulary):
+        self.vocabulary = [(name, _tokens(name)) for name in vocabulary]
+
+    def __call__(self, texts):
+        results = []
+        for text in texts:
+            words = _tokens(text)
+            results.append([name for name, needed in self.vocabulary if needed and needed <= words])
+        return results
+
+
+class StubGraph:
+    """In-memory concept list scored by token overlap, shaped like the Neo4j backend"""
+
+    def __init__(self, concepts):
+        # concepts: [{"rid", "name", "definition", "related": [{"name", "rel_type"}]}]
+        self.concepts = {c["rid"]: c for c in concepts}
+        self._tokens = {c["rid"]: _tokens(f"{c['name']} {c.get('definition', '')}") for c in concepts}
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def semantic_search(self, query_text, limit=10):
+        query = _tokens(query_text)
+        scored = []
+        for rid, words in self._tokens.items():
+            if words and query:
+                score = len(words & query) / len(words | query)
+                if score > 0:
+                    scored.append((score, rid))
+        scored.sort(reverse=True)
+        return [
+            {"rid": rid, "name": self.concepts[rid]["name"],
+             "definition": self.concepts[rid].get("definition", ""), "score": score}
+            for score, rid in scored[:limit]
+        ]
+
+    def get_concept_context(self, rid, depth=2, hierarchy_limit=5, typed_limit=10):
+        return list(self.concepts.get(rid, {}).get("related", []))
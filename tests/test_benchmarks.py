@@ -0,0 +1,39 @@
+import argparse
+
+import pytest
+
+from benchmarks.run import compare, run
+
+
+def results(per_second=50.0, p50_ms=1.0, retries=0, count=100, in_flight_limit=4):
+    return {
+        "meta": {"git_commit": "abc"},
+        "backends": {"memory": {"setup_seconds": 1.0,
+                                "retrieval": {"count": count, "p50_ms": p50_ms},
+                                "dataset_build": {"items": count, "seconds": count / per_second,
+                                                  "per_second": per_second}}},
+        "neo4j_import": {"writes": {"import": {"retries": retries, "in_flight_limit": in_flight_limit}}},
+    }
+
+
+def test_compare_flags_regressions_by_direction():
+    regressions, _ = compare(results(), results(per_second=30.0, p50_ms=0.5, retries=2))
+
+    assert [line.split(":")[0] for line in regressions] == [
+        "backends.memory.dataset_build.per_second", "neo4j_import.writes.import.retries"]
+
+
+def test_compare_lists_other_changes_without_failing():
+    regressions, changes = compare(results(), results(count=200, per_second=50.0, in_flight_limit=2))
+
+    assert regressions == []
+    assert [line.split(":")[0] for line in changes] == [
+        "backends.memory.dataset_build.items", "backends.memory.dataset_build.seconds",
+        "backends.memory.retrieval.count", "neo4j_import.writes.import.in_flight_limit"]
+
+
+def test_neo4j_backend_needs_allow_wipe():
+    args = argparse.Namespace(backends="neo4j", encoder="model", allow_wipe=False)
+
+    with pytest.raises(ValueError, match="--allow-wipe"):
+        run(args)
@@ -0,0 +1,113 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+from service import billing_service
+from service.billing_service import BillingPipeline, MicroBatcher, create_app
+from service.stubs import StubExtractor, StubGraph
+
+CONCEPTS = [
+    {"rid": "RID1", "name": "chest radiograph", "definition": "Radiograph of the chest",
+     "related": [{"name": "thorax", "rel_type": "hierarchy"}]},
+    {"rid": "RID2", "name": "abdominal ultrasound", "definition": "Ultrasound of the abdomen", "related": []},
+    {"rid": "RID3", "name": "head CT", "definition": "Computed tomography of the head", "related": []},
+]
+REPORT = "EXAMINATION: chest radiograph. FINDINGS: clear lungs. Head CT also performed."
+
+
+class BlockingExtractor(StubExtractor):
+    """StubExtractor that records batch sizes and holds its first batch until released"""
+
+    def __init__(self, vocabulary):
+        super().__init__(vocabulary)
+        self.release = threading.Event()
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(len(texts))
+        self.release.wait(5)
+        return super().__call__(texts)
+
+
+def stub_pipeline(extractor=None, backend=None, max_queue_size=billing_service.MAX_QUEUE_SIZE):
+    graph = StubGraph(CONCEPTS)
+    extractor = extractor or StubExtractor([c["name"] for c in CONCEPTS])
+    pipeline = BillingPipeline(backend or graph, extractor)
+    pipeline.batcher = MicroBatcher(extractor, max_queue_size=max_queue_size)
+    return pipeline
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.01)
+
+
+def test_validate_reports_discrepancies():
+    with TestClient(create_app(stub_pipeline)) as client:
+        response = client.post("/validate", json={
+            "report_id": "r1", "report_text": REPORT,
+            "billed_procedures": ["Chest Radiograph", "abdominal ultrasound"],
+        })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["report_id"] == "r1"
+    assert body["matched"] == ["Chest Radiograph"]
+    assert body["documented_not_billed"] == ["head CT"]
+    assert body["billed_not_documented"] == ["abdominal ultrasound"]
+    assert set(body["timings_ms"]) == {"retrieval", "extraction"}
+
+
+def test_concurrent_requests_are_coalesced_into_one_batch():
+    extractor = BlockingExtractor([c["name"] for c in CONCEPTS])
+    with TestClient(create_app(lambda: stub_pipeline(extractor))) as client, ThreadPoolExecutor(6) as pool:
+        batcher = client.app.state.pipeline.batcher
+        request = {"report_text": REPORT, "billed_procedures": []}
+        first = pool.submit(client.post, "/validate", json=request)
+        wait_until(lambda: extractor.batches == [1])
+        rest = [pool.submit(client.post, "/validate", json=request) for _ in range(5)]
+        # Everything that arrives while the worker is busy waits in the queue for the next batch
+        wait_until(lambda: batcher.queue.qsize() == 5)
+        extractor.release.set()
+        responses = [first.result()] + [f.result() for f in rest]
+
+    assert [r.status_code for r in responses] == [200] * 6
+    assert extractor.batches == [1, 5]
+
+
+def test_retrieval_timeout_returns_504(monkeypatch):
+    class SlowGraph(StubGraph):
+        def semantic_search(self, query_text, limit=10):
+            time.sleep(0.5)
+            return super().semantic_search(query_text, limit)
+
+    monkeypatch.setattr(billing_service, "RETRIEVAL_TIMEOUT_S", 0.05)
+    with TestClient(create_app(lambda: stub_pipeline(backend=SlowGraph(CONCEPTS)))) as client:
+        response = client.post("/validate", json={"report_text": REPORT})
+
+    assert response.status_code == 504
+    assert "retrieval timed out" in response.json()["detail"]
+
+
+def test_full_extraction_queue_rejects_with_503():
+    extractor = BlockingExtractor([c["name"] for c in CONCEPTS])
+    factory = lambda: stub_pipeline(extractor, max_queue_size=1)  # noqa: E731
+    with TestClient(create_app(factory)) as client, ThreadPoolExecutor(2) as pool:
+        batcher = client.app.state.pipeline.batcher
+        request = {"report_text": REPORT}
+        running = pool.submit(client.post, "/validate", json=request)
+        wait_until(lambda: extractor.batches == [1])
+        queued = pool.submit(client.post, "/validate", json=request)
+        wait_until(lambda: batcher.queue.full())
+        rejected = client.post("/validate", json=request)
+        extractor.release.set()
+
+        assert rejected.status_code == 503
+        assert "queue is full" in rejected.json()["detail"]
+        assert running.result().status_code == 200
+        assert queued.result().status_code == 200
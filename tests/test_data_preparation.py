@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("tqdm")
+pytest.importorskip("sklearn")
+
+from benchmarks.fixtures import HashingEncoder  # noqa: E402
+from graphrag import retrieval  # noqa: E402
+from graphrag.memory_backend import InMemoryGraphBackend  # noqa: E402
+from graphrag.neo4j_backend import HIERARCHY_REL  # noqa: E402
+from llm import data_preparation  # noqa: E402
+
+ENCODER = HashingEncoder(16)
+
+
+def make_backend():
+    names = ["lung", "pleura", "pleural effusion", "pneumothorax", "chest radiograph"]
+    concepts = [{"rid": f"RID{i}", "name": name, "definition": f"{name} definition",
+                 "embedding": ENCODER(name)[0].tolist()} for i, name in enumerate(names)]
+    edges = [(HIERARCHY_REL, "RID2", "RID1"), (HIERARCHY_REL, "RID1", "RID0"), ("MAY_AFFECT", "RID3", "RID1")]
+    return InMemoryGraphBackend.from_records(concepts, edges, encoder=ENCODER)
+
+
+def test_every_row_gets_each_variant_and_retrieval_runs_once_per_cluster(monkeypatch):
+    calls = []
+    build = retrieval.build_context_variants
+    monkeypatch.setattr(retrieval, "build_context_variants", lambda *a, **kw: calls.append(a[1]) or build(*a, **kw))
+    df = pd.DataFrame({
+        "note_id": ["a", "b", "c"],
+        "text": ["Chest radiograph: small pleural effusion.", "CHEST RADIOGRAPH: small pleural effusion.",
+                 "Pneumothorax of the left lung."],
+        "cluster": [0, 0, 2],
+    })
+
+    examples = data_preparation.process_dataframe(df, "test", make_backend())
+
+    assert [e["note_id"] for e in examples] == ["a", "b", "c"]
+    assert calls == [df.text[0], df.text[2]]
+    for example, text in zip(examples, df.text):
+        assert set(example) == {"note_id", "text", *data_preparation.variant_names()}
+        assert example["text"] == example[f"depth_{data_preparation.GRAPH_DEPTH}"]
+        assert example["no_context"] == retrieval.compose_report_with_context("", text)
+        assert all(example[name].endswith(f"{retrieval.REPORT_MARKER}\n{text}\n")
+                   for name in data_preparation.variant_names())
+    # Cluster members share contexts but keep their own report text
+    assert examples[1]["top_k"].replace(df.text[1], df.text[0]) == examples[0]["top_k"]
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from llm import dedup
+from llm.dedup import cluster_ids, cluster_stats, minhash_signatures, normalize_text
+
+WORDS = ("lungs clear heart size normal no pleural effusion or pneumothorax mediastinal contours unremarkable "
+         "osseous structures intact no focal consolidation trachea midline soft tissues within normal limits "
+         "impression no acute cardiopulmonary process recommend clinical correlation follow up as needed").split()
+
+
+def report(seed, length=60):
+    rng = np.random.default_rng(seed)
+    return " ".join(rng.choice(WORDS, length))
+
+
+def test_normalization_ignores_case_spacing_and_deid_blanks():
+    assert normalize_text("Pt ___ seen  [**2101-3-4**].\nLungs CLEAR") == "pt seen lungs clear"
+
+
+def test_exact_duplicates_share_the_first_occurrence():
+    texts = [report(0), report(1), report(0).upper(), "  " + report(1).replace(" ", "\n")]
+
+    assert cluster_ids(texts, near=False).tolist() == [0, 1, 0, 1]
+
+
+def test_near_duplicates_cluster_only_with_near_matching():
+    base = report(2).split()
+    edited = " ".join(base[:30] + ["cardiomegaly"] + base[31:])
+    texts = [" ".join(base), report(3), edited]
+
+    assert cluster_ids(texts, near=False).tolist() == [0, 1, 2]
+    assert cluster_ids(texts).tolist() == [0, 1, 0]
+
+
+def test_unrelated_reports_and_empty_texts_stay_apart():
+    texts = [report(i) for i in range(20)] + ["", "___"]
+
+    labels = cluster_ids(texts)
+
+    # The two texts that normalize to nothing are exact copies of each other
+    assert labels.tolist() == list(range(21)) + [20]
+    assert cluster_stats(labels) == {"reports": 22, "clusters": 21, "duplicates": 1, "duplicate_rate": 1 / 22}
+
+
+def test_signature_agreement_estimates_jaccard():
+    a = " ".join(f"t{i}" for i in range(200))
+    b = " ".join(f"t{i}" for i in range(100, 300))
+    # 98 of the 298 distinct 3-token shingles are shared; consecutive token ids used to bias this low
+    signatures = minhash_signatures([a, b], num_perm=512)
+
+    assert (signatures[0] == signatures[1]).mean() == pytest.approx(98 / 298, abs=0.07)
+
+
+def test_signatures_do_not_depend_on_chunking(monkeypatch):
+    texts = [normalize_text(report(i)) for i in range(10)] + [""]
+    expected = minhash_signatures(texts)
+
+    monkeypatch.setattr(dedup, "CHUNK_SHINGLES", 50)
+    chunked = minhash_signatures(texts)
+
+    assert (chunked == expected).all()
+    assert (chunked[-1] == dedup.MAX_HASH).all()
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from ablation_study import evaluation
+from ablation_study.evaluation import bootstrap_ci, paired_bootstrap_delta, resampled_sums, shard_indices
+
+
+def test_shard_indices_cover_every_report_once():
+    shards = [shard_indices(10, 3, i) for i in range(3)]
+
+    assert sorted(np.concatenate(shards).tolist()) == list(range(10))
+    assert shards[1].tolist() == [1, 4, 7]
+
+
+def test_shard_indices_rejects_out_of_range_shard():
+    with pytest.raises(ValueError):
+        shard_indices(10, 3, 3)
+
+
+def test_bootstrap_ci_brackets_point_estimate():
+    rng = np.random.default_rng(0)
+    counts = np.stack([rng.integers(0, 5, 500), rng.integers(0, 3, 500), rng.integers(0, 3, 500)], axis=1)
+
+    result = bootstrap_ci(counts, n_boot=300)
+
+    tp, fp, fn = counts.sum(axis=0)
+    assert result["precision"]["value"] == pytest.approx(tp / (tp + fp))
+    for metric in ("precision", "recall", "f1"):
+        low, high = result[metric]["ci"]
+        assert low <= result[metric]["value"] <= high
+
+
+def test_bootstrap_ci_is_degenerate_for_identical_reports():
+    result = bootstrap_ci([[2, 1, 1]] * 50, n_boot=100)
+
+    assert result["f1"]["ci"] == [pytest.approx(2 / 3)] * 2
+
+
+def test_resamples_keep_report_count_across_chunks(monkeypatch):
+    monkeypatch.setattr(evaluation, "BOOT_CHUNK_ELEMENTS", 40)
+    counts = np.ones((7, 3), dtype=np.int64)
+
+    sums, = resampled_sums(25, counts)
+
+    # Every resample draws exactly one weight per report in total, whatever the chunking
+    assert sums.shape == (25, 3)
+    assert (sums == 7).all()
+
+
+def test_paired_delta_of_a_system_with_itself_is_zero():
+    counts = [[1, 0, 1], [0, 1, 0], [3, 0, 0]]
+
+    result = paired_bootstrap_delta(counts, counts, n_boot=50)
+
+    assert result["value"] == 0
+    assert result["ci"] == [0, 0]
+    assert result["p_le_zero"] == 1.0
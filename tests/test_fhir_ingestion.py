@@ -0,0 +1,174 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+
+import httpx
+import pytest
+
+from llm import fhir_ingestion
+from llm.fhir_ingestion import FhirClient, ingest_export, ingest_search, iter_report_rows, retry_after_seconds
+
+BASE_URL = "http://fhir.test"
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(fhir_ingestion, "RETRY_BACKOFF_S", 0.0)
+
+
+def report(id, text=None, url=None, resource_type="DiagnosticReport", subject="Patient/p1"):
+    attachment = {"contentType": "text/plain"}
+    if text is not None:
+        attachment["data"] = base64.b64encode(text.encode()).decode()
+    if url is not None:
+        attachment["url"] = url
+    resource = {"resourceType": resource_type, "id": id, "subject": {"reference": subject}}
+    if resource_type == "DiagnosticReport":
+        resource["presentedForm"] = [attachment]
+    else:
+        resource["content"] = [{"attachment": attachment}]
+    return resource
+
+
+def bundle(resources, next_url=None):
+    links = [{"relation": "next", "url": next_url}] if next_url else []
+    return {"resourceType": "Bundle", "link": links,
+            "entry": [{"resource": r, "search": {"mode": "match"}} for r in resources]}
+
+
+def collect(ingest, handler, **kwargs):
+    async def run():
+        client = FhirClient(BASE_URL, transport=httpx.MockTransport(handler))
+        rows = []
+
+        async def emit(row):
+            rows.append(row)
+
+        try:
+            await ingest(client, emit, **kwargs)
+        finally:
+            await client.close()
+        return rows
+
+    return asyncio.run(run())
+
+
+def test_search_follows_next_links_and_decodes_both_attachment_kinds():
+    requests = []
+
+    def handler(request):
+        requests.append(request.url.path)
+        if request.url.path == "/DiagnosticReport" and "page" not in request.url.params:
+            included = {"resource": report("patient-only"), "search": {"mode": "include"}}
+            first = bundle([report("r1", text="CT head: no bleed")], next_url=f"{BASE_URL}/DiagnosticReport?page=2")
+            first["entry"].append(included)
+            return httpx.Response(200, json=first)
+        if request.url.path == "/DiagnosticReport":
+            return httpx.Response(200, json=bundle([report("r2", url=f"{BASE_URL}/Binary/b2")]))
+        if request.url.path == "/Binary/b2":
+            return httpx.Response(200, content=b"MRI knee: meniscal tear", headers={"Content-Type": "text/plain"})
+        return httpx.Response(404)
+
+    rows = collect(ingest_search, handler)
+
+    assert sorted((r["note_id"], r["text"]) for r in rows) == [
+        ("r1", "CT head: no bleed"), ("r2", "MRI knee: meniscal tear")]
+    assert all(r["subject_id"] == "p1" for r in rows)
+    assert requests.count("/DiagnosticReport") == 2
+
+
+def test_search_dedups_on_resource_type_and_id():
+    def handler(request):
+        if request.url.path == "/DiagnosticReport":
+            return httpx.Response(200, json=bundle([report("same", text="report")]))
+        if request.url.path == "/DocumentReference":
+            return httpx.Response(200, json=bundle([report("same", text="note", resource_type="DocumentReference")]))
+        return httpx.Response(404)
+
+    # Two patients return the same DiagnosticReport; the DocumentReference shares only its id
+    rows = collect(ingest_search, handler, patient_ids=["p1", "p2"],
+                   resource_types=("DiagnosticReport", "DocumentReference"))
+
+    assert sorted(r["text"] for r in rows) == ["note", "report"]
+
+
+def test_export_kicks_off_polls_and_streams_ndjson():
+    polls = []
+
+    def handler(request):
+        path = request.url.path
+        if path == "/Group/g1/$export":
+            assert request.headers["Prefer"] == "respond-async"
+            return httpx.Response(202, headers={"Content-Location": f"{BASE_URL}/status/1"})
+        if path == "/status/1":
+            polls.append(path)
+            if len(polls) < 3:
+                return httpx.Response(202, headers={"X-Progress": f"{len(polls)}/3", "Retry-After": "0"})
+            return httpx.Response(200, json={"requiresAccessToken": True, "output": [
+                {"type": "DiagnosticReport", "url": f"{BASE_URL}/files/{i}.ndjson"} for i in range(2)]})
+        if path.startswith("/files/"):
+            i = path.split("/")[-1].split(".")[0]
+            lines = [json.dumps(report(f"f{i}-{j}", text=f"file {i} report {j}")) for j in range(3)]
+            return httpx.Response(200, content=("\n".join(lines) + "\n\n").encode())
+        return httpx.Response(404)
+
+    rows = collect(ingest_export, handler, group_id="g1")
+
+    assert len(polls) == 3
+    assert sorted(r["note_id"] for r in rows) == [f"f{i}-{j}" for i in range(2) for j in range(3)]
+
+
+def test_throttled_request_is_retried_after_retry_after():
+    calls = []
+
+    def handler(request):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0.2"})
+        return httpx.Response(200, json=bundle([report("r1", text="ok")]))
+
+    rows = collect(ingest_search, handler)
+
+    assert [r["note_id"] for r in rows] == ["r1"]
+    assert calls[1] - calls[0] >= 0.2
+
+
+def test_connection_errors_are_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) < 3:
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200, json=bundle([report("r1", text="ok")]))
+
+    rows = collect(ingest_search, handler)
+
+    assert [r["note_id"] for r in rows] == ["r1"]
+    assert len(calls) == 3
+
+
+def test_retry_after_accepts_seconds_and_http_dates():
+    assert retry_after_seconds("3", 5) == 3.0
+    assert retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT", 5) == 0.0
+    assert retry_after_seconds("not a date", 5) == 5
+    assert retry_after_seconds(None, 5) == 5
+
+
+def test_closing_the_row_iterator_stops_the_producer(monkeypatch):
+    monkeypatch.setattr(fhir_ingestion, "ROW_BUFFER", 2)
+    monkeypatch.setattr(fhir_ingestion, "PUT_POLL_S", 0.01)
+
+    def handler(request):
+        return httpx.Response(200, json=bundle([report(f"r{i}", text=f"report {i}") for i in range(50)]))
+
+    rows = iter_report_rows("search", base_url=BASE_URL, transport=httpx.MockTransport(handler))
+    assert next(rows)["note_id"] == "r0"
+    rows.close()
+
+    deadline = time.monotonic() + 5
+    while any(t.name == "fhir-ingestion" for t in threading.enumerate()):
+        assert time.monotonic() < deadline, "producer thread still running"
+        time.sleep(0.01)
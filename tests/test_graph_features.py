@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from graphrag.graph_features import (
+    adjacency_matrix, compute_features, load_features, pagerank, save_features, summarize,
+)
+from graphrag.neo4j_backend import HIERARCHY_REL
+
+# child -> parent: 0 is the root, 4 has two parents, 5 is isolated and 6 <-> 7 is a cycle with no root
+HIERARCHY = [(1, 0), (2, 0), (3, 1), (4, 1), (4, 2), (6, 7), (7, 6)]
+PART_OF = [(3, 2), (3, 2), (5, 0)]
+N = 8
+
+
+def edges(pairs):
+    return np.array([s for s, _ in pairs]), np.array([t for _, t in pairs])
+
+
+def features():
+    return compute_features(N, {HIERARCHY_REL: edges(HIERARCHY), "PART_OF": edges(PART_OF)})
+
+
+def dense_pagerank(matrix, damping=0.85):
+    """Closed-form PageRank with dangling rows spread evenly"""
+    m = matrix.toarray()
+    out = m.sum(axis=1, keepdims=True)
+    transition = np.where(out > 0, m / np.where(out > 0, out, 1), 1 / len(m))
+    google = damping * transition + (1 - damping) / len(m)
+    values, vectors = np.linalg.eig(google.T)
+    rank = np.real(vectors[:, np.argmax(np.real(values))])
+    return rank / rank.sum()
+
+
+def test_depth_below_the_nearest_root():
+    assert features()["hierarchyDepth"].tolist() == [0, 1, 1, 2, 2, 0, -1, -1]
+
+
+def test_subtree_size_over_shallowest_parent_tree():
+    # 4 is counted once, under its lower-index parent 1
+    assert features()["subtreeSize"].tolist() == [5, 3, 1, 1, 1, 1, 1, 1]
+
+
+def test_degrees_count_distinct_edges_per_type_and_overall():
+    f = features()
+
+    assert f["outDegree_PART_OF"].tolist() == [0, 0, 0, 1, 0, 1, 0, 0]
+    assert f["inDegree_PART_OF"].tolist() == [1, 0, 1, 0, 0, 0, 0, 0]
+    assert f["outDegree"].tolist() == [0, 1, 1, 2, 2, 1, 1, 1]
+    assert f["inDegree"].tolist() == [3, 2, 2, 0, 0, 0, 1, 1]
+
+
+def test_pagerank_matches_the_dense_solution_and_has_mean_one():
+    total = adjacency_matrix(*edges(HIERARCHY + PART_OF), N)
+
+    assert pagerank(total) == pytest.approx(dense_pagerank(total), abs=1e-8)
+    assert features()["pageRank"].mean() == pytest.approx(1.0)
+    assert pagerank(adjacency_matrix(np.array([], dtype=int), np.array([], dtype=int), 0)).size == 0
+
+
+def test_hub_score_and_summary():
+    f = features()
+
+    assert f["hubScore"][0] == pytest.approx(np.log(5) / np.log(N))
+    assert f["hubScore"][3] == 0
+    assert summarize(f) == {"concepts": N, "max_depth": 2, "roots": 2, "unreachable": 2, "leaves": 6,
+                            "hubs_over_0.5": 2}
+
+
+def test_saved_features_align_to_new_rids(tmp_path):
+    rids = [f"RID{i}" for i in range(N)]
+    save_features(tmp_path, rids, features())
+
+    aligned = load_features(tmp_path, ["RID3", "RID404", "RID0"])
+
+    assert aligned["subtreeSize"].tolist() == [1, 0, 5]
+    assert load_features(tmp_path / "missing", rids) is None
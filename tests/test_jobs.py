@@ -0,0 +1,109 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from graphrag import jobs
+from graphrag.jobs import JobManifest
+
+UNITS = [{"id": f"u{i}"} for i in range(4)]
+
+
+@pytest.fixture(autouse=True)
+def fast_takeover(monkeypatch):
+    monkeypatch.setattr(jobs, "TAKEOVER_SETTLE_SECONDS", 0.05)
+
+
+def two_workers(tmp_path):
+    first = JobManifest.open(tmp_path, "test", {"p": 1}, UNITS, worker="host-a:1")
+    second = JobManifest.open(tmp_path, "test", {"p": 1}, UNITS, worker="host-b:2")
+    return first, second
+
+
+def expire(manifest, unit_id):
+    old = time.time() - jobs.LEASE_SECONDS - 1
+    os.utime(manifest.path / "claims" / unit_id, (old, old))
+
+
+def test_workers_share_one_manifest_and_claim_disjoint_units(tmp_path):
+    first, second = two_workers(tmp_path)
+
+    assert first.path == second.path
+    assert first.claim("u0")
+    assert not second.claim("u0")
+    assert second.claim("u1")
+    assert first.status()["claimed"] == 2
+
+
+def test_run_finishes_every_unit_across_workers(tmp_path):
+    first, second = two_workers(tmp_path)
+    assert second.claim("u2")
+
+    first.run(lambda unit: {"id": unit["id"]})
+    assert not first.is_complete()
+    second.complete("u2")
+
+    assert first.is_complete()
+    assert not second.claim("u0")
+    assert json.loads((first.path / "done" / "u1.json").read_text())["worker"] == "host-a:1"
+
+
+def test_failed_unit_is_released_for_another_worker(tmp_path):
+    first, second = two_workers(tmp_path)
+
+    def fail_u0(unit):
+        if unit["id"] == "u0":
+            raise RuntimeError("boom")
+
+    assert first.run(fail_u0) == ["u0"]
+    assert second.claim("u0")
+
+
+def test_live_lease_is_kept_and_expired_lease_is_taken_over(tmp_path):
+    first, second = two_workers(tmp_path)
+    assert first.claim("u0")
+    assert not second.claim("u0")
+
+    expire(first, "u0")
+
+    assert second.claim("u0")
+    assert second.holds("u0") and not first.holds("u0")
+    # The previous owner no longer removes the claim it lost
+    first.release("u0")
+    assert (first.path / "claims" / "u0").exists()
+    assert not first.claim("u0")
+
+
+def test_concurrent_takeover_has_one_winner(tmp_path):
+    first, second = two_workers(tmp_path)
+    third = JobManifest.open(tmp_path, "test", {"p": 1}, UNITS, worker="host-c:3")
+    assert third.claim("u0")
+    expire(third, "u0")
+    start = threading.Barrier(2)
+    won = {}
+
+    def take(manifest):
+        start.wait()
+        won[manifest.worker] = manifest.claim("u0")
+
+    threads = [threading.Thread(target=take, args=(m,)) for m in (first, second)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(won.values()) == [False, True]
+    assert first.holds("u0") != second.holds("u0")
+
+
+def test_changed_params_start_a_fresh_job(tmp_path):
+    first = JobManifest.open(tmp_path, "test", {"p": 1}, UNITS)
+    first.complete("u0")
+
+    fresh = JobManifest.open(tmp_path, "test", {"p": 2}, UNITS)
+
+    assert fresh.path != first.path
+    assert fresh.done() == set()
+    assert len(jobs.list_jobs(tmp_path)) == 2
@@ -0,0 +1,66 @@
+from graphrag.lexicon import LexicalIndex, PhraseMatcher, longest_matches, tokenize
+
+CONCEPTS = [
+    ("RID1", "abdomen", "", []),
+    ("RID2", "CT abdomen", "", ["computed tomography of abdomen"]),
+    ("RID3", "abdomen and pelvis", "", []),
+    ("RID4", "pelvis", "", []),
+    ("RID5", "lung", "", ["pulmonary"]),
+    ("RID6", "no", "", []),
+    ("RID7", "left lung", "", []),
+]
+
+
+def phrases(matcher, matches):
+    return [" ".join(matcher.phrases[p]) for _, _, p in matches]
+
+
+def test_matcher_reports_overlapping_and_nested_phrases():
+    matcher = PhraseMatcher()
+    for phrase in ("ct abdomen", "abdomen", "abdomen and pelvis", "pelvis", "and"):
+        matcher.add(phrase.split(), phrase)
+    tokens = tokenize("CT abdomen and pelvis")
+
+    matches = matcher.find(tokens)
+
+    # Ordered by end position; suffix outputs come through the failure links
+    assert [(s, e) for s, e, _ in matches] == [(0, 2), (1, 2), (2, 3), (1, 4), (3, 4)]
+    assert phrases(matcher, matches) == ["ct abdomen", "abdomen", "and", "abdomen and pelvis", "pelvis"]
+    assert phrases(matcher, longest_matches(matches)) == ["ct abdomen", "abdomen and pelvis"]
+
+
+def test_matcher_follows_failure_links_after_a_partial_match():
+    matcher = PhraseMatcher()
+    matcher.add(["a", "b", "c"], "abc")
+    matcher.add(["b", "d"], "bd")
+
+    assert phrases(matcher, matcher.find(["a", "b", "d", "a", "b", "c"])) == ["b d", "a b c"]
+
+
+def test_duplicate_phrases_share_one_entry():
+    matcher = PhraseMatcher()
+    matcher.add(["lung"], "RID5")
+    matcher.add(["lung"], "RID99")
+    matcher.add([], "ignored")
+
+    assert len(matcher.phrases) == 1
+    assert matcher.payloads[0] == ["RID5", "RID99"]
+
+
+def test_matches_fall_on_word_boundaries():
+    index = LexicalIndex(CONCEPTS)
+
+    assert index.search("Lungs clear. Pelvic free fluid. Abdominal wall intact.") == []
+    assert [h["rid"] for h in index.search("LUNG: clear (left-lung)")] == ["RID7", "RID5"]
+
+
+def test_search_prefers_longest_mentions_and_skips_stop_phrases():
+    index = LexicalIndex(CONCEPTS)
+
+    hits = index.search("CT abdomen and pelvis: no free air. Pulmonary bases clear.")
+
+    assert [(h["rid"], h["mention"]) for h in hits] == [
+        ("RID3", "abdomen and pelvis"), ("RID2", "ct abdomen"), ("RID5", "pulmonary")]
+    assert all(h["score"] == 1.0 and h["match"] == "lexical" for h in hits)
+    assert [h["rid"] for h in index.search("CT abdomen and pelvis", longest_only=False)][:2] == ["RID3", "RID2"]
+    assert len(index.search("CT abdomen and pelvis", limit=1)) == 1
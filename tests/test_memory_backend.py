@@ -0,0 +1,115 @@
+import re
+
+import numpy as np
+import pytest
+
+from benchmarks.fixtures import HashingEncoder
+from graphrag import neo4j_backend
+from graphrag.memory_backend import InMemoryGraphBackend
+from graphrag.neo4j_backend import HIERARCHY_REL
+
+ENCODER = HashingEncoder(16)
+CONCEPTS = [
+    {"rid": "RID1", "name": "anatomical entity", "definition": "root"},
+    {"rid": "RID2", "name": "organ", "definition": "a solid organ"},
+    {"rid": "RID3", "name": "lung", "definition": "organ of respiration"},
+    {"rid": "RID4", "name": "left lung", "definition": "the left lung"},
+    {"rid": "RID5", "name": "pneumonia", "definition": "infection of the lung"},
+]
+EDGES = [
+    (HIERARCHY_REL, "RID2", "RID1"),
+    (HIERARCHY_REL, "RID3", "RID2"),
+    (HIERARCHY_REL, "RID4", "RID3"),
+    ("MAY_AFFECT", "RID5", "RID3"),
+]
+
+
+def make_backend():
+    concepts = [dict(c, embedding=ENCODER(f"{c['name']} {c['definition']}")[0].tolist()) for c in CONCEPTS]
+    return InMemoryGraphBackend.from_records(concepts, EDGES, encoder=ENCODER)
+
+
+def neo4j_columns(monkeypatch, call):
+    """Column names each Cypher query issued by a neo4j_backend call would return"""
+    queries = []
+
+    def read(query, name=None, **params):
+        queries.append(query)
+        return [{"relationshipType": rel} for rel in (HIERARCHY_REL, "MAY_AFFECT")] if "relationshipTypes" in query else []
+
+    class Model:
+        def encode(self, text):
+            return ENCODER(text)[0]
+
+    monkeypatch.setattr(neo4j_backend.graph_db, "read", read)
+    monkeypatch.setattr(neo4j_backend.embedding, "get_model", lambda: Model())
+    neo4j_backend.get_all_relationship_types.cache_clear()
+    call()
+    neo4j_backend.get_all_relationship_types.cache_clear()
+    return [return_columns(q) for q in queries if "relationshipTypes" not in q]
+
+
+def return_columns(query):
+    clause = re.split(r"\b(?:ORDER BY|LIMIT)\b", query.split("RETURN", 1)[1])[0]
+    clause = re.sub(r"\([^()]*\)", "", clause.replace("DISTINCT", ""))
+    return {item.split()[-1] for item in clause.split(",")}
+
+
+def test_semantic_search_rows_match_the_neo4j_columns(monkeypatch):
+    columns, = neo4j_columns(monkeypatch, lambda: neo4j_backend.semantic_search("lung infection", limit=3))
+
+    hits = make_backend().semantic_search("lung infection", limit=3)
+
+    assert len(hits) == 3
+    assert all(set(h) == columns for h in hits)
+    assert all(0 <= h["score"] <= 1 for h in hits)
+    assert [h["score"] for h in hits] == sorted((h["score"] for h in hits), reverse=True)
+
+
+def test_concept_context_rows_match_the_neo4j_columns(monkeypatch):
+    hierarchy, typed = neo4j_columns(monkeypatch, lambda: neo4j_backend.get_concept_context("RID3"))
+
+    context = make_backend().get_concept_context("RID3", depth=2)
+
+    assert all(set(row) == hierarchy == typed for row in context)
+    hierarchy_rows = [(r["name"], r["hops"]) for r in context if r["rel_type"] == "hierarchy"]
+    # Closest first, as ORDER BY hops; parent and child are both one hop away
+    assert sorted(hierarchy_rows[:2]) == [("left lung", 1), ("organ", 1)]
+    assert hierarchy_rows[2:] == [("anatomical entity", 2)]
+    assert [(r["name"], r["rel_type"]) for r in context if r["rel_type"] != "hierarchy"] == [
+        ("pneumonia", "MAY_AFFECT")]
+
+
+def test_concept_context_respects_limits_and_unknown_rids():
+    backend = make_backend()
+
+    assert len(backend.get_concept_context("RID1", depth=3, hierarchy_limit=2)) == 2
+    assert backend.get_concept_context("RID404") == []
+
+
+def test_zero_query_vector_returns_no_hits():
+    backend = make_backend()
+
+    # The hashing encoder maps text without tokens to the zero vector
+    assert backend.semantic_search_batch(["", "lung"], limit=2)[0] == []
+    assert len(backend.semantic_search_batch(["", "lung"], limit=2)[1]) == 2
+    assert backend.semantic_search("   ") == []
+
+
+def test_snapshot_round_trip(tmp_path):
+    backend = make_backend()
+    backend.save(tmp_path)
+
+    loaded = InMemoryGraphBackend.load(tmp_path, encoder=ENCODER)
+
+    assert loaded.rids == backend.rids
+    assert np.allclose(loaded.vectors.to_float32(), backend.vectors.to_float32())
+    assert loaded.get_concept_context("RID3") == backend.get_concept_context("RID3")
+
+
+def test_saving_a_quantized_backend_warns(tmp_path):
+    concepts = [dict(c, embedding=ENCODER(c["name"])[0].tolist()) for c in CONCEPTS]
+    backend = InMemoryGraphBackend.from_records(concepts, EDGES, encoder=ENCODER, vector_dtype="int8")
+
+    with pytest.warns(UserWarning, match="dequantized"):
+        backend.save(tmp_path)
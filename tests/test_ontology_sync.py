@@ -0,0 +1,67 @@
+from graphrag.ontology_sync import diff_ontology, property_hash
+
+BASE = "http://www.radlex.org/RID/"
+
+
+def concept(rid, label, definition="", synonyms=()):
+    return {"uri": BASE + rid, "rid": rid, "label": label, "preferredName": label, "definition": definition,
+            "synonyms": list(synonyms), "fmaid": None, "umlsId": None, "umlsTerm": None}
+
+
+def graph_state(concepts, edges):
+    return ({c["uri"]: {k: v for k, v in c.items() if k != "uri"} for c in concepts},
+            {(t, BASE + s, BASE + o) for t, s, o in edges})
+
+
+def rels(*edges):
+    grouped = {}
+    for t, s, o in edges:
+        grouped.setdefault(t, []).append({"source": BASE + s, "target": BASE + o})
+    return grouped
+
+
+CURRENT = [concept("RID1", "lung", "organ of respiration", ["pulmo", "lungs"]),
+           concept("RID2", "pleura"),
+           concept("RID3", "obsolete term")]
+CURRENT_EDGES = [("PART_OF", "RID2", "RID1"), ("RDF_SCHEMA_SUBCLASSOF", "RID3", "RID1")]
+
+
+def test_unchanged_extract_gives_an_empty_diff():
+    diff = diff_ontology(*graph_state(CURRENT, CURRENT_EDGES), CURRENT, rels(*CURRENT_EDGES))
+
+    assert all(not changes for changes in diff.values())
+
+
+def test_synonym_order_is_not_a_change():
+    reordered = [concept("RID1", "lung", "organ of respiration", ["lungs", "pulmo"])] + CURRENT[1:]
+
+    assert property_hash(reordered[0]) == property_hash(CURRENT[0])
+    assert diff_ontology(*graph_state(CURRENT, CURRENT_EDGES), reordered, rels(*CURRENT_EDGES))["update"] == []
+
+
+def test_added_removed_and_changed_concepts_and_edges():
+    new = [concept("RID1", "lung", "paired organ of respiration", ["pulmo", "lungs"]),
+           concept("RID2", "pleura", synonyms=["pleural membrane"]),
+           concept("RID4", "pleural effusion")]
+    new_edges = [("PART_OF", "RID2", "RID1"), ("RDF_SCHEMA_SUBCLASSOF", "RID4", "RID2"),
+                 ("MAY_AFFECT", "RID4", "RID9")]
+
+    diff = diff_ontology(*graph_state(CURRENT, CURRENT_EDGES), new, rels(*new_edges))
+
+    assert [c["rid"] for c in diff["insert"]] == ["RID4"]
+    assert [c["rid"] for c in diff["update"]] == ["RID1", "RID2"]
+    assert diff["delete"] == [BASE + "RID3"]
+    # Only the definition feeds the embedding text; a new synonym keeps the stored vector
+    assert diff["reembed"] == [BASE + "RID1"]
+    # The edge to RID9 has no concept in the extract, and RID3's edge goes with its node
+    assert diff["insert_edges"] == [("RDF_SCHEMA_SUBCLASSOF", BASE + "RID4", BASE + "RID2")]
+    assert diff["delete_edges"] == []
+
+
+def test_edge_removed_between_surviving_concepts():
+    new_edges = [("RDF_SCHEMA_SUBCLASSOF", "RID3", "RID1")]
+
+    diff = diff_ontology(*graph_state(CURRENT, CURRENT_EDGES), CURRENT, rels(*new_edges))
+
+    assert diff["delete_edges"] == [("PART_OF", BASE + "RID2", BASE + "RID1")]
+    assert diff["insert_edges"] == []
@@ -0,0 +1,92 @@
+import re
+
+import pytest
+
+from graphrag.retrieval import REPORT_MARKER, compose_report_with_context
+from llm.prompts import BILLING_PROMPT, PromptTemplate
+
+BOS = 1
+
+
+class WordTokenizer:
+    """Words, single whitespace characters and punctuation each map to one id, plus a BOS id"""
+
+    pattern = re.compile(r"\w+|\s|[^\w\s]")
+
+    def __init__(self):
+        self.vocab = {}
+        self.words = {}
+
+    def _ids(self, text):
+        ids = []
+        for piece in self.pattern.findall(text):
+            if piece not in self.vocab:
+                self.vocab[piece] = len(self.vocab) + 2
+                self.words[self.vocab[piece]] = piece
+            ids.append(self.vocab[piece])
+        return ids
+
+    def __call__(self, text, add_special_tokens=True):
+        special = [BOS] if add_special_tokens else []
+        if isinstance(text, str):
+            return {"input_ids": special + self._ids(text)}
+        return {"input_ids": [special + self._ids(t) for t in text]}
+
+    def decode(self, ids):
+        return "".join(self.words[i] for i in ids if i != BOS)
+
+
+class WhitespaceRunTokenizer(WordTokenizer):
+    """Merges runs of whitespace, so a field ending in a newline merges with the next segment"""
+
+    pattern = re.compile(r"\w+|\s+|[^\w\s]")
+
+
+REPORTS = ["No acute findings.", compose_report_with_context("RadLex context", "CT head without contrast.\n"),
+           "Ends with a newline\n", ""]
+
+
+@pytest.mark.parametrize("tokenizer_class", [WordTokenizer, WhitespaceRunTokenizer])
+def test_encode_matches_tokenizing_the_rendered_prompt(tokenizer_class):
+    tokenizer = tokenizer_class()
+
+    for report in REPORTS:
+        rendered = BILLING_PROMPT.render(report=report)
+        assert BILLING_PROMPT.encode(tokenizer, report=report) == tokenizer(rendered)["input_ids"]
+    assert BILLING_PROMPT.encode_batch(tokenizer, report=REPORTS) == tokenizer(
+        [BILLING_PROMPT.render(report=r) for r in REPORTS])["input_ids"]
+
+
+def test_only_merging_tokenizers_fall_back_to_whole_prompts():
+    assert BILLING_PROMPT._static_ids(WordTokenizer())[2]
+    assert not BILLING_PROMPT._static_ids(WhitespaceRunTokenizer())[2]
+
+
+@pytest.mark.parametrize("tokenizer_class", [WordTokenizer, WhitespaceRunTokenizer])
+def test_truncation_drops_the_start_of_the_report(tokenizer_class):
+    tokenizer = tokenizer_class()
+    report = " ".join(f"word{i}" for i in range(200))
+    full = BILLING_PROMPT.encode(tokenizer, report=report)
+
+    ids = BILLING_PROMPT.encode(tokenizer, 100, report=report)
+
+    assert len(ids) <= 100 and ids[0] == BOS
+    text = tokenizer.decode(ids)
+    assert text.endswith("Billable Procedures:")
+    assert "word199" in text and "word0 " not in text
+    assert BILLING_PROMPT.encode(tokenizer, len(full), report=report) == full
+
+
+def test_composed_prompt_has_one_report_marker():
+    for context in ("", "RadLex concepts:\n- lung"):
+        prompt = BILLING_PROMPT.render(report=compose_report_with_context(context, "Chest radiograph."))
+
+        assert prompt.count(REPORT_MARKER) == 1
+        assert prompt.startswith(context or REPORT_MARKER)
+
+
+def test_encode_batch_requires_every_field():
+    template = PromptTemplate("t", "v1", "{a} and {b}")
+
+    with pytest.raises(ValueError, match="needs fields"):
+        template.encode_batch(WordTokenizer(), a=["x"])
@@ -0,0 +1,75 @@
+from graphrag.ranking import rerank
+
+
+def hit(rid, score, hub_score=0.0):
+    return {"rid": rid, "name": f"concept {rid}", "definition": "", "score": score, "hub_score": hub_score}
+
+
+def test_exact_mentions_survive_rerank():
+    # Strong semantic neighbours that link to each other, against mentions with no vector score
+    vector_hits = [hit(f"V{i}", 0.95 - 0.01 * i) for i in range(10)]
+    contexts = {h["rid"]: [{"name": o["name"], "rel_type": "hierarchy", "hops": 1}
+                           for o in vector_hits if o is not h] for h in vector_hits}
+    lexical_hits = [dict(hit(f"L{i}", 1.0, hub_score=1.0), mention=f"concept l{i}") for i in range(5)]
+
+    concepts = rerank(vector_hits, lexical_hits, contexts, "report text", top_k=5)
+
+    assert [c["rid"] for c in concepts] == [h["rid"] for h in lexical_hits]
+
+
+def test_mention_with_weak_vector_score_outranks_vector_only_hits():
+    vector_hits = [hit(f"V{i}", 0.95) for i in range(4)] + [hit("L0", 0.5)]
+    contexts = {h["rid"]: [{"name": o["name"], "rel_type": "hierarchy", "hops": 1}
+                           for o in vector_hits[:4] if o is not h] for h in vector_hits[:4]}
+    lexical_hits = [dict(hit("L0", 1.0), mention="concept l0")]
+
+    concepts = rerank(vector_hits, lexical_hits, contexts, "report text", top_k=2)
+
+    assert [c["rid"] for c in concepts] == ["L0", "V0"]
+
+
+def related(name, rel_type="hierarchy", hops=1):
+    return {"name": name, "rel_type": rel_type, "hops": hops}
+
+
+def test_empty_pool_and_concepts_without_context():
+    assert rerank([], [], {}, "text") == []
+
+    concepts = rerank([hit("V0", 0.9), hit("V1", 0.8)], [], {}, "text")
+
+    assert [(c["rid"], c["related"]) for c in concepts] == [("V0", []), ("V1", [])]
+
+
+def test_hub_score_breaks_near_ties():
+    concepts = rerank([hit("HUB", 0.81, hub_score=1.0), hit("LEAF", 0.8)], [], {}, "text", top_k=1)
+
+    assert [c["rid"] for c in concepts] == ["LEAF"]
+
+
+def test_linked_candidates_gain_support():
+    vector_hits = [hit("A", 0.8), hit("B", 0.7), hit("C", 0.75)]
+    contexts = {"B": [related("concept A")]}
+
+    concepts = rerank(vector_hits, [], contexts, "text", top_k=3)
+
+    assert [c["rid"] for c in concepts] == ["A", "B", "C"]
+
+
+def test_related_lines_decay_with_hops_and_favour_mentions():
+    contexts = {"V0": [related("far", hops=3), related("near", hops=1), related("mid", "HAS_PART", hops=2),
+                       related("pleura", hops=3)]}
+
+    concept, = rerank([hit("V0", 0.9)], [], contexts, "Small effusion along the pleura.", top_k=1)
+
+    assert [r["name"] for r in concept["related"]] == ["pleura", "near", "mid", "far"]
+
+
+def test_related_budget_is_global_and_skips_chosen_concepts():
+    vector_hits = [hit("A", 0.9), hit("B", 0.8)]
+    contexts = {"A": [related("concept B"), related("a1"), related("a2", hops=2)],
+                "B": [related("b1"), related("b2", hops=3)]}
+
+    concepts = rerank(vector_hits, [], contexts, "text", top_k=2, related_budget=3)
+
+    # concept B is already in the prompt, so A does not repeat it as a relative
+    assert {c["rid"]: [r["name"] for r in c["related"]] for c in concepts} == {"A": ["a1", "a2"], "B": ["b1"]}
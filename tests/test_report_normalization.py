@@ -0,0 +1,70 @@
+import pandas as pd
+
+from llm.report_normalization import (
+    DEFAULT_IMPRESSION, clean_text, extract_sections, filter_length, impression_snippets, normalize_reports,
+)
+
+REPORT = """EXAMINATION: CHEST (PA AND LAT)
+Indication : cough
+findings: Lungs are clear. No change in findings: stable.
+HISTORY: smoker
+Impression:
+No acute process."""
+
+
+def test_clean_text_unifies_deid_blanks_and_whitespace():
+    texts = pd.Series(["Patient [**Name**] seen by ____ \t on  day 3.\r\n\n\n\nImpression:  ok   ", "  \n x \n  "])
+
+    assert clean_text(texts).tolist() == ["Patient ___ seen by ___ on day 3.\n\nImpression: ok", "x"]
+
+
+def test_sections_are_split_at_headers_of_any_case():
+    sections = extract_sections(pd.Series([REPORT]))
+
+    assert sections.loc[0, "examination"] == "CHEST (PA AND LAT)"
+    assert sections.loc[0, "indication"] == "cough"
+    # A header word mid-line is body text, and an unknown header stays in the section before it
+    assert sections.loc[0, "findings"] == "Lungs are clear. No change in findings: stable.\nHISTORY: smoker"
+    assert sections.loc[0, "impression"] == "No acute process."
+
+
+def test_adjacent_sections_do_not_bleed_into_each_other():
+    sections = extract_sections(pd.Series(["FINDINGS:\nIMPRESSION: normal", "TECHNIQUE:CT\nCOMPARISON:none"]))
+
+    assert sections.loc[0, "findings"] == ""
+    assert sections.loc[0, "impression"] == "normal"
+    assert sections.loc[1, ["technique", "comparison"]].tolist() == ["CT", "none"]
+
+
+def test_missing_sections_are_missing_values():
+    sections = extract_sections(pd.Series(["No headers at all.", "IMPRESSION: ok"], index=[7, 9]),
+                                sections=("findings", "impression"))
+
+    assert list(sections.columns) == ["findings", "impression"]
+    assert list(sections.index) == [7, 9]
+    assert sections["findings"].isna().all()
+    assert sections["impression"].isna().tolist() == [True, False]
+
+
+def test_impression_snippet_keeps_header_and_falls_back():
+    snippets = impression_snippets(pd.Series([REPORT, "no impression here"]), max_chars=20)
+
+    assert snippets.tolist() == ["Impression:\nNo acute", DEFAULT_IMPRESSION]
+
+
+def test_filter_length_bounds_and_missing_text():
+    df = pd.DataFrame({"text": pd.array(["abc", "abcd", "abcdef", None], dtype="string")})
+
+    assert filter_length(df, min_chars=3).text.tolist() == ["abcd", "abcdef"]
+    assert filter_length(df, max_chars=4).text.tolist() == ["abc", "abcd"]
+    assert filter_length(df).text.tolist() == ["abc", "abcd", "abcdef"]
+
+
+def test_normalize_reports_cleans_filters_and_parses():
+    df = pd.DataFrame({"note_id": [1, 2, 3], "text": [REPORT, None, "IMPRESSION:  short"]})
+
+    normalized = normalize_reports(df, min_chars=20)
+
+    assert normalized.note_id.tolist() == [1]
+    assert normalized.loc[0, "impression"] == "No acute process."
+    assert list(normalize_reports(df, sections=()).columns) == ["note_id", "text"]
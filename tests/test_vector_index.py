@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from graphrag import vector_index
+from graphrag.vector_index import ExactVectorIndex, recall_at_k
+
+
+def embeddings_and_queries(n=3000, dim=64, n_queries=200, seed=0):
+    rng = np.random.default_rng(seed)
+    embeddings = rng.standard_normal((n, dim)).astype(np.float32)
+    queries = embeddings[rng.choice(n, n_queries, replace=False)] + rng.normal(scale=0.3, size=(n_queries, dim))
+    return embeddings, queries.astype(np.float32)
+
+
+def brute_force(embeddings, queries, k):
+    e = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    q = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    return np.argsort(-(q @ e.T), axis=1, kind="stable")[:, :k]
+
+
+def test_float32_search_is_exact():
+    embeddings, queries = embeddings_and_queries()
+
+    found, scores = ExactVectorIndex(embeddings).search(queries, k=10)
+
+    assert (found == brute_force(embeddings, queries, 10)).all()
+    assert (np.diff(scores, axis=1) <= 0).all()
+
+
+@pytest.mark.parametrize("dtype, min_recall", [("float16", 0.99), ("int8", 0.95)])
+def test_quantized_recall_against_brute_force(monkeypatch, dtype, min_recall):
+    # A small chunk makes the widening loop cover several blocks and a partial last one
+    monkeypatch.setattr(vector_index, "ROW_CHUNK", 700)
+    embeddings, queries = embeddings_and_queries()
+    expected = brute_force(embeddings, queries, 10)
+
+    found, _ = ExactVectorIndex(embeddings, dtype).search(queries, k=10)
+
+    recall = (found[:, :, None] == expected[:, None, :]).any(axis=2).mean()
+    assert recall >= min_recall
+    assert recall == pytest.approx(recall_at_k(ExactVectorIndex(embeddings, dtype), ExactVectorIndex(embeddings),
+                                               queries, k=10))
+
+
+def test_zero_rows_are_never_returned_and_zero_queries_match_nothing():
+    embeddings = np.eye(4, dtype=np.float32)
+    embeddings[2] = 0
+    queries = np.array([[0, 0, 1, 0], [0, 0, 0, 0], [1, 0, 0, 0]], dtype=np.float32)
+
+    found, scores = ExactVectorIndex(embeddings).search(queries, k=5)
+
+    assert found.shape == (3, 3)
+    assert 2 not in found
+    assert (found[1] == -1).all() and np.isneginf(scores[1]).all()
+    assert found[2, 0] == 0 and scores[2, 0] == pytest.approx(1.0)
+
+
+def test_rejects_unknown_dtype():
+    with pytest.raises(ValueError):
+        ExactVectorIndex(np.eye(2), "bfloat16")
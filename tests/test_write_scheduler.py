@@ -0,0 +1,135 @@
+import threading
+from contextlib import contextmanager
+
+import pytest
+from neo4j.exceptions import TransientError
+
+from graphrag import write_scheduler
+from graphrag.write_scheduler import WriteScheduler, payload_bytes
+
+ROWS = [{"i": i} for i in range(40)]
+
+
+class FakeGraph:
+    """Stands in for graph_db.session(); fail(batch) returns an exception to raise, or None"""
+
+    def __init__(self, fail=lambda batch: None):
+        self.fail = fail
+        self.committed = []
+        self.attempts = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def session(self):
+        yield self
+
+    def execute_write_once(self, work, batch, name=None, **params):
+        with self._lock:
+            self.attempts.append(len(batch))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            error = self.fail(batch)
+            if error is not None:
+                raise error
+            work(self, batch, **params)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def run(self, batch):
+        with self._lock:
+            self.committed.extend(row["i"] for row in batch)
+
+
+def write(tx, batch):
+    tx.run(batch)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(write_scheduler.time, "sleep", slept.append)
+    monkeypatch.setattr(write_scheduler.random, "uniform", lambda low, high: 1.0)
+    return slept
+
+
+def use(monkeypatch, graph):
+    monkeypatch.setattr(write_scheduler.graph_db, "session", graph.session)
+    return graph
+
+
+def scheduler(**kwargs):
+    # Five 20-byte rows per batch
+    return WriteScheduler(initial_bytes=5 * payload_bytes(ROWS[0]), min_bytes=payload_bytes(ROWS[0]), **kwargs)
+
+
+def test_rows_are_packed_by_bytes_and_committed_once(monkeypatch, sleeps):
+    graph = use(monkeypatch, FakeGraph())
+
+    with scheduler(max_in_flight=2) as writer:
+        writer.submit(write, ROWS)
+
+    assert sorted(graph.committed) == list(range(40))
+    assert graph.attempts[0] == 5
+    assert graph.max_active <= 2
+    assert writer.in_flight == 0 and sleeps == []
+
+
+def test_failing_batches_are_split_with_backoff(monkeypatch, sleeps):
+    too_big = lambda batch: TransientError("memory") if len(batch) > 2 else None  # noqa: E731
+    graph = use(monkeypatch, FakeGraph(too_big))
+
+    with scheduler(max_in_flight=1) as writer:
+        writer.submit(write, ROWS[:5])
+
+    assert sorted(graph.committed) == list(range(5))
+    # 5 rows fail, then the 2-row half commits and the 3-row half is split again
+    assert graph.attempts == [5, 2, 3, 1, 2]
+    assert writer.stats["splits"] == 2
+    assert sleeps == [1, 1]
+    assert writer.batch_bytes < 5 * payload_bytes(ROWS[0])
+
+
+def test_single_rows_are_retried_with_growing_backoff(monkeypatch, sleeps):
+    failures = iter([TransientError("busy"), TransientError("busy")])
+    graph = use(monkeypatch, FakeGraph(lambda batch: next(failures, None)))
+
+    with scheduler() as writer:
+        writer.submit(write, ROWS[:1])
+
+    assert graph.committed == [0]
+    assert writer.stats["retries"] == 2
+    assert sleeps == [1, 2]
+
+
+def test_a_failure_is_raised_once_and_the_scheduler_recovers(monkeypatch, sleeps):
+    graph = use(monkeypatch, FakeGraph(lambda batch: ValueError("bad row") if batch[0]["i"] == 0 else None))
+    writer = scheduler(max_in_flight=2)
+
+    with pytest.raises(ValueError, match="bad row"):
+        writer.submit(write, ROWS)
+        writer.flush()
+    assert writer.in_flight == 0
+    # Not retryable, so no backoff and no second attempt of the failing batch
+    assert graph.attempts.count(5) == len(graph.attempts) and sleeps == []
+
+    graph.fail = lambda batch: None
+    writer.submit(write, ROWS[:10])
+    writer.flush()
+    assert writer.in_flight == 0
+    assert set(range(10)) <= set(graph.committed)
+
+
+def test_retries_give_up_after_max_retries(monkeypatch, sleeps):
+    graph = use(monkeypatch, FakeGraph(lambda batch: TransientError("down")))
+    writer = scheduler()
+
+    writer.submit(write, ROWS[:1])
+    with pytest.raises(TransientError):
+        writer.flush()
+
+    assert len(graph.attempts) == write_scheduler.MAX_RETRIES
+    assert writer.in_flight == 0